@@ -1,6 +1,5 @@
 import sys
 import os
-import tempfile
 import streamlit as st
 
 # Ruta absoluta al directorio raíz del proyecto
@@ -11,6 +10,7 @@ sys.path.append(PROJECT_ROOT)
 sys.path.append(BACKEND_DIR)
 
 from backend.agents.job_analyzer import JobAnalyzerAgent
+from backend.services.upload_service import UploadService, UploadRejectedError
 
 # ------------------------------------------------------------
 # Inicialización del Session State
@@ -19,31 +19,33 @@ if "processed_jobs" not in st.session_state:
     st.session_state.processed_jobs = []
 
 # ------------------------------------------------------------
-# Procesamiento del archivo PDF
+# Procesamiento del archivo (PDF o DOCX)
 # ------------------------------------------------------------
 def process_job_file(uploaded_file):
+    # Validar el tamaño antes de leer el archivo completo
+    try:
+        data = UploadService().spool(uploaded_file)
+    except UploadRejectedError as e:
+        st.error(str(e))
+        return
+
     try:
         agent = JobAnalyzerAgent()
     except Exception as e:
+        data.close()
         st.error(f"Error inicializando JobAnalyzerAgent: {e}")
         return
 
-    # Guardar PDF temporalmente
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp.write(uploaded_file.read())
-        temp_path = tmp.name
-
+    # El PDF se procesa desde el buffer acotado (sin archivo temporal con nombre)
     try:
-        job_obj = agent.process_job_from_pdf(temp_path, generate_summary=True)
+        with data:
+            job_obj = agent.process_job_from_bytes(data, generate_summary=True)
         st.session_state.processed_jobs.append(job_obj)
         st.success(f" Procesado correctamente: {uploaded_file.name}")
 
     except Exception as e:
         st.error(f" Error procesando {uploaded_file.name}: {e}")
 
-    finally:
-        os.unlink(temp_path)
-
 # ------------------------------------------------------------
 # Interfaz Streamlit
 # ------------------------------------------------------------
@@ -53,13 +55,13 @@ st.set_page_config(
 )
 
 st.title("Analizador de Ofertas Laborales")
-st.write("Sube un archivo PDF con la oferta laboral y obtén un análisis completo en texto.")
+st.write("Sube un archivo PDF o Word (.docx) con la oferta laboral y obtén un análisis completo en texto.")
 st.markdown("---")
 
 # ------------------------------------------------------------
-# Upload PDF
+# Upload PDF / DOCX
 # ------------------------------------------------------------
-uploaded_pdf = st.file_uploader("Sube el PDF de la oferta laboral", type=["pdf"])
+uploaded_pdf = st.file_uploader("Sube el PDF o DOCX de la oferta laboral", type=["pdf", "docx"])
 
 if uploaded_pdf:
     st.info(f"Archivo listo: **{uploaded_pdf.name}**")
@@ -1,7 +1,6 @@
 import sys
 import os
 import json
-import tempfile
 import streamlit as st
 import matplotlib.pyplot as plt
 from wordcloud import WordCloud
@@ -16,12 +15,35 @@ sys.path.append(PROJECT_ROOT)
 sys.path.append(BACKEND_DIR)
 
 from backend.agents.extractor_agent import ExtractorAgent
+from backend.config import settings
+from backend.services.dedup_service import DuplicateDetector
+from backend.services.upload_service import UploadService, UploadRejectedError
+from backend.services.zip_service import ZipIngestionService
+from backend.services.batch_scheduler import BatchScheduler, preflight_document
 
 # --- Inicialización de Session State ---
 # Esta es la base de datos temporal de tu aplicación
 if 'processed_cvs' not in st.session_state:
     st.session_state.processed_cvs = []
 
+# Índice de CVs ya procesados en la sesión (para no pagar OCR/GPT por copias)
+if 'cv_index' not in st.session_state:
+    st.session_state.cv_index = DuplicateDetector()
+
+if 'collapsed_cvs' not in st.session_state:
+    st.session_state.collapsed_cvs = []
+
+if 'batch_memory' not in st.session_state:
+    st.session_state.batch_memory = None
+
+# Tiempo estimado (LPT) vs real del último lote
+if 'batch_schedule' not in st.session_state:
+    st.session_state.batch_schedule = None
+
+# Contadores de los paquetes ZIP del último lote (miembros procesados y omitidos)
+if 'zip_reports' not in st.session_state:
+    st.session_state.zip_reports = []
+
 # --- Funciones de Utilidad ---
 
 def create_wordcloud(data_list, title):
@@ -54,6 +76,13 @@ def create_wordcloud(data_list, title):
 
 def process_files(uploaded_files):
     """Procesa todos los archivos subidos y actualiza Session State."""
+
+    uploads = UploadService()
+    try:
+        uploads.check_batch(uploaded_files)
+    except UploadRejectedError as e:
+        st.error(str(e))
+        return
     
     # Inicializa el agente fuera del bucle para no re-crear la conexión en cada CV
     try:
@@ -63,46 +92,234 @@ def process_files(uploaded_files):
         return
 
     st.session_state.processed_cvs = []
+    st.session_state.collapsed_cvs = []
+    st.session_state.zip_reports = []
+    st.session_state.batch_schedule = None
+    index = st.session_state.cv_index
+
+    documents = [f for f in uploaded_files if not f.name.lower().endswith(".zip")]
+    archives = [f for f in uploaded_files if f.name.lower().endswith(".zip")]
     
     # Crea una barra de progreso
     progress_bar = st.progress(0)
     status_text = st.empty()
-    
-    for i, uploaded_file in enumerate(uploaded_files):
-        filename = uploaded_file.name
-        
-        # Guardar PDF temporalmente
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(uploaded_file.read())
-            temp_path = tmp.name
 
-        status_text.text(f" Procesando: {filename} ({i+1}/{len(uploaded_files)})...")
-        
-        # Ejecutar agente
-        resultado = agent.process_cv(temp_path)
-        
-        # Limpiar archivo temporal
-        os.unlink(temp_path)
+    with uploads.track_batch() as memory:
+        # 1. Preflight: copia acotada, hash y número de páginas (sin OCR ni GPT)
+        jobs, batch_duplicates = preflight_files(index, uploads, documents, status_text)
 
-        # Si el resultado es JSON válido, almacenar
-        if 'error' not in resultado:
-            st.session_state.processed_cvs.append(resultado)
-            status_text.text(f" Procesado y almacenado: {filename}")
-        else:
-            st.warning(f" Falló el procesamiento de {filename}. Error: {resultado['error']}")
+        # 2. CVs únicos en paralelo, los más largos primero
+        if jobs:
+            run_scheduled(agent, index, jobs, batch_duplicates, progress_bar, status_text)
+
+        # 3. Paquetes ZIP, miembro por miembro. Sus CVs cuentan para
+        # MAX_CVS_PER_ANALYSIS igual que los archivos sueltos
+        remaining = uploads.max_files - len(documents)
+        for uploaded_file in archives:
+            if remaining <= 0:
+                st.warning(
+                    f" {uploaded_file.name} no se procesó: el lote ya tiene el máximo de {uploads.max_files} CVs"
+                )
+                continue
+            status_text.text(f" Procesando: {uploaded_file.name}...")
+            remaining -= process_zip_file(agent, index, uploads, uploaded_file, status_text, remaining)
 
-        # Actualizar barra de progreso
-        progress_bar.progress((i + 1) / len(uploaded_files))
+    st.session_state.batch_memory = memory
 
     progress_bar.empty()
-    status_text.success(f"Proceso completado. {len(st.session_state.processed_cvs)} CVs analizados.")
+    status_text.success(
+        f"Proceso completado. {len(st.session_state.processed_cvs)} CVs analizados, "
+        f"{len(st.session_state.collapsed_cvs)} duplicados agrupados."
+    )
+
+
+def preflight_files(index, uploads, uploaded_files, status_text):
+    """
+    Copia cada archivo a un buffer acotado y lee su tamaño y páginas.
+
+    Los duplicados exactos de CVs ya procesados se agrupan aquí mismo; las copias
+    dentro del lote esperan a que termine el original.
+    """
+    jobs = []
+    by_hash = {}
+    batch_duplicates = {}
+
+    for uploaded_file in uploaded_files:
+        filename = uploaded_file.name
+        status_text.text(f" Revisando: {filename}...")
+
+        # Los archivos demasiado grandes se rechazan antes de leerlos
+        try:
+            data = uploads.spool(uploaded_file, filename)
+        except UploadRejectedError as e:
+            st.warning(str(e))
+            continue
+
+        content_hash = index.content_hash(data)
+
+        # Duplicado exacto (mismos bytes): ni OCR ni GPT
+        entry = index.find_exact(content_hash)
+        if entry is not None:
+            data.close()
+            register_duplicate(entry, filename, "exacto", 1.0, status_text)
+            continue
+        if content_hash in by_hash:
+            data.close()
+            batch_duplicates.setdefault(content_hash, []).append(filename)
+            continue
+
+        by_hash[content_hash] = True
+        jobs.append({"filename": filename, "data": data, "hash": content_hash,
+                     "info": preflight_document(data)})
+
+    return jobs, batch_duplicates
+
+
+def analyze_cv(agent, index, job):
+    """
+    Trabajo de un worker: texto, huella y (si no es casi-duplicado) perfil con GPT.
+
+    La búsqueda del casi-duplicado y el registro del CV nuevo son una sola
+    operación del índice (reserve), así que de dos copias parecidas en el
+    mismo lote solo una llega a GPT.
+    """
+    raw_text = agent.extract_cv_text(job["data"])
+    if not raw_text:
+        return {"profile": agent.process_cv_text(raw_text), "entry": None}
+
+    entry, similarity = index.reserve(job["filename"], job["hash"], index.fingerprint(raw_text))
+    # Casi-duplicado (renombrado, re-exportado): se omite GPT
+    if similarity is not None:
+        return {"near": (entry, similarity)}
+
+    try:
+        profile = agent.process_cv_text(raw_text)
+    except Exception:
+        index.discard(entry)
+        raise
+    if "error" in profile:
+        index.discard(entry)
+    return {"profile": profile, "entry": entry}
+
+
+def run_scheduled(agent, index, jobs, batch_duplicates, progress_bar, status_text):
+    """Despacha los CVs a los workers en orden LPT y registra los resultados al terminar cada uno."""
+    scheduler = BatchScheduler()
+    done = []
+    # Casi-duplicados que terminaron antes que su original: id(entrada) → [(archivo, similitud)]
+    waiting = {}
+
+    def on_complete(i, outcome):
+        job = jobs[i]
+        job["data"].close()
+        filename = job["filename"]
+        entry = None
+
+        if isinstance(outcome, Exception):
+            st.warning(f" Falló el procesamiento de {filename}. Error: {outcome}")
+        elif "near" in outcome:
+            near_entry, similarity = outcome["near"]
+            index.alias(job["hash"], near_entry)
+            if near_entry["profile"] is None:
+                waiting.setdefault(id(near_entry), []).append((filename, similarity))
+            else:
+                entry = near_entry
+                register_duplicate(entry, filename, "similar", similarity, status_text)
+        elif "error" in outcome["profile"]:
+            st.warning(f" Falló el procesamiento de {filename}. Error: {outcome['profile']['error']}")
+            for copy_name, _ in waiting.pop(id(outcome["entry"]), []):
+                st.warning(f" Falló el procesamiento de {copy_name}: su CV parecido {filename} falló")
+        else:
+            # Si el resultado es JSON válido, almacenar
+            entry = outcome["entry"]
+            index.complete(entry, outcome["profile"])
+            st.session_state.processed_cvs.append(outcome["profile"])
+            status_text.text(f" Procesado y almacenado: {filename}")
+            for copy_name, similarity in waiting.pop(id(entry), []):
+                register_duplicate(entry, copy_name, "similar", similarity, status_text)
+
+        if entry is not None:
+            for copy_name in batch_duplicates.get(job["hash"], []):
+                register_duplicate(entry, copy_name, "exacto", 1.0, status_text)
+
+        done.append(i)
+        progress_bar.progress(len(done) / len(jobs))
+
+    _, report = scheduler.run(jobs, [job["info"] for job in jobs],
+                              lambda job: analyze_cv(agent, index, job), on_complete)
+    st.session_state.batch_schedule = report
+
+
+def process_zip_file(agent, index, uploads, uploaded_file, status_text, max_members):
+    """
+    Procesa un paquete ZIP miembro por miembro, sin descomprimirlo completo.
+
+    Solo se leen hasta max_members CVs (el cupo que le queda al lote).
+
+    Returns:
+        int: CVs leídos del ZIP
+    """
+    report = {"archivo": uploaded_file.name}
+    st.session_state.zip_reports.append(report)
+    zips = ZipIngestionService(upload_service=uploads, max_members=max_members)
+    try:
+        for member_name, data in zips.iter_members(uploaded_file, report):
+            status_text.text(f" Procesando {member_name} desde {uploaded_file.name}...")
+            process_cv_buffer(agent, index, data, member_name, status_text)
+    except Exception as e:
+        st.warning(f" No se pudo leer el ZIP {uploaded_file.name}: {e}")
+
+    processed = report.get("processed", 0)
+    if processed >= max_members and report.get("rejected"):
+        st.warning(
+            f" {uploaded_file.name}: se alcanzó el máximo de {uploads.max_files} CVs por lote; "
+            f"{report['rejected']} CVs del ZIP no se procesaron"
+        )
+    return processed
+
+
+def process_cv_buffer(agent, index, data, filename, status_text):
+    """Procesa un CV ya copiado a un buffer acotado."""
+    content_hash = index.content_hash(data)
+
+    # 1. Duplicado exacto (mismos bytes): ni OCR ni GPT
+    entry = index.find_exact(content_hash)
+    if entry is not None:
+        register_duplicate(entry, filename, "exacto", 1.0, status_text)
+        return
+
+    # 2. Casi-duplicado o perfil nuevo
+    outcome = analyze_cv(agent, index, {"data": data, "filename": filename, "hash": content_hash})
+    if "near" in outcome:
+        entry, similarity = outcome["near"]
+        index.alias(content_hash, entry)
+        register_duplicate(entry, filename, "similar", similarity, status_text)
+    elif "error" in outcome["profile"]:
+        st.warning(f" Falló el procesamiento de {filename}. Error: {outcome['profile']['error']}")
+    else:
+        index.complete(outcome["entry"], outcome["profile"])
+        st.session_state.processed_cvs.append(outcome["profile"])
+        status_text.text(f" Procesado y almacenado: {filename}")
+
+
+def register_duplicate(entry, filename, match_type, similarity, status_text):
+    """Reutiliza el perfil existente (solo se agrega si no está ya en este lote)"""
+    if not any(p is entry["profile"] for p in st.session_state.processed_cvs):
+        st.session_state.processed_cvs.append(entry["profile"])
+    st.session_state.collapsed_cvs.append({
+        "archivo": filename,
+        "duplicado_de": entry["name"],
+        "tipo": match_type,
+        "similitud": round(similarity, 2),
+    })
+    status_text.text(f" Duplicado de {entry['name']}: {filename}")
 
 # --- Estructura de la Aplicación Streamlit ---
 
 st.set_page_config(page_title="CV Analyzer", layout="wide")
 
 st.title("Agente de Análisis de CVs por Lotes")
-st.write("Sube múltiples archivos PDF para extraer información clave y generar estadísticas agregadas.")
+st.write("Sube múltiples archivos PDF o Word (.docx), o un ZIP con CVs, para extraer información clave y generar estadísticas agregadas.")
 st.markdown("---")
 
 # --- Sección de Subida de Archivos ---
@@ -111,8 +328,8 @@ col1, col2 = st.columns([2, 1])
 with col1:
     # 1. Subida Múltiple (clave del requerimiento)
     uploaded_files = st.file_uploader(
-        "Sube tus CVs (archivos PDF)", 
-        type=["pdf"], 
+        "Sube tus CVs (archivos PDF, DOCX o paquetes ZIP)", 
+        type=["pdf", "docx", "zip"], 
         accept_multiple_files=True
     )
 
@@ -121,6 +338,10 @@ with col2:
     st.write("") # Espaciador
     if uploaded_files:
         st.info(f"Archivos listos para procesar: {len(uploaded_files)}")
+        st.caption(
+            f"Máximo {settings.MAX_CVS_PER_ANALYSIS} archivos por lote "
+            f"y {settings.MAX_FILE_SIZE_MB} MB por archivo"
+        )
         # Botón para iniciar el procesamiento por lotes
         if st.button(" Iniciar Análisis de Lote"):
             process_files(uploaded_files)
@@ -141,6 +362,40 @@ if st.session_state.processed_cvs:
         value=len(st.session_state.processed_cvs)
     )
 
+    # Memoria usada por el último lote
+    if st.session_state.batch_memory:
+        mem = st.session_state.batch_memory
+        parts = []
+        if "python_peak_mb" in mem:  # solo con UPLOAD_TRACE_MEMORY=1
+            parts.append(f"Pico de memoria del lote: {mem['python_peak_mb']} MB (Python)")
+        if "rss_delta_mb" in mem:
+            parts.append(f"RSS del lote: {mem['rss_start_mb']} MB al inicio, {mem['rss_delta_mb']:+} MB al terminar")
+        if "process_max_rss_mb" in mem:
+            parts.append(f"Pico histórico del proceso: {mem['process_max_rss_mb']} MB")
+        parts.append(f"Duración: {mem['duration_s']} s")
+        st.caption(" · ".join(parts))
+
+    # Planificación del último lote: estimado (más largos primero) vs real
+    if st.session_state.batch_schedule:
+        sched = st.session_state.batch_schedule
+        st.caption(
+            f"Tiempo estimado del lote: {sched['predicted_s']} s con {sched['workers']} workers "
+            f"(en orden de subida: {sched['fifo_predicted_s']} s) · real: {sched['actual_s']} s"
+        )
+
+    # Miembros de los ZIP procesados y omitidos
+    for zip_report in st.session_state.zip_reports:
+        st.caption(
+            f"{zip_report['archivo']}: {zip_report['processed']} CVs leídos de {zip_report['members']} entradas · "
+            f"omitidos: {zip_report['skipped_directories']} carpetas, "
+            f"{zip_report['skipped_unsupported']} no soportados, {zip_report['rejected']} rechazados"
+        )
+
+    # Reporte de duplicados agrupados en el último lote
+    if st.session_state.collapsed_cvs:
+        with st.expander(f"Archivos duplicados agrupados ({len(st.session_state.collapsed_cvs)})"):
+            st.dataframe(pd.DataFrame(st.session_state.collapsed_cvs), use_container_width=True)
+
     st.markdown("---")
 
     # 5. Generación de Gráficos de Nube de Palabras
@@ -61,10 +61,16 @@ st.markdown("---")
 st.subheader(" Ejecutar Matching")
 
 use_openai = st.checkbox("Usar OpenAI para refinamiento avanzado", value=True)
+refine_batch_size = st.number_input(
+    "Candidatos por llamada de refinamiento",
+    min_value=1, max_value=20, value=1,
+    disabled=not use_openai,
+    help="1 = una llamada por candidato. Con más de 1 se envía la oferta una sola vez por lote (menos tokens)."
+)
 
 if st.button(" Generar Ranking de Candidatos"):
     
-    matcher = CVMatcherAgent(use_openai=use_openai)
+    matcher = CVMatcherAgent(use_openai=use_openai, refine_batch_size=int(refine_batch_size))
 
     candidates = st.session_state.processed_cvs
     
@@ -1,13 +1,16 @@
 """
 CV Matcher Agent - Compara CVs contra una oferta y devuelve score + justificación
 """
+import os
 import re
 import json
+import asyncio
 import logging
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
 from backend.services.azure_openai_service import AzureOpenAIService
+from backend.services.resilience_service import status_code_of
 
 
 from typing import Any, TYPE_CHECKING
@@ -62,6 +65,21 @@ def _normalize_json(obj: Any):
     return str(obj)
 
 
+def _is_context_length_error(exc: BaseException) -> bool:
+    """
+    True si la llamada falló porque el prompt no cabe en el contexto del
+    modelo (el único error que se resuelve dividiendo el lote). Revisa
+    también las excepciones encadenadas con `raise ... from`.
+    """
+    while exc is not None:
+        if getattr(exc, "code", None) == "context_length_exceeded" or status_code_of(exc) == 413:
+            return True
+        if "maximum context length" in str(exc).lower():
+            return True
+        exc = exc.__cause__
+    return False
+
+
 # ================================================================
 # AGENTE PRINCIPAL
 # ================================================================
@@ -70,11 +88,17 @@ class CVMatcherAgent:
     Agente que compara un JobAnalysis con candidatos
     """
 
-    def __init__(self, use_openai: bool = True):
+    def __init__(self, use_openai: bool = True, refine_batch_size: Optional[int] = None):
         logger.info("Inicializando CVMatcherAgent...")
         self.openai = AzureOpenAIService() if use_openai else None
         self.use_openai = use_openai and (self.openai is not None)
-        logger.info(f"CVMatcherAgent listo (use_openai={self.use_openai})")
+
+        # Candidatos por llamada de refinamiento en match_batch. Por defecto 1 (una
+        # llamada por candidato); los lotes se activan desde la página o con
+        # MATCH_REFINE_BATCH_SIZE
+        self.refine_batch_size = refine_batch_size or int(os.getenv("MATCH_REFINE_BATCH_SIZE", "1"))
+        self.refine_stats = {"requests": 0, "candidates": 0, "splits": 0, "retried": 0, "fallbacks": 0}
+        logger.info(f"CVMatcherAgent listo (use_openai={self.use_openai}, lote={self.refine_batch_size})")
 
         # pesos (ajustables)
         self.weights = {
@@ -178,11 +202,8 @@ class CVMatcherAgent:
     # ================================================================
     # OPENAI – REFINAMIENTO DEL MATCH
     # ================================================================
-    def _openai_refine(self, job: JobAnalysis, candidate: Dict[str, Any], base_result: Dict[str, Any]) -> Dict[str, Any]:
-
-        if not self.use_openai:
-            return base_result
-
+    def _refine_request(self, job: JobAnalysis, candidate: Dict[str, Any], base_result: Dict[str, Any]):
+        """System prompt y payload del refinamiento (compartidos por la versión sync y async)"""
         # normalizar todo a JSON seguro
         job_clean = job.model_dump() if hasattr(job, "model_dump") else job
         cand_clean = candidate
@@ -202,6 +223,34 @@ class CVMatcherAgent:
             "técnicos, experiencia, educación y habilidades. Devuelve SOLO JSON válido con:\n"
             "{ match_score, strengths, gaps, justification }"
         )
+        return system_prompt, user_text
+
+    @staticmethod
+    def _parse_refined(response: str) -> Dict[str, Any]:
+        raw = response.replace("```json", "").replace("```", "").strip()
+        refined = json.loads(raw)
+
+        if "match_score" in refined:
+            refined["match_score"] = int(round(float(refined["match_score"])))
+
+        return refined
+
+    def _refine_fallback(self, base_result: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        """
+        Score heurístico cuando el refinamiento falla tras los reintentos (o con
+        el circuito abierto); refine_error deja ver en el ranking qué candidatos
+        no se refinaron.
+        """
+        logger.warning(f"[OpenAI] Error refinando match: {error}")
+        self.refine_stats["fallbacks"] += 1
+        return {**base_result, "refine_error": str(error)}
+
+    def _openai_refine(self, job: JobAnalysis, candidate: Dict[str, Any], base_result: Dict[str, Any]) -> Dict[str, Any]:
+
+        if not self.use_openai:
+            return base_result
+
+        system_prompt, user_text = self._refine_request(job, candidate, base_result)
 
         try:
             response = self.openai.analyze_with_system_prompt(
@@ -210,22 +259,219 @@ class CVMatcherAgent:
                 temperature=None,
                 json_mode=True,
             )
+            return self._parse_refined(response)
+
+        except Exception as e:
+            return self._refine_fallback(base_result, e)
+
+    async def _aopenai_refine(self, job: JobAnalysis, candidate: Dict[str, Any], base_result: Dict[str, Any]) -> Dict[str, Any]:
+
+        if not self.use_openai:
+            return base_result
+
+        system_prompt, user_text = self._refine_request(job, candidate, base_result)
+
+        try:
+            response = await self.openai.aanalyze_with_system_prompt(
+                system_prompt=system_prompt,
+                user_content=user_text,
+                temperature=None,
+                json_mode=True,
+            )
+            return self._parse_refined(response)
+
+        except Exception as e:
+            return self._refine_fallback(base_result, e)
 
-            raw = response.replace("```json", "").replace("```", "").strip()
-            refined = json.loads(raw)
+    # ================================================================
+    # OPENAI – REFINAMIENTO EN LOTE (un solo job por llamada)
+    # ================================================================
+    def _batch_refine_request(self, job: JobAnalysis, items: List[tuple]):
+        """
+        System prompt y payload para refinar varios candidatos en una llamada.
 
-            if "match_score" in refined:
-                refined["match_score"] = int(round(float(refined["match_score"])))
+        Args:
+            items: Lista de (id, candidato, evaluación base)
+        """
+        job_clean = job.model_dump() if hasattr(job, "model_dump") else job
+        user_content = {
+            "job_profile": job_clean,
+            "candidates": [
+                {
+                    "id": cid,
+                    "candidate_profile": candidate,
+                    "base_evaluation": json.loads(json.dumps(base, default=_normalize_json))
+                }
+                for cid, candidate, base in items
+            ]
+        }
 
-            return refined
+        # Sin indentación: el job ya no se repite, pero el lote sigue siendo grande
+        user_text = json.dumps(user_content, ensure_ascii=False, default=_normalize_json)
 
+        system_prompt = (
+            "Eres un experto en reclutamiento. Para CADA candidato de la lista ajusta su score "
+            "frente al mismo puesto según criterios técnicos, experiencia, educación y habilidades. "
+            "Devuelve SOLO JSON válido con:\n"
+            '{ "results": [ { id, match_score, strengths, gaps, justification } ] }\n'
+            "con exactamente un elemento por candidato y el mismo id recibido."
+        )
+        return system_prompt, user_text
+
+    @staticmethod
+    def _parse_batch_refined(response: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Resultados válidos del lote por id; los candidatos ausentes o con datos
+        inválidos no aparecen (se vuelven a pedir). Lanza excepción si la
+        respuesta no es JSON.
+        """
+        raw = response.replace("```json", "").replace("```", "").strip()
+        data = json.loads(raw)
+        entries = data.get("results", []) if isinstance(data, dict) else data
+
+        valid = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict) or entry.get("id") not in ids or entry["id"] in valid:
+                continue
+            try:
+                score = int(round(float(entry["match_score"])))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if not 0 <= score <= 100:
+                continue
+            if not all(isinstance(entry.get(k, []), list) for k in ("strengths", "gaps")):
+                continue
+
+            refined = {k: v for k, v in entry.items() if k != "id"}
+            refined["match_score"] = score
+            valid[entry["id"]] = refined
+        return valid
+
+    def _refine_many(self, job: JobAnalysis, items: List[tuple]) -> Dict[str, Dict[str, Any]]:
+        """
+        Refina un lote de (id, candidato, base). Los candidatos sin resultado
+        válido se vuelven a pedir en un lote menor; si la respuesta no se puede
+        leer o el lote excede el contexto, se divide en dos. Otros errores
+        (429, timeouts, circuito abierto...) no mejoran con lotes más chicos:
+        todo el lote se queda con el score heurístico. Un lote de uno usa el
+        refinamiento individual.
+        """
+        self.refine_stats["requests"] += 1
+        self.refine_stats["candidates"] += len(items)
+        if len(items) == 1:
+            cid, candidate, base = items[0]
+            return {cid: self._openai_refine(job, candidate, base)}
+
+        system_prompt, user_text = self._batch_refine_request(job, items)
+        try:
+            response = self.openai.analyze_with_system_prompt(
+                system_prompt=system_prompt,
+                user_content=user_text,
+                temperature=None,
+                json_mode=True,
+            )
         except Exception as e:
-            logger.warning(f"[OpenAI] Error refinando match: {e}")
-            return base_result
+            refined = self._batch_failed(items, e)
+        else:
+            refined = self._parse_batch_response(response, items)
+
+        missing = [item for item in items if item[0] not in refined]
+        if missing:
+            for part in self._split_missing(items, missing):
+                refined.update(self._refine_many(job, part))
+        return refined
+
+    async def _arefine_many(self, job: JobAnalysis, items: List[tuple]) -> Dict[str, Dict[str, Any]]:
+        """Versión asíncrona de _refine_many"""
+        self.refine_stats["requests"] += 1
+        self.refine_stats["candidates"] += len(items)
+        if len(items) == 1:
+            cid, candidate, base = items[0]
+            return {cid: await self._aopenai_refine(job, candidate, base)}
+
+        system_prompt, user_text = self._batch_refine_request(job, items)
+        try:
+            response = await self.openai.aanalyze_with_system_prompt(
+                system_prompt=system_prompt,
+                user_content=user_text,
+                temperature=None,
+                json_mode=True,
+            )
+        except Exception as e:
+            refined = self._batch_failed(items, e)
+        else:
+            refined = self._parse_batch_response(response, items)
+
+        missing = [item for item in items if item[0] not in refined]
+        if missing:
+            for part in self._split_missing(items, missing):
+                refined.update(await self._arefine_many(job, part))
+        return refined
+
+    def _batch_failed(self, items: List[tuple], error: Exception) -> Dict[str, Dict[str, Any]]:
+        """
+        Resultado de un lote cuya llamada lanzó excepción: vacío (se divide) si
+        el prompt excede el contexto; si no, score heurístico para todo el lote.
+        Los errores transitorios ya se reintentaron en la capa de resiliencia,
+        así que dividir solo multiplicaría las llamadas fallidas.
+        """
+        if _is_context_length_error(error):
+            logger.warning(f"[OpenAI] Lote de {len(items)} candidatos excede el contexto ({error}); se divide")
+            return {}
+        return {cid: self._refine_fallback(base, error) for cid, _, base in items}
+
+    def _parse_batch_response(self, response: str, items: List[tuple]) -> Dict[str, Dict[str, Any]]:
+        """_parse_batch_refined tolerante: una respuesta ilegible deja el lote sin resultados (se divide)"""
+        try:
+            return self._parse_batch_refined(response, [cid for cid, _, _ in items])
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"[OpenAI] Respuesta inválida para un lote de {len(items)} candidatos ({e}); se divide")
+            return {}
+
+    def _split_missing(self, items: List[tuple], missing: List[tuple]) -> List[List[tuple]]:
+        """
+        Sub-lotes a reintentar: los candidatos que faltan si fueron solo
+        algunos, o las dos mitades del lote si no llegó ningún resultado
+        válido (respuesta ilegible o contexto excedido).
+        """
+        if len(missing) < len(items):
+            self.refine_stats["retried"] += len(missing)
+            return [missing]
+        self.refine_stats["splits"] += 1
+        half = len(items) // 2
+        return [items[:half], items[half:]]
+
+    def _refine_candidates(self, job: JobAnalysis, bases: List[Dict[str, Any]],
+                           candidates: List[Dict[str, Any]], batch_size: int) -> List[Dict[str, Any]]:
+        items = [(f"c{i}", cand, base) for i, (cand, base) in enumerate(zip(candidates, bases))]
+        refined = {}
+        for start in range(0, len(items), batch_size):
+            refined.update(self._refine_many(job, items[start:start + batch_size]))
+        return [refined[cid] for cid, _, _ in items]
 
     # ================================================================
     # API PRINCIPALES
     # ================================================================
+    @staticmethod
+    def _combine(base: Dict[str, Any], refined: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "match_score": refined.get("match_score", base["match_score"]),
+            "strengths": refined.get("strengths", base["strengths"]),
+            "gaps": refined.get("gaps", base["gaps"]),
+            "justification": refined.get("justification", ""),
+            "base_components": base["base_components"],
+            "raw_refined": refined
+        }
+
+    @staticmethod
+    def _rank(results: List[Dict[str, Any]], top_k: Optional[int]) -> List[Dict[str, Any]]:
+        results.sort(key=lambda x: x["match_score"], reverse=True)
+
+        for i, r in enumerate(results, 1):
+            r["rank"] = i
+
+        return results[:top_k] if top_k else results
+
     def match_candidate(self, job: JobAnalysis, candidate_profile: Dict[str, Any]) -> Dict[str, Any]:
         base = self._heuristic_score(job, candidate_profile)
 
@@ -236,26 +482,129 @@ class CVMatcherAgent:
             }
 
         refined = self._openai_refine(job, candidate_profile, base)
+        return self._combine(base, refined)
+
+    def match_batch(self, job: JobAnalysis, candidates: List[Dict[str, Any]], top_k: Optional[int] = None,
+                    batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Rankea candidatos. Con batch_size > 1 (por defecto refine_batch_size)
+        el refinamiento envía varios candidatos por llamada con una sola copia
+        del job.
+        """
+        batch_size = batch_size or self.refine_batch_size
+        if not self.use_openai or batch_size <= 1:
+            results = []
+            for cand in candidates:
+                r = self.match_candidate(job, cand)
+                r["candidate"] = cand
+                results.append(r)
+            return self._rank(results, top_k)
+
+        bases = [self._heuristic_score(job, cand) for cand in candidates]
+        refined = self._refine_candidates(job, bases, candidates, batch_size)
 
-        return {
-            "match_score": refined.get("match_score", base["match_score"]),
-            "strengths": refined.get("strengths", base["strengths"]),
-            "gaps": refined.get("gaps", base["gaps"]),
-            "justification": refined.get("justification", ""),
-            "base_components": base["base_components"],
-            "raw_refined": refined
-        }
+        results = []
+        for cand, base, ref in zip(candidates, bases, refined):
+            r = self._combine(base, ref)
+            r["candidate"] = cand
+            results.append(r)
+        return self._rank(results, top_k)
+
+    def match_batch_offline(self, job: JobAnalysis, candidates: List[Dict[str, Any]], top_k: Optional[int] = None,
+                            batch_size: Optional[int] = None, name: Optional[str] = None,
+                            timeout: Optional[float] = None, batch_jobs=None) -> List[Dict[str, Any]]:
+        """
+        Rankea con la Batch API (re-puntuación nocturna del banco de talento).
+
+        Cada línea del JSONL es un lote de batch_size candidatos con una sola
+        copia del job, igual que en match_batch. Los candidatos sin resultado
+        válido se quedan con el score heurístico (refine_error) en vez de
+        reintentarse de forma interactiva.
+        """
+        if not self.use_openai:
+            return self.match_batch(job, candidates, top_k)
+        bases = [self._heuristic_score(job, cand) for cand in candidates]
+
+        batch_size = batch_size or self.refine_batch_size
+        batch_jobs = batch_jobs or self.openai.batch_jobs()
+        items = [(f"c{i}", cand, base) for i, (cand, base) in enumerate(zip(candidates, bases))]
+        chunks = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+        requests = []
+        for k, chunk in enumerate(chunks):
+            system_prompt, user_text = self._batch_refine_request(job, chunk)
+            messages, response_format = self.openai.build_system_request(system_prompt, user_text, json_mode=True)
+            requests.append(batch_jobs.build_request(f"refine-{k}", messages, response_format=response_format))
+
+        refined = {}
+        for custom_id, content in batch_jobs.run(requests, name=name or "refine", timeout=timeout).items():
+            chunk = chunks[int(custom_id.split("-", 1)[1])]
+            try:
+                if isinstance(content, Exception):
+                    raise content
+                refined.update(self._parse_batch_refined(content, [cid for cid, _, _ in chunk]))
+            except Exception as e:
+                logger.warning(f"[Batch] Lote {custom_id} sin resultado válido: {e}")
+        self.refine_stats["requests"] += len(requests)
+        self.refine_stats["candidates"] += len(items)
 
-    def match_batch(self, job: JobAnalysis, candidates: List[Dict[str, Any]], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
         results = []
-        for cand in candidates:
-            r = self.match_candidate(job, cand)
+        for cid, cand, base in items:
+            ref = refined.get(cid) or self._refine_fallback(base, Exception("sin resultado válido en el batch"))
+            r = self._combine(base, ref)
             r["candidate"] = cand
             results.append(r)
+        return self._rank(results, top_k)
 
-        results.sort(key=lambda x: x["match_score"], reverse=True)
+    async def amatch_candidate(self, job: JobAnalysis, candidate_profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Versión asíncrona de match_candidate (AsyncAzureOpenAI)"""
+        base = self._heuristic_score(job, candidate_profile)
 
-        for i, r in enumerate(results, 1):
-            r["rank"] = i
+        if not self.use_openai:
+            return {
+                **base,
+                "justification": None
+            }
 
-        return results[:top_k] if top_k else results
+        refined = await self._aopenai_refine(job, candidate_profile, base)
+        return self._combine(base, refined)
+
+    async def amatch_batch(self, job: JobAnalysis, candidates: List[Dict[str, Any]], top_k: Optional[int] = None,
+                           max_concurrency: Optional[int] = None,
+                           batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Versión asíncrona de match_batch: los lotes de candidatos (o los
+        candidatos, con batch_size=1) se refinan en paralelo con como máximo
+        max_concurrency llamadas en vuelo (LLM_MAX_WORKERS o 4).
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or int(os.getenv("LLM_MAX_WORKERS", "4"))))
+        batch_size = batch_size or self.refine_batch_size
+
+        if not self.use_openai or batch_size <= 1:
+            async def run(cand):
+                async with semaphore:
+                    r = await self.amatch_candidate(job, cand)
+                r["candidate"] = cand
+                return r
+
+            results = await asyncio.gather(*(run(cand) for cand in candidates))
+            return self._rank(list(results), top_k)
+
+        bases = [self._heuristic_score(job, cand) for cand in candidates]
+        items = [(f"c{i}", cand, base) for i, (cand, base) in enumerate(zip(candidates, bases))]
+
+        async def run_batch(batch):
+            async with semaphore:
+                return await self._arefine_many(job, batch)
+
+        refined = {}
+        for part in await asyncio.gather(*(run_batch(items[i:i + batch_size])
+                                           for i in range(0, len(items), batch_size))):
+            refined.update(part)
+
+        results = []
+        for cid, cand, base in items:
+            r = self._combine(base, refined[cid])
+            r["candidate"] = cand
+            results.append(r)
+        return self._rank(results, top_k)
@@ -1,10 +1,17 @@
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from azure.core.credentials import AzureKeyCredential
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI
 import json
 
+from backend.services.ingestion_service import IngestionService
+from backend.services.resilience_service import get_resilience
+from backend.services.token_service import PromptBudgeter, CV_PRIORITY_PATTERNS
+from backend.services.text_cleaning_service import CVTextCleaner
+from backend.services.batch_api_service import BatchJobService
+from backend.services.zip_service import ZipIngestionService
+
 # Cargar entorno (intentará buscar .env en la raiz)
 load_dotenv(override=True)
 
@@ -14,7 +21,9 @@ class ExtractorAgent:
                  doc_key=None, 
                  openai_endpoint=None, 
                  openai_key=None, 
-                 deployment_name="gpt-5-mini"): # <--- TU DEPLOYMENT FIJO AQUI
+                 deployment_name="gpt-5-mini", # <--- TU DEPLOYMENT FIJO AQUI
+                 text_mode=None,
+                 parse_workers=None):
         
         print("\n--- Inicializando ExtractorAgent ---")
 
@@ -34,17 +43,28 @@ class ExtractorAgent:
         if not self.aoai_deployment:
             raise ValueError("❌ El deployment está vacío.")
 
-        # Clientes
-        self.doc_client = DocumentAnalysisClient(
-            endpoint=self.doc_endpoint,
-            credential=AzureKeyCredential(self.doc_key)
+        # Clientes (la ingesta usa la capa de texto local y recurre al OCR con caché si hace falta)
+        self.ingestion = IngestionService(
+            mode=text_mode,
+            doc_endpoint=self.doc_endpoint,
+            doc_key=self.doc_key,
+            parse_workers=parse_workers
         )
 
         self.ai_client = AzureOpenAI(
             api_version="2024-12-01-preview",
             azure_endpoint=self.aoai_endpoint,
             api_key=self.aoai_key,
+            max_retries=0,
         )
+        self._async_ai_client = None
+        # Reintentos con backoff / Retry-After y circuit breaker compartidos con los demás agentes
+        self.resilience = get_resilience("openai")
+        # Tope de tokens de entrada: CVs muy largos se recortan antes de enviarse (LLM_MAX_INPUT_TOKENS)
+        self.budgeter = PromptBudgeter()
+        # Limpieza del texto OCR antes de GPT (CV_CLEANING_ENABLED=0 la desactiva)
+        clean = os.getenv("CV_CLEANING_ENABLED", "1").lower() in ("1", "true", "yes")
+        self.cleaner = CVTextCleaner(counter=self.budgeter.counter) if clean else None
         
         # Prompt del sistema
         self.system_prompt = """
@@ -59,29 +79,239 @@ class ExtractorAgent:
         }
         """
 
+    @property
+    def async_ai_client(self):
+        """Cliente AsyncAzureOpenAI para las variantes a* (se crea al primer uso)"""
+        if self._async_ai_client is None:
+            self._async_ai_client = AsyncAzureOpenAI(
+                api_version="2024-12-01-preview",
+                azure_endpoint=self.aoai_endpoint,
+                api_key=self.aoai_key,
+                max_retries=0,
+            )
+        return self._async_ai_client
+
     def _extract_text_from_pdf(self, file_path):
         try:
-            with open(file_path, "rb") as f:
-                poller = self.doc_client.begin_analyze_document("prebuilt-read", document=f)
-            result = poller.result()
-            return " ".join([line.content for page in result.pages for line in page.lines])
+            # PDF o .docx: la ingesta detecta el formato por su contenido
+            result = self.ingestion.extract_text_from_file(file_path)
+            return self._cv_text(result)
         except Exception as e:
             print(f"Error OCR: {e}")
             return None
 
-    def process_cv(self, file_path):
-        raw_text = self._extract_text_from_pdf(file_path)
+    def extract_cv_text(self, data):
+        """Texto del CV en memoria (capa local, .docx u OCR); None si falla"""
+        try:
+            result = self.ingestion.extract_text(data)
+            return self._cv_text(result)
+        except Exception as e:
+            print(f"Error OCR: {e}")
+            return None
+
+    def _cv_text(self, result):
+        """Texto de un resultado de la ingesta, limpio de cabeceras/pies y plantilla"""
+        if self.cleaner is None:
+            return result["text"]
+
+        text, report = self.cleaner.clean_result(result)
+        if report["tokens_saved"] > 0:
+            print(f"Limpieza CV: {report['original_tokens']} → {report['cleaned_tokens']} tokens "
+                  f"(-{report['tokens_saved']}, {report['removed_lines']})")
+        return text
+
+    def _cv_messages(self, raw_text):
+        def build(text):
+            return [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": f"CV Text:\n{text}"}
+            ]
+
+        raw_text, report = self.budgeter.fit_prompt(build(""), raw_text, CV_PRIORITY_PATTERNS)
+        if report["trimmed"]:
+            print(f"CV recortado: {report['original_tokens']} → {report['final_tokens']} tokens "
+                  f"({report['dropped_lines']} líneas omitidas)")
+        return build(raw_text)
+
+    @staticmethod
+    def _parse_profile(response):
+        return ExtractorAgent._parse_profile_content(response.choices[0].message.content)
+
+    @staticmethod
+    def _parse_profile_content(content):
+        return json.loads(content.replace("```json", "").replace("```", ""))
+
+    def process_cv_text(self, raw_text):
+        """Envía el texto del CV a GPT y devuelve el perfil estructurado"""
         if not raw_text: return {"error": "OCR falló"}
         
         try:
-            response = self.ai_client.chat.completions.create(
+            response = self.resilience.call(
+                self.ai_client.chat.completions.create,
                 model=self.aoai_deployment, # Aquí usa la variable limpia
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": f"CV Text:\n{raw_text}"}
-                ],
+                messages=self._cv_messages(raw_text),
             )
-            content = response.choices[0].message.content.replace("```json", "").replace("```", "")
-            return json.loads(content)
+            return self._parse_profile(response)
+        except Exception as e:
+            return {"error": f"GPT falló: {str(e)}"}
+
+    async def aprocess_cv_text(self, raw_text):
+        """Versión asíncrona de process_cv_text (AsyncAzureOpenAI)"""
+        if not raw_text: return {"error": "OCR falló"}
+
+        try:
+            response = await self.resilience.acall(
+                self.async_ai_client.chat.completions.create,
+                model=self.aoai_deployment,
+                messages=self._cv_messages(raw_text),
+            )
+            return self._parse_profile(response)
+        except Exception as e:
+            return {"error": f"GPT falló: {str(e)}"}
+
+    async def aextract_cv_text(self, data):
+        """Versión asíncrona de extract_cv_text (OCR con el cliente aio)"""
+        try:
+            result = await self.ingestion.aextract_text(data)
+            return self._cv_text(result)
+        except Exception as e:
+            print(f"Error OCR: {e}")
+            return None
+
+    def process_cv(self, file_path):
+        raw_text = self._extract_text_from_pdf(file_path)
+        return self.process_cv_text(raw_text)
+
+    def process_cv_bytes(self, data):
+        """
+        Procesa un CV en memoria sin pasar por un archivo temporal.
+
+        Args:
+            data: bytes, memoryview u objeto tipo archivo (p.ej. UploadedFile de Streamlit)
+        """
+        raw_text = self.extract_cv_text(data)
+        return self.process_cv_text(raw_text)
+
+    async def aprocess_cv(self, file_path):
+        """Versión asíncrona de process_cv"""
+        try:
+            data = await asyncio.to_thread(self._read_file, file_path)
         except Exception as e:
-            return {"error": f"GPT falló: {str(e)}"}
\ No newline at end of file
+            print(f"Error OCR: {e}")
+            return self.process_cv_text(None)
+        return await self.aprocess_cv_bytes(data)
+
+    async def aprocess_cv_bytes(self, data):
+        """Versión asíncrona de process_cv_bytes"""
+        raw_text = await self.aextract_cv_text(data)
+        return await self.aprocess_cv_text(raw_text)
+
+    async def aprocess_cv_batch(self, sources, max_concurrency=None, llm_workers=None):
+        """
+        Versión asíncrona de process_cv_batch: OCR con el cliente aio y como
+        máximo llm_workers llamadas a GPT en vuelo.
+        """
+        extractions = await self.ingestion.aextract_many(sources, max_concurrency=max_concurrency)
+
+        llm_workers = llm_workers or int(os.getenv("LLM_MAX_WORKERS", "4"))
+        semaphore = asyncio.Semaphore(max(1, llm_workers))
+
+        async def run(extraction):
+            if isinstance(extraction, Exception):
+                print(f"Error OCR: {extraction}")
+                return await self.aprocess_cv_text(None)
+            async with semaphore:
+                return await self.aprocess_cv_text(self._cv_text(extraction))
+
+        return await asyncio.gather(*(run(e) for e in extractions))
+
+    @staticmethod
+    def _read_file(file_path):
+        if not os.path.exists(file_path):
+            raise Exception(f"❌ Archivo no encontrado: {file_path}")
+        with open(file_path, "rb") as f:
+            return f.read()
+
+    def process_cv_batch(self, sources, max_concurrency=None, llm_workers=None):
+        """
+        Procesa varios CVs: el parsing local se reparte entre procesos (parse_workers),
+        el OCR de todos se envía a Azure en paralelo y luego los textos pasan por GPT
+        en un pool de hilos (llamadas de red).
+
+        Args:
+            sources: Lista de CVs (bytes, memoryview u objetos tipo archivo)
+            max_concurrency: Máximo de análisis OCR simultáneos
+            llm_workers: Máximo de llamadas a GPT simultáneas (por defecto LLM_MAX_WORKERS o 4)
+
+        Returns:
+            list: Un perfil (o {"error": ...}) por CV, en el orden de entrada
+        """
+        extractions = self.ingestion.extract_many(sources, max_concurrency=max_concurrency)
+
+        texts = []
+        for extraction in extractions:
+            if isinstance(extraction, Exception):
+                print(f"Error OCR: {extraction}")
+                texts.append(None)
+                continue
+            texts.append(self._cv_text(extraction))
+
+        llm_workers = llm_workers or int(os.getenv("LLM_MAX_WORKERS", "4"))
+        with ThreadPoolExecutor(max_workers=max(1, llm_workers)) as pool:
+            return list(pool.map(self.process_cv_text, texts))
+
+    def process_cv_batch_offline(self, sources, name=None, timeout=None, batch_jobs=None, max_concurrency=None):
+        """
+        Procesa muchos CVs con la Batch API (re-procesos nocturnos: sin latencia
+        interactiva y a menor costo). La extracción de texto es la misma que en
+        process_cv_batch; las llamadas a GPT se escriben en JSONL, se envían y
+        se espera el resultado.
+
+        Args:
+            sources: Lista de CVs (bytes, memoryview u objetos tipo archivo)
+            name: Prefijo de los archivos JSONL (BATCH_WORK_DIR)
+            timeout: Segundos máximos esperando el batch
+            batch_jobs: BatchJobService a usar (por defecto, sobre ai_client)
+
+        Returns:
+            list: Un perfil (o {"error": ...}) por CV, en el orden de entrada
+        """
+        batch_jobs = batch_jobs or BatchJobService(self.ai_client, self.aoai_deployment, resilience=self.resilience)
+        profiles = [None] * len(sources)
+        requests = []
+
+        for i, extraction in enumerate(self.ingestion.extract_many(sources, max_concurrency=max_concurrency)):
+            if isinstance(extraction, Exception):
+                print(f"Error OCR: {extraction}")
+                profiles[i] = self.process_cv_text(None)
+                continue
+            text = self._cv_text(extraction)
+            if not text:
+                profiles[i] = self.process_cv_text(None)
+                continue
+            requests.append(batch_jobs.build_request(f"cv-{i}", self._cv_messages(text)))
+
+        for custom_id, content in batch_jobs.run(requests, name=name or "cvs", timeout=timeout).items():
+            i = int(custom_id.split("-", 1)[1])
+            try:
+                if isinstance(content, Exception):
+                    raise content
+                profiles[i] = self._parse_profile_content(content)
+            except Exception as e:
+                profiles[i] = {"error": f"GPT falló: {str(e)}"}
+
+        return profiles
+
+    def process_cv_zip(self, source, report=None):
+        """
+        Procesa un paquete ZIP de CVs miembro por miembro (sin descomprimirlo completo).
+
+        Args:
+            source: Ruta al ZIP u objeto tipo archivo (p.ej. UploadedFile de Streamlit)
+            report: dict opcional con los contadores de ZipIngestionService.iter_members
+
+        Yields:
+            (nombre del archivo, perfil o {"error": ...}) por cada CV soportado
+        """
+        for name, data in ZipIngestionService().iter_members(source, report):
+            yield name, self.process_cv_bytes(data)
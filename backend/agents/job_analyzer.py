@@ -1,13 +1,17 @@
 """
 Job Analyzer Agent - Agente especializado en analizar ofertas de trabajo
 """
+import os
 import json
+import asyncio
 import logging
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from datetime import datetime
 
 from backend.services.azure_openai_service import AzureOpenAIService
-from backend.services.document_intelligence_service import DocumentIntelligenceService
+from backend.services.ingestion_service import IngestionService
+from backend.services.token_service import PromptBudgeter, JOB_PRIORITY_PATTERNS
 from backend.models.job import Job, JobAnalysis
 from backend.utils.prompts import (
     JOB_ANALYSIS_SYSTEM_PROMPT,
@@ -23,41 +27,91 @@ logger = logging.getLogger(__name__)
 class JobAnalyzerAgent:
     """Agente especializado en analizar ofertas de trabajo"""
 
-    def __init__(self):
+    def __init__(self, parse_workers: Optional[int] = None):
         logger.info(" Inicializando Job Analyzer Agent...")
         self.openai_service = AzureOpenAIService()
-        self.doc_service = DocumentIntelligenceService()
+        # parse_workers > 1 reparte el parsing local de lotes de PDFs entre procesos
+        self.ingestion = IngestionService(parse_workers=parse_workers)
+        # Tope de tokens de entrada para el análisis (LLM_MAX_INPUT_TOKENS)
+        self.budgeter = PromptBudgeter()
         logger.info(" Job Analyzer Agent listo")
 
     # -------------------------------------------------------------------------
-    #     PDF → Texto (usando Form Recognizer V3)
+    #     PDF → Texto (capa de texto local o Form Recognizer V3)
     # -------------------------------------------------------------------------
     def extract_text_from_pdf(self, pdf_path: str) -> Dict:
-        """Extrae texto desde PDF usando Form Recognizer clásico (prebuilt-read)"""
+        """
+        Extrae texto desde PDF (capa de texto local; prebuilt-read si no es suficiente).
+        También acepta .docx, que se lee localmente sin OCR.
+        """
         logger.info(f" Extrayendo texto de PDF: {pdf_path}")
 
         try:
-            result = self.doc_service.extract_text_from_pdf(pdf_path)
+            result = self.ingestion.extract_text_from_file(pdf_path)
+            return self._build_extraction(result)
 
-            text = result["text"]
-            pages = result["pages"]
+        except Exception as e:
+            logger.error(f" Error al extraer texto: {str(e)}")
+            raise
 
-            logger.info(f" Extracción completada")
-            logger.info(f"   → {len(text)} caracteres")
-            logger.info(f"   → {pages} páginas")
+    def extract_text_from_bytes(self, data) -> Dict:
+        """Extrae texto desde un PDF en memoria (bytes, memoryview u objeto tipo archivo)"""
+        logger.info(" Extrayendo texto de PDF en memoria")
 
-            return {
-                "text": text,
-                "metadata": {
-                    "pages": pages,
-                    "tables_count": 0
-                }
-            }
+        try:
+            result = self.ingestion.extract_text(data)
+            return self._build_extraction(result)
 
         except Exception as e:
             logger.error(f" Error al extraer texto: {str(e)}")
             raise
 
+    def extract_texts_from_bytes(self, sources, max_concurrency: Optional[int] = None) -> List[Dict]:
+        """
+        Extrae texto de varios PDFs; los que requieren OCR se analizan en paralelo.
+
+        Returns:
+            list: Una extracción por documento en el orden de entrada
+        """
+        logger.info(f" Extrayendo texto de {len(sources)} PDF(s)")
+
+        extractions = []
+        for result in self.ingestion.extract_many(sources, max_concurrency=max_concurrency):
+            if isinstance(result, Exception):
+                logger.error(f" Error al extraer texto: {str(result)}")
+                raise result
+            extractions.append(self._build_extraction(result))
+        return extractions
+
+    def _build_extraction(self, result: Dict) -> Dict:
+        text = result["text"]
+        pages = result["pages"]
+
+        logger.info(f" Extracción completada")
+        logger.info(f"   → {len(text)} caracteres")
+        logger.info(f"   → {pages} páginas")
+        logger.info(f"   → origen: {result['source']}")
+
+        metadata = {
+            "pages": pages,
+            "tables_count": len(result["tables"]),
+            "text_source": result["source"],
+            "ocr_pages": result.get("ocr_pages", 0)
+        }
+
+        # Geometría compacta de las líneas OCR (base64), para reutilizarla sin repetir el OCR
+        if result.get("layout") is not None:
+            metadata["ocr_layout"] = result["layout"].to_base64()
+
+        if result.get("preprocessing"):
+            metadata["ocr_preprocessing"] = result["preprocessing"]
+            logger.info(f"   → bytes ahorrados antes del OCR: {result['preprocessing']['bytes_saved']}")
+
+        return {
+            "text": text,
+            "metadata": metadata
+        }
+
     # -------------------------------------------------------------------------
     #     Análisis del job description con Azure OpenAI
     # -------------------------------------------------------------------------
@@ -66,27 +120,57 @@ class JobAnalyzerAgent:
         logger.info(" Analizando descripción del trabajo con IA...")
 
         try:
-            user_prompt = get_job_analysis_prompt(job_text)
-
             response = self.openai_service.analyze_with_system_prompt(
                 system_prompt=JOB_ANALYSIS_SYSTEM_PROMPT,
-                user_content=user_prompt,
+                user_content=self._job_prompt(job_text),
                 temperature=None,
                 json_mode=True
             )
+            return self._parse_analysis(response)
 
-            analysis_dict = json.loads(response)
-            analysis = JobAnalysis(**analysis_dict)
+        except Exception as e:
+            logger.error(f" Error procesando análisis de IA: {str(e)}")
+            raise
 
-            logger.info(f" Análisis completado → {analysis.title}")
-            return analysis
+    async def aanalyze_job_description(self, job_text: str) -> JobAnalysis:
+        """Versión asíncrona de analyze_job_description (AsyncAzureOpenAI)"""
+        logger.info(" Analizando descripción del trabajo con IA...")
+
+        try:
+            response = await self.openai_service.aanalyze_with_system_prompt(
+                system_prompt=JOB_ANALYSIS_SYSTEM_PROMPT,
+                user_content=self._job_prompt(job_text),
+                temperature=None,
+                json_mode=True
+            )
+            return self._parse_analysis(response)
 
-        except json.JSONDecodeError:
-            raise Exception("La respuesta del modelo NO contiene JSON válido")
         except Exception as e:
             logger.error(f" Error procesando análisis de IA: {str(e)}")
             raise
 
+    def _job_prompt(self, job_text: str) -> str:
+        """Prompt de análisis con la oferta recortada al presupuesto de tokens"""
+        base = [
+            {"role": "system", "content": JOB_ANALYSIS_SYSTEM_PROMPT},
+            {"role": "user", "content": get_job_analysis_prompt("")}
+        ]
+        job_text, report = self.budgeter.fit_prompt(base, job_text, JOB_PRIORITY_PATTERNS)
+        if report["trimmed"]:
+            logger.info(f"   → oferta recortada: {report['original_tokens']} → {report['final_tokens']} tokens")
+        return get_job_analysis_prompt(job_text)
+
+    @staticmethod
+    def _parse_analysis(response: str) -> JobAnalysis:
+        try:
+            analysis_dict = json.loads(response)
+        except json.JSONDecodeError:
+            raise Exception("La respuesta del modelo NO contiene JSON válido")
+
+        analysis = JobAnalysis(**analysis_dict)
+        logger.info(f" Análisis completado → {analysis.title}")
+        return analysis
+
     # -------------------------------------------------------------------------
     #     Resumen ejecutivo del job
     # -------------------------------------------------------------------------
@@ -94,12 +178,26 @@ class JobAnalyzerAgent:
         logger.info(" Generando resumen ejecutivo...")
 
         try:
-            data = analysis.model_dump()
-            user_prompt = get_summary_prompt(data)
-
             summary = self.openai_service.analyze_with_system_prompt(
                 system_prompt=JOB_SUMMARY_SYSTEM_PROMPT,
-                user_content=user_prompt,
+                user_content=get_summary_prompt(analysis.model_dump()),
+                json_mode=False
+            )
+
+            return summary.strip()
+
+        except Exception as e:
+            logger.error(f" Error generando resumen: {str(e)}")
+            raise
+
+    async def agenerate_executive_summary(self, analysis: JobAnalysis) -> str:
+        """Versión asíncrona de generate_executive_summary"""
+        logger.info(" Generando resumen ejecutivo...")
+
+        try:
+            summary = await self.openai_service.aanalyze_with_system_prompt(
+                system_prompt=JOB_SUMMARY_SYSTEM_PROMPT,
+                user_content=get_summary_prompt(analysis.model_dump()),
                 json_mode=False
             )
 
@@ -121,18 +219,30 @@ class JobAnalyzerAgent:
 
         try:
             extraction = self.extract_text_from_pdf(pdf_path)
-            analysis = self.analyze_job_description(extraction["text"])
+            job = self._build_job(extraction, generate_summary)
 
-            job = Job(
-                original_text=extraction["text"],
-                document_metadata=extraction["metadata"],
-                analysis=analysis,
-                status="analyzed"
-            )
+            duration = (datetime.now() - start).total_seconds()
+            logger.info(f" COMPLETADO en {duration:.2f} segundos\n")
+
+            return job
+
+        except Exception as e:
+            logger.error(f" ERROR procesando PDF: {str(e)}")
+            raise
+
+    # -------------------------------------------------------------------------
+    #     Procesar job desde bytes (uploads sin archivo temporal)
+    # -------------------------------------------------------------------------
+    def process_job_from_bytes(self, data, generate_summary: bool = True) -> Job:
+        logger.info("\n" + "=" * 70)
+        logger.info(" PROCESANDO TRABAJO DESDE PDF EN MEMORIA")
+        logger.info("=" * 70)
 
-            if generate_summary:
-                summary = self.generate_executive_summary(analysis)
-                job.document_metadata["executive_summary"] = summary
+        start = datetime.now()
+
+        try:
+            extraction = self.extract_text_from_bytes(data)
+            job = self._build_job(extraction, generate_summary)
 
             duration = (datetime.now() - start).total_seconds()
             logger.info(f" COMPLETADO en {duration:.2f} segundos\n")
@@ -143,6 +253,57 @@ class JobAnalyzerAgent:
             logger.error(f" ERROR procesando PDF: {str(e)}")
             raise
 
+    # -------------------------------------------------------------------------
+    #     Procesar varios jobs (parsing en procesos, IA en hilos)
+    # -------------------------------------------------------------------------
+    def process_jobs_from_bytes(self, sources, generate_summary: bool = True,
+                                max_concurrency: Optional[int] = None,
+                                llm_workers: Optional[int] = None) -> List[Job]:
+        """
+        Procesa varios PDFs de ofertas: la extracción usa el pool de parsing de la
+        ingesta y el análisis con Azure OpenAI se ejecuta en un pool de hilos.
+
+        Returns:
+            list: Un Job por documento en el orden de entrada
+        """
+        start = datetime.now()
+        extractions = self.extract_texts_from_bytes(sources, max_concurrency=max_concurrency)
+
+        llm_workers = llm_workers or int(os.getenv("LLM_MAX_WORKERS", "4"))
+        with ThreadPoolExecutor(max_workers=max(1, llm_workers)) as pool:
+            jobs = list(pool.map(lambda extraction: self._build_job(extraction, generate_summary), extractions))
+
+        logger.info(f" {len(jobs)} trabajo(s) procesados en {(datetime.now() - start).total_seconds():.2f}s")
+        return jobs
+
+    @staticmethod
+    def _new_job(text: str, metadata: Dict, analysis: JobAnalysis) -> Job:
+        return Job(
+            original_text=text,
+            document_metadata=metadata,
+            analysis=analysis,
+            status="analyzed"
+        )
+
+    def _build_job(self, extraction: Dict, generate_summary: bool) -> Job:
+        analysis = self.analyze_job_description(extraction["text"])
+        job = self._new_job(extraction["text"], extraction["metadata"], analysis)
+
+        if generate_summary:
+            summary = self.generate_executive_summary(analysis)
+            job.document_metadata["executive_summary"] = summary
+
+        return job
+
+    async def _abuild_job(self, extraction: Dict, generate_summary: bool) -> Job:
+        analysis = await self.aanalyze_job_description(extraction["text"])
+        job = self._new_job(extraction["text"], extraction["metadata"], analysis)
+
+        if generate_summary:
+            job.document_metadata["executive_summary"] = await self.agenerate_executive_summary(analysis)
+
+        return job
+
     # -------------------------------------------------------------------------
     #     Procesar job desde texto
     # -------------------------------------------------------------------------
@@ -154,18 +315,74 @@ class JobAnalyzerAgent:
         start = datetime.now()
 
         try:
-            analysis = self.analyze_job_description(job_text)
+            job = self._build_job(self._text_extraction(job_text), generate_summary)
+            logger.info(f" COMPLETADO en {(datetime.now() - start).total_seconds():.2f}s\n")
+            return job
 
-            job = Job(
-                original_text=job_text,
-                document_metadata={"source": "text_input"},
-                analysis=analysis,
-                status="analyzed"
-            )
+        except Exception as e:
+            logger.error(f" ERROR procesando texto: {str(e)}")
+            raise
+
+    @staticmethod
+    def _text_extraction(job_text: str) -> Dict:
+        return {"text": job_text, "metadata": {"source": "text_input"}}
+
+    # -------------------------------------------------------------------------
+    #     Variantes asíncronas (servidores async: sin un hilo por petición)
+    # -------------------------------------------------------------------------
+    async def aextract_text_from_pdf(self, pdf_path: str) -> Dict:
+        """Versión asíncrona de extract_text_from_pdf"""
+        logger.info(f" Extrayendo texto de PDF: {pdf_path}")
+
+        try:
+            if not os.path.exists(pdf_path):
+                raise Exception(f"❌ Archivo no encontrado: {pdf_path}")
+            data = await asyncio.to_thread(self._read_file, pdf_path)
+            return self._build_extraction(await self.ingestion.aextract_text(data))
+
+        except Exception as e:
+            logger.error(f" Error al extraer texto: {str(e)}")
+            raise
 
-            if generate_summary:
-                job.document_metadata["executive_summary"] = self.generate_executive_summary(analysis)
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
 
+    async def aprocess_job_from_pdf(self, pdf_path: str, generate_summary: bool = True) -> Job:
+        """Versión asíncrona de process_job_from_pdf"""
+        start = datetime.now()
+
+        try:
+            extraction = await self.aextract_text_from_pdf(pdf_path)
+            job = await self._abuild_job(extraction, generate_summary)
+            logger.info(f" COMPLETADO en {(datetime.now() - start).total_seconds():.2f} segundos\n")
+            return job
+
+        except Exception as e:
+            logger.error(f" ERROR procesando PDF: {str(e)}")
+            raise
+
+    async def aprocess_job_from_bytes(self, data, generate_summary: bool = True) -> Job:
+        """Versión asíncrona de process_job_from_bytes"""
+        start = datetime.now()
+
+        try:
+            extraction = self._build_extraction(await self.ingestion.aextract_text(data))
+            job = await self._abuild_job(extraction, generate_summary)
+            logger.info(f" COMPLETADO en {(datetime.now() - start).total_seconds():.2f} segundos\n")
+            return job
+
+        except Exception as e:
+            logger.error(f" ERROR procesando PDF: {str(e)}")
+            raise
+
+    async def aprocess_job_from_text(self, job_text: str, generate_summary: bool = True) -> Job:
+        """Versión asíncrona de process_job_from_text"""
+        start = datetime.now()
+
+        try:
+            job = await self._abuild_job(self._text_extraction(job_text), generate_summary)
             logger.info(f" COMPLETADO en {(datetime.now() - start).total_seconds():.2f}s\n")
             return job
 
@@ -173,6 +390,76 @@ class JobAnalyzerAgent:
             logger.error(f" ERROR procesando texto: {str(e)}")
             raise
 
+    # -------------------------------------------------------------------------
+    #     Modo offline (Batch API): muchas ofertas sin latencia interactiva
+    # -------------------------------------------------------------------------
+    def process_job_texts_offline(self, job_texts: List[str], generate_summary: bool = False,
+                                  name: Optional[str] = None, timeout: Optional[float] = None,
+                                  batch_jobs=None) -> List:
+        """
+        Analiza muchas ofertas con la Batch API. Con generate_summary se envía
+        un segundo batch con los resúmenes de las que se analizaron bien.
+
+        Returns:
+            list: Un Job (o la excepción de esa oferta) por texto, en el orden de entrada
+        """
+        return self._jobs_offline([self._text_extraction(t) for t in job_texts],
+                                  generate_summary, name, timeout, batch_jobs)
+
+    def process_jobs_from_bytes_offline(self, sources, generate_summary: bool = False,
+                                        name: Optional[str] = None, timeout: Optional[float] = None,
+                                        batch_jobs=None, max_concurrency: Optional[int] = None) -> List:
+        """Como process_job_texts_offline, a partir de PDFs (extracción igual que process_jobs_from_bytes)"""
+        extractions = []
+        for result in self.ingestion.extract_many(sources, max_concurrency=max_concurrency):
+            extractions.append(result if isinstance(result, Exception) else self._build_extraction(result))
+        return self._jobs_offline(extractions, generate_summary, name, timeout, batch_jobs)
+
+    def _jobs_offline(self, extractions: List, generate_summary: bool, name: Optional[str],
+                      timeout: Optional[float], batch_jobs) -> List:
+        batch_jobs = batch_jobs or self.openai_service.batch_jobs()
+        name = name or "jobs"
+        jobs: List = list(extractions)
+
+        requests = []
+        for i, extraction in enumerate(extractions):
+            if isinstance(extraction, Exception):
+                continue
+            messages, response_format = self.openai_service.build_system_request(
+                JOB_ANALYSIS_SYSTEM_PROMPT, self._job_prompt(extraction["text"]), json_mode=True
+            )
+            requests.append(batch_jobs.build_request(f"job-{i}", messages, response_format=response_format))
+
+        logger.info(f" Enviando {len(requests)} oferta(s) a la Batch API")
+        for custom_id, content in batch_jobs.run(requests, name=f"{name}-analysis", timeout=timeout).items():
+            i = int(custom_id.split("-", 1)[1])
+            try:
+                if isinstance(content, Exception):
+                    raise content
+                extraction = extractions[i]
+                jobs[i] = self._new_job(extraction["text"], extraction["metadata"], self._parse_analysis(content))
+            except Exception as e:
+                logger.error(f" Error procesando análisis de IA ({custom_id}): {str(e)}")
+                jobs[i] = e
+
+        if generate_summary:
+            requests = []
+            for i, job in enumerate(jobs):
+                if isinstance(job, Job):
+                    messages, _ = self.openai_service.build_system_request(
+                        JOB_SUMMARY_SYSTEM_PROMPT, get_summary_prompt(job.analysis.model_dump()), json_mode=False
+                    )
+                    requests.append(batch_jobs.build_request(f"summary-{i}", messages))
+
+            for custom_id, content in batch_jobs.run(requests, name=f"{name}-summary", timeout=timeout).items():
+                i = int(custom_id.split("-", 1)[1])
+                if isinstance(content, Exception):
+                    logger.error(f" Error generando resumen ({custom_id}): {str(content)}")
+                    continue
+                jobs[i].document_metadata["executive_summary"] = content.strip()
+
+        return jobs
+
     # -------------------------------------------------------------------------
     #     Guardado en JSON
     # -------------------------------------------------------------------------
@@ -1,4 +1,5 @@
 """Models package"""
 from .job import Job, JobAnalysis
+from .ocr_layout import OCRLayout
 
-__all__ = ['Job', 'JobAnalysis']
+__all__ = ['Job', 'JobAnalysis', 'OCRLayout']
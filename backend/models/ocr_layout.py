@@ -0,0 +1,189 @@
+"""
+Representación compacta de la geometría de líneas OCR (sin depender del SDK de Azure)
+"""
+import sys
+import base64
+import struct
+from array import array
+from typing import List, Optional, Tuple
+
+_MAGIC = b"OCRL"
+_HEADER = struct.Struct("<4sBIII")  # magic, versión, páginas, líneas, longitud del texto
+_UNITS = ["inch", "pixel"]
+_POINTS_PER_LINE = 4
+
+
+def _to_le(arr: array) -> bytes:
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _from_le(typecode: str, data: bytes) -> array:
+    arr = array(typecode)
+    arr.frombytes(data)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
+
+
+class OCRLayout:
+    """
+    Geometría de las líneas de un documento en arrays planos.
+
+    Por línea se guarda: índice de página, offset y longitud dentro del texto
+    extraído (las líneas unidas con "\\n") y el polígono como 4 puntos (x, y).
+    Por página: ancho, alto y unidad ("inch" para PDF, "pixel" para imágenes).
+    """
+
+    VERSION = 1
+
+    def __init__(self):
+        self.page_sizes = array("f")    # ancho, alto por página
+        self.page_units = array("B")    # índice en _UNITS
+        self.line_page = array("H")
+        self.line_offset = array("I")
+        self.line_length = array("I")
+        self.polygons = array("f")      # 8 valores por línea
+        self.text_length = 0
+
+    # -------------------------------------------------------------------------
+    #     Construcción
+    # -------------------------------------------------------------------------
+    def add_page(self, width: float, height: float, unit: Optional[str] = "inch"):
+        self.page_sizes.extend((width or 0.0, height or 0.0))
+        self.page_units.append(_UNITS.index(unit) if unit in _UNITS else 0)
+
+    def add_line(self, content: str, polygon: List[Tuple[float, float]]):
+        """Agrega una línea a la última página; su offset sigue al de la línea anterior"""
+        coords = []
+        for x, y in list(polygon or [])[:_POINTS_PER_LINE]:
+            coords.extend((x, y))
+        coords.extend([0.0] * (2 * _POINTS_PER_LINE - len(coords)))
+
+        self.line_page.append(self.page_count - 1)
+        self.line_offset.append(self.text_length)
+        self.line_length.append(len(content))
+        self.polygons.extend(coords)
+        self.text_length += len(content) + 1  # + "\n"
+
+    def add_text_page(self, text_length: int, width: float = 0.0, height: float = 0.0, unit: Optional[str] = "inch"):
+        """Agrega una página sin líneas OCR (texto local) que ocupa text_length caracteres"""
+        self.add_page(width, height, unit)
+        self.text_length += text_length
+
+    def copy_page(self, other: "OCRLayout", page_index: int):
+        """Copia una página de otro layout (tamaño y líneas) al final de este"""
+        width, height, unit = other.page_size(page_index)
+        self.add_page(width, height, unit)
+
+        page = self.page_count - 1
+        for i in other.lines_on_page(page_index):
+            self.line_page.append(page)
+            self.line_offset.append(self.text_length)
+            self.line_length.append(other.line_length[i])
+            self.polygons.extend(other.polygons[8 * i:8 * i + 8])
+            self.text_length += other.line_length[i] + 1
+
+    @classmethod
+    def from_result(cls, result) -> "OCRLayout":
+        """Construye el layout desde un AnalyzeResult del SDK (o un objeto equivalente)"""
+        layout = cls()
+        for page in result.pages:
+            layout.add_page(getattr(page, "width", 0.0), getattr(page, "height", 0.0), getattr(page, "unit", "inch"))
+            for line in page.lines:
+                polygon = [(p.x, p.y) for p in (getattr(line, "polygon", None) or [])]
+                layout.add_line(line.content, polygon)
+        return layout
+
+    def extend(self, other: "OCRLayout"):
+        """Concatena el layout de un bloque de páginas posterior (OCR por bloques)"""
+        page_shift = self.page_count
+        offset_shift = self.text_length
+
+        self.page_sizes.extend(other.page_sizes)
+        self.page_units.extend(other.page_units)
+        self.line_page.extend(p + page_shift for p in other.line_page)
+        self.line_offset.extend(o + offset_shift for o in other.line_offset)
+        self.line_length.extend(other.line_length)
+        self.polygons.extend(other.polygons)
+        self.text_length += other.text_length
+
+    # -------------------------------------------------------------------------
+    #     Consulta
+    # -------------------------------------------------------------------------
+    @property
+    def page_count(self) -> int:
+        return len(self.page_units)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_page)
+
+    def page_size(self, page_index: int) -> Tuple[float, float, str]:
+        return (
+            self.page_sizes[2 * page_index],
+            self.page_sizes[2 * page_index + 1],
+            _UNITS[self.page_units[page_index]],
+        )
+
+    def line(self, i: int):
+        """(página, offset, longitud, [(x, y) * 4]) de la línea i"""
+        coords = self.polygons[8 * i:8 * i + 8]
+        return (
+            self.line_page[i],
+            self.line_offset[i],
+            self.line_length[i],
+            list(zip(coords[0::2], coords[1::2])),
+        )
+
+    def lines_on_page(self, page_index: int) -> List[int]:
+        return [i for i, p in enumerate(self.line_page) if p == page_index]
+
+    # -------------------------------------------------------------------------
+    #     Serialización
+    # -------------------------------------------------------------------------
+    def to_bytes(self) -> bytes:
+        header = _HEADER.pack(_MAGIC, self.VERSION, self.page_count, self.line_count, self.text_length)
+        return b"".join([
+            header,
+            _to_le(self.page_sizes),
+            self.page_units.tobytes(),
+            _to_le(self.line_page),
+            _to_le(self.line_offset),
+            _to_le(self.line_length),
+            _to_le(self.polygons),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "OCRLayout":
+        magic, version, n_pages, n_lines, text_length = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != cls.VERSION:
+            raise ValueError("❌ Formato de layout OCR no reconocido")
+
+        layout = cls()
+        layout.text_length = text_length
+
+        pos = _HEADER.size
+        sections = [
+            ("page_sizes", "f", 2 * n_pages),
+            ("page_units", "B", n_pages),
+            ("line_page", "H", n_lines),
+            ("line_offset", "I", n_lines),
+            ("line_length", "I", n_lines),
+            ("polygons", "f", 8 * n_lines),
+        ]
+        for attr, typecode, count in sections:
+            size = array(typecode).itemsize * count
+            setattr(layout, attr, _from_le(typecode, data[pos:pos + size]))
+            pos += size
+
+        return layout
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    @classmethod
+    def from_base64(cls, value: str) -> "OCRLayout":
+        return cls.from_bytes(base64.b64decode(value))
@@ -0,0 +1,102 @@
+"""
+Servicio asíncrono de Azure Document Intelligence: envía muchos documentos
+a prebuilt-read y consulta sus resultados de forma concurrente
+"""
+import os
+import asyncio
+from typing import List, Optional
+
+from azure.core.credentials import AzureKeyCredential
+from azure.ai.formrecognizer.aio import DocumentAnalysisClient
+
+from backend.models.ocr_layout import OCRLayout
+from backend.services.cache_service import OCRCache
+from backend.services.document_intelligence_service import parse_read_result, parse_tables, read_document_bytes
+from backend.services.pdf_preprocessing_service import PdfImagePreprocessor
+from backend.services.resilience_service import get_resilience
+
+
+class AsyncDocumentIntelligenceService:
+    """OCR concurrente con el cliente aio de Form Recognizer (comparte el caché OCR en disco)"""
+
+    MODEL_ID = "prebuilt-read"
+
+    def __init__(self, endpoint=None, key=None, cache=None, use_cache=True, max_concurrency: Optional[int] = None,
+                 preprocess=None, resilience=None):
+        self.endpoint = endpoint or os.getenv("AZURE_DOC_ENDPOINT")
+        self.key = key or os.getenv("AZURE_DOC_KEY")
+
+        if not self.endpoint or not self.key:
+            raise ValueError("❌ Faltan AZURE_DOC_ENDPOINT o AZURE_DOC_KEY en el .env")
+
+        self.max_concurrency = max_concurrency or int(os.getenv("OCR_MAX_CONCURRENCY", "8"))
+        self.cache = cache if cache is not None else (OCRCache() if use_cache else None)
+
+        if preprocess is None:
+            preprocess = os.getenv("OCR_PREPROCESS", "0").lower() in ("1", "true", "yes")
+        self.preprocessor = PdfImagePreprocessor() if preprocess else None
+        self.resilience = resilience or get_resilience("document_intelligence")
+
+    def _create_client(self):
+        # El cliente aio queda ligado al event loop: se crea uno por lote
+        return DocumentAnalysisClient(
+            endpoint=self.endpoint,
+            credential=AzureKeyCredential(self.key),
+            retry_total=0
+        )
+
+    async def _analyze_one(self, client, data: bytes, semaphore: asyncio.Semaphore):
+        key = OCRCache.make_key(data, self.MODEL_ID) if self.cache else None
+
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                layout = OCRLayout.from_base64(cached["layout"]) if cached.get("layout") else None
+                return {"pages": cached["pages"], "preprocessing": None, "cache_hit": True, "layout": layout,
+                        "tables": cached.get("tables", [])}
+
+        report = None
+        upload = data
+        if self.preprocessor:
+            # Trabajo de CPU: se ejecuta fuera del event loop
+            upload, report = await asyncio.to_thread(self.preprocessor.preprocess, data)
+
+        async with semaphore:
+            result = await self.resilience.acall(self._begin_and_wait, client, upload)
+
+        pages, layout = parse_read_result(result)
+        tables = parse_tables(result)
+
+        if self.cache:
+            self.cache.set(key, {"model_id": self.MODEL_ID, "pages": pages, "layout": layout.to_base64(),
+                                 "tables": tables})
+
+        return {"pages": pages, "preprocessing": report, "cache_hit": False, "layout": layout, "tables": tables}
+
+    async def _begin_and_wait(self, client, upload: bytes):
+        poller = await client.begin_analyze_document(self.MODEL_ID, document=upload)
+        return await poller.result()
+
+    async def analyze_many(self, documents, max_concurrency: Optional[int] = None) -> List:
+        """
+        Analiza varios documentos en paralelo.
+
+        Args:
+            documents: Lista de PDFs (bytes, memoryview u objetos tipo archivo)
+            max_concurrency: Máximo de análisis en vuelo (por defecto OCR_MAX_CONCURRENCY)
+
+        Returns:
+            list: Un elemento por documento, en el mismo orden de entrada.
+                  Cada elemento es un dict como DocumentIntelligenceService.analyze
+                  (pages, preprocessing, cache_hit, layout, tables) o la excepción de ese documento.
+        """
+        payloads = [read_document_bytes(d) for d in documents]
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async with self._create_client() as client:
+            tasks = [self._analyze_one(client, data, semaphore) for data in payloads]
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+    def analyze_many_sync(self, documents, max_concurrency: Optional[int] = None) -> List:
+        """Versión bloqueante de analyze_many para código síncrono (Streamlit, scripts)"""
+        return asyncio.run(self.analyze_many(documents, max_concurrency))
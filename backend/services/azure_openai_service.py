@@ -2,22 +2,77 @@
 Servicio para interactuar con Azure OpenAI
 """
 import os
-from openai import AzureOpenAI
+import json
+import asyncio
+from openai import AzureOpenAI, AsyncAzureOpenAI
 from dotenv import load_dotenv
 
+from backend.services.cache_service import LLMCache
+from backend.services.resilience_service import get_resilience
+from backend.services.batch_api_service import BatchJobService
+from backend.utils.prompts import PROMPT_TEMPLATE_VERSION
+
 load_dotenv()
 
 class AzureOpenAIService:
     """Servicio para interactuar con Azure OpenAI"""
     
-    def __init__(self):
+    def __init__(self, cache=None, use_cache=None, prompt_version=None, resilience=None):
+        # Sin reintentos del SDK: los hace la capa de resiliencia compartida
         self.client = AzureOpenAI(
             api_key=os.getenv("AZURE_OPENAI_KEY"),
             api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            max_retries=0
         )
         self.deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT")
+        self._async_client = None
+
+        # Caché de respuestas (memoria + disco); LLM_CACHE_ENABLED=0 lo desactiva
+        if use_cache is None:
+            use_cache = os.getenv("LLM_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+        self.cache = cache if cache is not None else (LLMCache() if use_cache else None)
+        self.prompt_version = prompt_version or PROMPT_TEMPLATE_VERSION
+
+        # Reintentos con backoff / Retry-After y circuit breaker (compartidos por proceso)
+        self.resilience = resilience or get_resilience("openai")
     
+    @property
+    def async_client(self):
+        """Cliente AsyncAzureOpenAI (se crea al primer uso, para las variantes a*)"""
+        if self._async_client is None:
+            self._async_client = AsyncAzureOpenAI(
+                api_key=os.getenv("AZURE_OPENAI_KEY"),
+                api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                max_retries=0
+            )
+        return self._async_client
+
+    def _cache_key(self, messages, temperature, response_format):
+        if not self.cache:
+            return None
+        return LLMCache.make_key(self.deployment_name, messages, temperature, response_format, self.prompt_version)
+
+    def _build_params(self, messages, temperature, response_format):
+        params = {
+            "model": self.deployment_name,
+            "messages": messages,
+        }
+
+        # Solo agregar temperature si no es None
+        if temperature is not None:
+            params["temperature"] = temperature
+
+        if response_format:
+            params["response_format"] = response_format
+        return params
+
+    def _store(self, key, content, response_format):
+        if key and self._is_cacheable(content, response_format):
+            self.cache.set(key, content)
+        return content
+
     def chat_completion(self, messages, temperature=None, response_format=None):
         """
         Realiza una llamada al modelo de chat
@@ -28,26 +83,63 @@ class AzureOpenAIService:
             response_format: Formato de respuesta (None o {"type": "json_object"})
         
         Returns:
-            str: Respuesta del modelo
+            str: Respuesta del modelo (del caché si ya se hizo la misma llamada)
+
+        Raises:
+            openai.APIError: tal cual la lanza el SDK tras los reintentos (conserva
+                status_code y la respuesta con Retry-After)
+            CircuitOpenError: el circuit breaker rechazó la llamada
         """
-        try:
-            params = {
-                "model": self.deployment_name,
-                "messages": messages,
-            }
-            
-            # Solo agregar temperature si no es None
-            if temperature is not None:
-                params["temperature"] = temperature
-            
-            if response_format:
-                params["response_format"] = response_format
-            
-            response = self.client.chat.completions.create(**params)
-            return response.choices[0].message.content
-        
-        except Exception as e:
-            raise Exception(f"Error en Azure OpenAI: {str(e)}")
+        key = self._cache_key(messages, temperature, response_format)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        params = self._build_params(messages, temperature, response_format)
+        response = self.resilience.call(self.client.chat.completions.create, **params)
+        content = response.choices[0].message.content
+
+        return self._store(key, content, response_format)
+
+    async def achat_completion(self, messages, temperature=None, response_format=None):
+        """Versión asíncrona de chat_completion (mismo caché y mismos parámetros)"""
+        key = self._cache_key(messages, temperature, response_format)
+        if key:
+            # Lectura de un archivo pequeño: se hace fuera del event loop
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                return cached
+
+        params = self._build_params(messages, temperature, response_format)
+        response = await self.resilience.acall(self.async_client.chat.completions.create, **params)
+        content = response.choices[0].message.content
+
+        return await asyncio.to_thread(self._store, key, content, response_format)
+
+    @staticmethod
+    def _is_cacheable(content, response_format) -> bool:
+        """Las respuestas JSON inválidas no se guardan (se reintenta en la próxima llamada)"""
+        if content is None:
+            return False
+        if response_format and response_format.get("type") == "json_object":
+            try:
+                json.loads(content)
+            except ValueError:
+                return False
+        return True
+
+    def cache_stats(self):
+        """Estadísticas del caché de respuestas (None si está desactivado)"""
+        return self.cache.stats() if self.cache else None
+
+    def batch_jobs(self, **kwargs):
+        """Servicio de la Batch API sobre este deployment (debe ser de tipo GlobalBatch)"""
+        return BatchJobService(self.client, self.deployment_name, resilience=self.resilience, **kwargs)
+
+    def resilience_stats(self):
+        """Reintentos, throttling (429) y estado del circuit breaker"""
+        return self.resilience.stats()
     
     def analyze_with_system_prompt(self, system_prompt, user_content, temperature=None, json_mode=False):
         """
@@ -62,11 +154,21 @@ class AzureOpenAIService:
         Returns:
             str: Respuesta del modelo
         """
+        messages, response_format = self.build_system_request(system_prompt, user_content, json_mode)
+        return self.chat_completion(messages, temperature, response_format)
+
+    async def aanalyze_with_system_prompt(self, system_prompt, user_content, temperature=None, json_mode=False):
+        """Versión asíncrona de analyze_with_system_prompt"""
+        messages, response_format = self.build_system_request(system_prompt, user_content, json_mode)
+        return await self.achat_completion(messages, temperature, response_format)
+
+    @staticmethod
+    def build_system_request(system_prompt, user_content, json_mode):
+        """Mensajes (system + user) y response_format de una llamada; también arma las líneas de la Batch API"""
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_content}
         ]
         
         response_format = {"type": "json_object"} if json_mode else None
-        
-        return self.chat_completion(messages, temperature, response_format)
\ No newline at end of file
+        return messages, response_format
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+Modo offline con la Batch API de OpenAI / Azure OpenAI: escribe las
+peticiones de chat como JSONL, sube el archivo, crea el batch, consulta su
+estado y devuelve las respuestas indexadas por custom_id.
+
+Pensado para re-puntuar el banco de talento de noche: sin latencia
+interactiva, con el máximo de peticiones por archivo y el descuento de
+precio del batch. En Azure requiere un deployment de tipo GlobalBatch.
+"""
+import os
+import json
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Sequence
+
+from openai import AzureOpenAI
+
+
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchRequestError(Exception):
+    """Una petición del batch no obtuvo respuesta válida (error del modelo, expiración, etc.)"""
+
+    def __init__(self, custom_id: str, message: str):
+        super().__init__(f"{custom_id}: {message}")
+        self.custom_id = custom_id
+
+
+class BatchJobService:
+    """
+    Ciclo completo de un trabajo batch: write_jsonl → submit → wait → fetch_results.
+
+    Las peticiones son dicts {"custom_id", "messages", ...parámetros del chat}
+    (ver build_request). Si hay más de max_requests_per_file o el archivo
+    superaría max_file_mb (límite de 200 MB de la Batch API) se reparten en
+    varios archivos/batches, que Azure u OpenAI procesan en paralelo.
+    """
+
+    def __init__(self, client, model: str,
+                 url: Optional[str] = None,
+                 work_dir: Optional[str] = None,
+                 poll_interval: Optional[float] = None,
+                 max_requests_per_file: Optional[int] = None,
+                 max_file_mb: Optional[float] = None,
+                 completion_window: str = "24h",
+                 resilience=None):
+        self.client = client
+        self.model = model
+        # Azure expone la ruta sin el prefijo de versión
+        self.url = url or ("/chat/completions" if isinstance(client, AzureOpenAI) else "/v1/chat/completions")
+        self.work_dir = work_dir or os.getenv("BATCH_WORK_DIR", "data/batches")
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv("BATCH_POLL_SECONDS", "30"))
+        self.max_requests_per_file = max_requests_per_file or int(os.getenv("BATCH_MAX_REQUESTS", "50000"))
+        self.max_file_bytes = int((max_file_mb or float(os.getenv("BATCH_MAX_FILE_MB", "200"))) * 1024 * 1024)
+        self.completion_window = completion_window
+        # Capa de reintentos del llamador (ResilienceService); sin ella se llama directo
+        self.resilience = resilience
+
+        os.makedirs(self.work_dir, exist_ok=True)
+
+    def _call(self, fn, *args, **kwargs):
+        if self.resilience is None:
+            return fn(*args, **kwargs)
+        return self.resilience.call(fn, *args, **kwargs)
+
+    # -------------------------------------------------------------------------
+    #     JSONL
+    # -------------------------------------------------------------------------
+    def build_request(self, custom_id: str, messages: List[Dict[str, str]], **params) -> Dict[str, Any]:
+        """Línea JSONL de la Batch API para una llamada de chat"""
+        body = {"model": self.model, "messages": messages}
+        body.update({k: v for k, v in params.items() if v is not None})
+        return {"custom_id": custom_id, "method": "POST", "url": self.url, "body": body}
+
+    def write_jsonl(self, requests: Sequence[Dict[str, Any]], name: str) -> List[str]:
+        """
+        Escribe las peticiones en uno o más archivos JSONL dentro de work_dir,
+        cortando por número de peticiones y por tamaño en bytes.
+
+        Returns:
+            list: Rutas de los archivos escritos
+        """
+        ids = [r["custom_id"] for r in requests]
+        if len(set(ids)) != len(ids):
+            raise ValueError("❌ Los custom_id del batch deben ser únicos")
+
+        parts: List[List[bytes]] = []
+        size = 0
+        for request in requests:
+            line = (json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8")
+            if len(line) > self.max_file_bytes:
+                raise ValueError(f"❌ La petición {request['custom_id']} supera el tamaño máximo del archivo batch")
+            if not parts or len(parts[-1]) >= self.max_requests_per_file or size + len(line) > self.max_file_bytes:
+                parts.append([])
+                size = 0
+            parts[-1].append(line)
+            size += len(line)
+
+        paths = []
+        for part, lines in enumerate(parts):
+            path = os.path.join(self.work_dir, f"{name}-{part:03d}.jsonl")
+            with open(path, "wb") as f:
+                f.writelines(lines)
+            paths.append(path)
+        return paths
+
+    # -------------------------------------------------------------------------
+    #     Envío y seguimiento
+    # -------------------------------------------------------------------------
+    def submit(self, path: str, metadata: Optional[Dict[str, str]] = None) -> str:
+        """Sube un JSONL y crea el batch; devuelve el id del batch"""
+        with open(path, "rb") as f:
+            uploaded = self._call(self.client.files.create, file=f, purpose="batch")
+
+        params = {"input_file_id": uploaded.id, "endpoint": self.url, "completion_window": self.completion_window}
+        if metadata:
+            params["metadata"] = metadata
+        batch = self._call(self.client.batches.create, **params)
+        print(f"[Batch] {os.path.basename(path)} enviado como {batch.id}")
+        return batch.id
+
+    def wait(self, batch_ids: Sequence[str], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Consulta los batches cada poll_interval segundos hasta que todos
+        terminen (completed, failed, expired o cancelled).
+
+        Returns:
+            dict: id → objeto Batch en su estado final
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        pending = list(batch_ids)
+        finished = {}
+
+        while True:
+            for batch_id in list(pending):
+                batch = self._call(self.client.batches.retrieve, batch_id)
+                if batch.status in TERMINAL_STATUSES:
+                    counts = batch.request_counts
+                    done = f" ({counts.completed}/{counts.total})" if counts else ""
+                    print(f"[Batch] {batch_id}: {batch.status}{done}")
+                    finished[batch_id] = batch
+                    pending.remove(batch_id)
+
+            if not pending:
+                return finished
+            # No se duerme más allá del timeout
+            if deadline and time.monotonic() + self.poll_interval > deadline:
+                raise TimeoutError(f"❌ Batches sin terminar tras {timeout}s: {pending}")
+            time.sleep(self.poll_interval)
+
+    def _read_file(self, file_id: str) -> List[Dict[str, Any]]:
+        content = self._call(self.client.files.content, file_id)
+        return [json.loads(line) for line in content.text.splitlines() if line.strip()]
+
+    def fetch_results(self, batch) -> Dict[str, Any]:
+        """
+        Respuestas de un batch terminado.
+
+        Returns:
+            dict: custom_id → contenido del mensaje (str) o BatchRequestError
+        """
+        results: Dict[str, Any] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self._read_file(file_id):
+                custom_id = line.get("custom_id")
+                response = line.get("response") or {}
+                body = response.get("body") or {}
+                if response.get("status_code") == 200 and body.get("choices"):
+                    results[custom_id] = body["choices"][0]["message"]["content"]
+                else:
+                    error = line.get("error") or body.get("error") or {}
+                    message = error.get("message") or f"HTTP {response.get('status_code')}"
+                    results[custom_id] = BatchRequestError(custom_id, message)
+        return results
+
+    def collect(self, batch_ids: Sequence[str], custom_ids: Sequence[str],
+                timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Espera los batches y reúne sus respuestas. Las peticiones sin línea de
+        salida (batch fallido o expirado) quedan como BatchRequestError.
+        """
+        results: Dict[str, Any] = {}
+        for batch_id, batch in self.wait(batch_ids, timeout).items():
+            results.update(self.fetch_results(batch))
+            if batch.status != "completed":
+                print(f"[Batch] {batch_id} terminó como {batch.status}")
+
+        for custom_id in custom_ids:
+            if custom_id not in results:
+                results[custom_id] = BatchRequestError(custom_id, "sin respuesta en el batch")
+        return results
+
+    def run(self, requests: Sequence[Dict[str, Any]], name: Optional[str] = None,
+            metadata: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Escribe, envía y espera un lote completo de peticiones.
+
+        name es un prefijo: se le agrega fecha y un sufijo aleatorio para no
+        pisar los archivos de una ejecución anterior cuyo batch siga pendiente.
+
+        Returns:
+            dict: custom_id → contenido (str) o BatchRequestError
+        """
+        if not requests:
+            return {}
+        name = f"{name or 'batch'}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        batch_ids = [self.submit(path, metadata) for path in self.write_jsonl(requests, name)]
+        return self.collect(batch_ids, [r["custom_id"] for r in requests], timeout)
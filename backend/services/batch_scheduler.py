@@ -0,0 +1,143 @@
+"""
+Planificación de lotes: preflight barato de cada documento (páginas y bytes)
+y despacho del trabajo más largo primero (LPT) a un pool de workers
+"""
+import io
+import os
+import time
+import heapq
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Callable, Optional, Sequence
+
+from PyPDF2 import PdfReader
+
+
+def preflight_document(source) -> Dict[str, Any]:
+    """
+    Lee solo la estructura del documento: tamaño en bytes, tipo y número de páginas.
+
+    Args:
+        source: bytes u objeto tipo archivo con seek (se deja en la posición 0)
+
+    Returns:
+        dict con bytes, pages y kind ("pdf", "docx" o "unknown")
+    """
+    if hasattr(source, "read"):
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        source.seek(0)
+        header = source.read(5)
+        source.seek(0)
+        stream = source
+    else:
+        data = bytes(source)
+        size = len(data)
+        header = data[:5]
+        stream = io.BytesIO(data)
+
+    info = {"bytes": size, "pages": 1, "kind": "unknown"}
+    if header.startswith(b"PK"):
+        info["kind"] = "docx"
+    elif header.startswith(b"%PDF"):
+        info["kind"] = "pdf"
+        try:
+            info["pages"] = max(1, len(PdfReader(stream).pages))
+        except Exception:
+            pass  # PDF dañado: se estima como una página
+        finally:
+            if hasattr(source, "seek"):
+                source.seek(0)
+    return info
+
+
+class BatchScheduler:
+    """
+    Ordena y ejecuta un lote con la regla LPT (Longest Processing Time first).
+
+    El costo estimado de cada documento es:
+        base_seconds + seconds_per_page * páginas + seconds_per_mb * MB
+    (la parte fija representa la llamada a GPT; páginas y bytes, el OCR y la subida).
+    """
+
+    def __init__(self, workers: Optional[int] = None,
+                 base_seconds: Optional[float] = None,
+                 seconds_per_page: Optional[float] = None,
+                 seconds_per_mb: Optional[float] = None):
+        self.workers = workers or int(os.getenv("BATCH_WORKERS", "4"))
+        self.base_seconds = base_seconds if base_seconds is not None else float(os.getenv("BATCH_BASE_SECONDS", "8"))
+        self.seconds_per_page = (
+            seconds_per_page if seconds_per_page is not None else float(os.getenv("BATCH_SECONDS_PER_PAGE", "1.5"))
+        )
+        self.seconds_per_mb = (
+            seconds_per_mb if seconds_per_mb is not None else float(os.getenv("BATCH_SECONDS_PER_MB", "0.5"))
+        )
+
+    def estimate(self, info: Dict[str, Any]) -> float:
+        """Segundos estimados para un documento a partir de su preflight"""
+        return (
+            self.base_seconds
+            + self.seconds_per_page * info.get("pages", 1)
+            + self.seconds_per_mb * info.get("bytes", 0) / (1024 * 1024)
+        )
+
+    @staticmethod
+    def lpt_order(costs: Sequence[float]) -> List[int]:
+        """Índices ordenados de mayor a menor costo (estable ante empates)"""
+        return sorted(range(len(costs)), key=lambda i: -costs[i])
+
+    def predict_makespan(self, costs: Sequence[float], order: Optional[Sequence[int]] = None) -> float:
+        """
+        Simula el despacho en el orden dado: cada tarea va al primer worker libre.
+
+        Returns:
+            float: Segundos estimados hasta terminar el lote
+        """
+        order = range(len(costs)) if order is None else order
+        loads = [0.0] * max(1, min(self.workers, len(costs)))
+        heapq.heapify(loads)
+        for i in order:
+            heapq.heappush(loads, heapq.heappop(loads) + costs[i])
+        return max(loads) if costs else 0.0
+
+    def run(self, items: Sequence[Any], infos: Sequence[Dict[str, Any]], fn: Callable[[Any], Any],
+            on_complete: Optional[Callable[[int, Any], None]] = None):
+        """
+        Ejecuta fn(item) para todo el lote, despachando primero los más largos.
+
+        Args:
+            items: Elementos a procesar
+            infos: Preflight de cada elemento (mismo orden que items)
+            fn: Trabajo por elemento (se ejecuta en un pool de hilos)
+            on_complete: Callback (índice, resultado) en el hilo que llama, a
+                         medida que terminan (útil para actualizar la UI)
+
+        Returns:
+            (resultados en el orden de entrada, reporte) donde el reporte tiene
+            workers, predicted_s (LPT), fifo_predicted_s (orden de llegada),
+            actual_s y order (índices en el orden de despacho). Las excepciones
+            de un elemento quedan como su resultado.
+        """
+        costs = [self.estimate(info) for info in infos]
+        order = self.lpt_order(costs)
+        report = {
+            "workers": self.workers,
+            "predicted_s": round(self.predict_makespan(costs, order), 1),
+            "fifo_predicted_s": round(self.predict_makespan(costs), 1),
+            "order": order,
+        }
+
+        results: List[Any] = [None] * len(items)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            futures = {pool.submit(fn, items[i]): i for i in order}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    results[i] = e
+                if on_complete:
+                    on_complete(i, results[i])
+
+        report["actual_s"] = round(time.perf_counter() - start, 1)
+        return results, report
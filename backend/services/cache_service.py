@@ -0,0 +1,278 @@
+"""
+Caché en disco para resultados costosos (OCR de Azure Document Intelligence
+y respuestas de los modelos de OpenAI)
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+
+class DiskCache:
+    """
+    Caché persistente en disco con:
+      - una entrada JSON por clave
+      - límite de tamaño total con expulsión LRU
+      - TTL (tiempo de vida) por entrada
+      - contadores de hits / misses
+    """
+
+    def __init__(self, cache_dir: str, max_size_mb: float = 200, ttl_hours: Optional[float] = 24 * 30):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_hours * 3600 if ttl_hours else None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Tamaño total estimado: se recorre el directorio solo al iniciar y al expulsar
+        self._size_bytes = sum(size for _, size, _ in self._entries())
+
+    # -------------------------------------------------------------------------
+    #     Helpers internos
+    # -------------------------------------------------------------------------
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _entries(self):
+        """Lista (ruta, tamaño, último acceso) de todas las entradas"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def _evict(self):
+        """Expulsa las entradas menos usadas recientemente hasta cumplir el límite"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        self._size_bytes = total
+        if total <= self.max_bytes:
+            return
+
+        # La fecha de modificación se usa como marca de "último acceso"
+        for path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+        self._size_bytes = total
+
+    # -------------------------------------------------------------------------
+    #     API pública
+    # -------------------------------------------------------------------------
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Devuelve el valor guardado o None si no existe o expiró"""
+        entry = self._get_entry(key)
+        return entry.get("value") if entry is not None else None
+
+    def _get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Como get, pero devuelve la entrada completa (created_at y value)"""
+        path = self._path(key)
+
+        with self._lock:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self.misses += 1
+                return None
+
+            if self.ttl_seconds and time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+                try:
+                    self._size_bytes -= os.path.getsize(path)
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            # Marcar como usado recientemente (LRU)
+            try:
+                os.utime(path, None)
+            except FileNotFoundError:
+                pass
+
+            self.hits += 1
+            return entry
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """
+        Guarda un valor de forma atómica. Solo se recorre el directorio para
+        expulsar entradas cuando el tamaño acumulado supera el límite.
+        """
+        entry = {"created_at": time.time(), "value": value}
+        path = self._path(key)
+
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                new_size = os.path.getsize(tmp_path)
+                try:
+                    old_size = os.path.getsize(path)
+                except FileNotFoundError:
+                    old_size = 0
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self._size_bytes += new_size - old_size
+            if self._size_bytes > self.max_bytes:
+                self._evict()
+
+    def clear(self):
+        """Elimina todas las entradas"""
+        with self._lock:
+            for path, _, _ in self._entries():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso del caché"""
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _ in entries),
+        }
+
+
+class OCRCache(DiskCache):
+    """Caché de resultados OCR indexado por hash del PDF + modelo de Azure"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: Optional[float] = None,
+                 ttl_hours: Optional[float] = None):
+        super().__init__(
+            cache_dir=cache_dir or os.getenv("OCR_CACHE_DIR", "data/cache/ocr"),
+            max_size_mb=max_size_mb if max_size_mb is not None else float(os.getenv("OCR_CACHE_MAX_MB", "200")),
+            ttl_hours=ttl_hours if ttl_hours is not None else float(os.getenv("OCR_CACHE_TTL_HOURS", "720")),
+        )
+
+    @staticmethod
+    def make_key(data: bytes, model_id: str) -> str:
+        """Clave de contenido: sha256(modelo + bytes del documento)"""
+        h = hashlib.sha256()
+        h.update(model_id.encode("utf-8"))
+        h.update(b"\0")
+        h.update(data)
+        return h.hexdigest()
+
+
+class LLMCache(DiskCache):
+    """
+    Caché de respuestas de chat en dos niveles:
+      - memoria: LRU de las últimas max_memory_entries respuestas
+      - disco: DiskCache con TTL y límite de tamaño (sobrevive reinicios)
+
+    La clave cubre deployment, mensajes, temperature, response_format y la
+    versión de las plantillas de prompts, así que cambiar cualquiera de ellos
+    produce una llamada nueva.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: Optional[float] = None,
+                 ttl_hours: Optional[float] = None, max_memory_entries: Optional[int] = None):
+        super().__init__(
+            cache_dir=cache_dir or os.getenv("LLM_CACHE_DIR", "data/cache/llm"),
+            max_size_mb=max_size_mb if max_size_mb is not None else float(os.getenv("LLM_CACHE_MAX_MB", "100")),
+            ttl_hours=ttl_hours if ttl_hours is not None else float(os.getenv("LLM_CACHE_TTL_HOURS", "168")),
+        )
+        self.max_memory_entries = (
+            max_memory_entries if max_memory_entries is not None
+            else int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+        )
+        self.memory_hits = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(deployment: str, messages, temperature=None, response_format=None,
+                 template_version: Optional[str] = None, **params) -> str:
+        """Clave de contenido: sha256 del JSON canónico de todos los parámetros de la llamada"""
+        payload = {
+            "deployment": deployment,
+            "messages": messages,
+            "temperature": temperature,
+            "response_format": response_format,
+            "template_version": template_version,
+            "params": params,
+        }
+        canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, value, created_at: float):
+        with self._memory_lock:
+            self._memory[key] = (created_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        with self._memory_lock:
+            item = self._memory.get(key)
+            if item is not None:
+                created_at, value = item
+                if not self.ttl_seconds or time.time() - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+        entry = self._get_entry(key)
+        if entry is None:
+            return None
+        # Se conserva created_at del disco: el TTL no se reinicia al subir a memoria
+        self._remember(key, entry.get("value"), entry.get("created_at", 0))
+        return entry.get("value")
+
+    def set(self, key: str, value):
+        super().set(key, value)
+        self._remember(key, value, time.time())
+
+    def clear(self):
+        with self._memory_lock:
+            self._memory.clear()
+        super().clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de ambos niveles; hit_rate es el global (memoria + disco)"""
+        stats = super().stats()
+        lookups = self.memory_hits + self.hits + self.misses
+        stats.update({
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.hits,
+            "hits": self.memory_hits + self.hits,
+            "hit_rate": round((self.memory_hits + self.hits) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        })
+        return stats
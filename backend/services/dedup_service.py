@@ -0,0 +1,154 @@
+"""
+Detección de CVs duplicados antes del OCR y de GPT:
+  - duplicados exactos por hash de bytes (antes del OCR)
+  - casi-duplicados por huella MinHash del texto extraído (antes de GPT)
+"""
+import re
+import random
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+class DuplicateDetector:
+    """
+    Índice de CVs ya procesados para reutilizar su perfil cuando llega una copia.
+
+    Cada entrada guarda el nombre del archivo original, el hash de sus bytes,
+    la huella MinHash de su texto y el perfil generado.
+
+    El índice es seguro entre hilos: los workers de un lote consultan y
+    reservan entradas (reserve) mientras el hilo principal las completa.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.9, shingle_size: int = 5, num_hashes: int = 64):
+        self.similarity_threshold = similarity_threshold
+        self.shingle_size = shingle_size
+
+        # Permutaciones fijas (semilla constante) para que las huellas sean comparables
+        rng = random.Random(20240101)
+        self._perms = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_hashes)
+        ]
+
+        self.entries: List[Dict[str, Any]] = []
+        self._by_hash: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    #     Huellas
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def content_hash(data) -> str:
+        """sha256 de los bytes; los objetos tipo archivo se leen por bloques"""
+        if not hasattr(data, "read"):
+            return hashlib.sha256(data).hexdigest()
+
+        h = hashlib.sha256()
+        data.seek(0)
+        for chunk in iter(lambda: data.read(1024 * 1024), b""):
+            h.update(chunk)
+        data.seek(0)
+        return h.hexdigest()
+
+    def _shingles(self, text: str) -> set:
+        tokens = _TOKEN.findall(text.lower())
+        if len(tokens) < self.shingle_size:
+            return {" ".join(tokens)} if tokens else set()
+        return {
+            " ".join(tokens[i:i + self.shingle_size])
+            for i in range(len(tokens) - self.shingle_size + 1)
+        }
+
+    def fingerprint(self, text: str) -> Tuple[int, ...]:
+        """Firma MinHash del texto (tupla de num_hashes enteros)"""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big")
+            for s in self._shingles(text or "")
+        ]
+        if not hashes:
+            return tuple([_MAX_HASH] * len(self._perms))
+
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        )
+
+    @staticmethod
+    def similarity(fp_a: Tuple[int, ...], fp_b: Tuple[int, ...]) -> float:
+        """Estimación de la similitud de Jaccard entre dos textos"""
+        if not fp_a or not fp_b:
+            return 0.0
+        return sum(1 for x, y in zip(fp_a, fp_b) if x == y) / len(fp_a)
+
+    # -------------------------------------------------------------------------
+    #     Índice
+    # -------------------------------------------------------------------------
+    def find_exact(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._by_hash.get(content_hash)
+
+    def find_near(self, fingerprint: Tuple[int, ...]) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Devuelve (entrada, similitud) del CV más parecido si supera el umbral"""
+        with self._lock:
+            return self._find_near(fingerprint)
+
+    def _find_near(self, fingerprint: Tuple[int, ...]) -> Optional[Tuple[Dict[str, Any], float]]:
+        best, best_score = None, 0.0
+        for entry in self.entries:
+            score = self.similarity(fingerprint, entry["fingerprint"])
+            if score > best_score:
+                best, best_score = entry, score
+        if best is not None and best_score >= self.similarity_threshold:
+            return best, best_score
+        return None
+
+    def add(self, name: str, content_hash: str, fingerprint: Tuple[int, ...], profile: Dict[str, Any]) -> Dict[str, Any]:
+        entry = {"name": name, "hash": content_hash, "fingerprint": fingerprint, "profile": profile}
+        with self._lock:
+            self.entries.append(entry)
+            self._by_hash[content_hash] = entry
+        return entry
+
+    def reserve(self, name: str, content_hash: str,
+                fingerprint: Tuple[int, ...]) -> Tuple[Dict[str, Any], Optional[float]]:
+        """
+        Busca un casi-duplicado y, si no hay, registra una entrada sin perfil
+        en la misma operación, para que dos copias del mismo lote no pasen
+        ambas a GPT.
+
+        Returns:
+            (entrada parecida, similitud) o (entrada nueva, None). La entrada
+            nueva se completa con complete() o se quita con discard(); una
+            parecida puede tener aún profile None si su original sigue en proceso.
+        """
+        with self._lock:
+            near = self._find_near(fingerprint)
+            if near:
+                return near
+            entry = {"name": name, "hash": content_hash, "fingerprint": fingerprint, "profile": None}
+            self.entries.append(entry)
+            self._by_hash[content_hash] = entry
+            return entry, None
+
+    def complete(self, entry: Dict[str, Any], profile: Dict[str, Any]):
+        with self._lock:
+            entry["profile"] = profile
+
+    def discard(self, entry: Dict[str, Any]):
+        """Quita una entrada reservada cuyo perfil no se pudo generar"""
+        with self._lock:
+            if entry in self.entries:
+                self.entries.remove(entry)
+            for content_hash in [h for h, e in self._by_hash.items() if e is entry]:
+                del self._by_hash[content_hash]
+
+    def alias(self, content_hash: str, entry: Dict[str, Any]):
+        """Registra otro hash de bytes (p.ej. un re-export) para una entrada existente"""
+        with self._lock:
+            self._by_hash[content_hash] = entry
@@ -1,14 +1,109 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+
 from azure.core.credentials import AzureKeyCredential
 from azure.ai.formrecognizer import DocumentAnalysisClient
 
+from backend.models.ocr_layout import OCRLayout
+from backend.services.cache_service import OCRCache
+from backend.services.pdf_text_service import count_pdf_pages, split_pdf
+from backend.services.pdf_preprocessing_service import PdfImagePreprocessor
+from backend.services.resilience_service import get_resilience
+
+
+def read_document_bytes(source) -> bytes:
+    """
+    Normaliza un documento en memoria a bytes evitando copias innecesarias.
+
+    Acepta bytes, bytearray, memoryview u objetos tipo archivo (BytesIO,
+    UploadedFile de Streamlit, archivos abiertos en modo "rb").
+    """
+    if isinstance(source, bytes):
+        return source
+
+    if isinstance(source, memoryview):
+        # Vista completa sobre un objeto bytes: se reutiliza sin copiar
+        if isinstance(source.obj, bytes) and source.nbytes == len(source.obj):
+            return source.obj
+        return source.tobytes()
+
+    if isinstance(source, bytearray):
+        return bytes(source)
+
+    if hasattr(source, "getvalue"):
+        # BytesIO comparte su buffer con el bytes devuelto mientras no se modifique
+        return source.getvalue()
+
+    if hasattr(source, "read"):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return source.read()
+
+    raise TypeError(f"❌ Tipo de documento no soportado: {type(source).__name__}")
+
+
+def iter_page_records(page_texts):
+    """
+    Convierte textos de página en registros con su posición en el texto completo.
+
+    El texto completo del documento es "".join(r["text"] for r in registros),
+    por lo que cada "offset" es la posición donde empieza esa página.
+    """
+    offset = 0
+    for number, text in enumerate(page_texts, 1):
+        if text and not text.endswith("\n"):
+            text += "\n"
+        yield {
+            "page_number": number,
+            "text": text,
+            "line_count": text.count("\n"),
+            "offset": offset,
+        }
+        offset += len(text)
+
+
+def parse_read_result(result):
+    """
+    Convierte un AnalyzeResult en (páginas como listas de líneas, OCRLayout).
+
+    El layout conserva página, offsets y polígono de cada línea para no tener
+    que repetir el OCR cuando se necesite la geometría.
+    """
+    pages = [[line.content for line in page.lines] for page in result.pages]
+    return pages, OCRLayout.from_result(result)
+
+
+def parse_tables(result, page_offset: int = 0):
+    """
+    Tablas de un AnalyzeResult como dicts serializables (para el caché):
+    row_count, column_count, page_number y cells (row_index, column_index, content).
+
+    page_offset se suma al número de página (bloques de un documento dividido).
+    """
+    tables = []
+    for table in getattr(result, "tables", None) or []:
+        regions = getattr(table, "bounding_regions", None) or []
+        tables.append({
+            "row_count": table.row_count,
+            "column_count": table.column_count,
+            "page_number": regions[0].page_number + page_offset if regions else None,
+            "cells": [
+                {"row_index": cell.row_index, "column_index": cell.column_index, "content": cell.content}
+                for cell in table.cells
+            ],
+        })
+    return tables
+
 
 class DocumentIntelligenceService:
     """Servicio para extraer texto de documentos con Azure Document Intelligence (Form Recognizer)"""
 
-    def __init__(self):
-        self.endpoint = os.getenv("AZURE_DOC_ENDPOINT")
-        self.key = os.getenv("AZURE_DOC_KEY")
+    MODEL_ID = "prebuilt-read"
+
+    def __init__(self, endpoint=None, key=None, cache=None, use_cache=True,
+                 chunk_pages=None, chunk_workers=None, preprocess=None, resilience=None):
+        self.endpoint = endpoint or os.getenv("AZURE_DOC_ENDPOINT")
+        self.key = key or os.getenv("AZURE_DOC_KEY")
 
         if not self.endpoint or not self.key:
             raise ValueError("❌ Faltan AZURE_DOC_ENDPOINT o AZURE_DOC_KEY en el .env")
@@ -16,10 +111,174 @@ class DocumentIntelligenceService:
         print(f"[DocumentIntelligence] Endpoint cargado: {self.endpoint}")
 
         # ✔ Cliente correcto (el que sí funciona en tu prueba manual)
+        # (sin reintentos del SDK: los hace la capa de resiliencia compartida)
         self.client = DocumentAnalysisClient(
             endpoint=self.endpoint,
-            credential=AzureKeyCredential(self.key)
+            credential=AzureKeyCredential(self.key),
+            retry_total=0
+        )
+        self.resilience = resilience or get_resilience("document_intelligence")
+
+        # Caché OCR en disco (un PDF ya analizado no vuelve a Azure)
+        self.cache = cache if cache is not None else (OCRCache() if use_cache else None)
+
+        # Documentos largos: se dividen en bloques de páginas que se analizan en paralelo
+        # (chunk_pages=0 desactiva la división)
+        self.chunk_pages = chunk_pages if chunk_pages is not None else int(os.getenv("OCR_CHUNK_PAGES", "8"))
+        self.chunk_workers = chunk_workers or int(os.getenv("OCR_CHUNK_WORKERS", "4"))
+
+        # Preprocesamiento opcional de escaneos (reduce DPI antes de subir a Azure)
+        if preprocess is None:
+            preprocess = os.getenv("OCR_PREPROCESS", "0").lower() in ("1", "true", "yes")
+        self.preprocessor = PdfImagePreprocessor() if preprocess else None
+
+    def analyze(self, data: bytes):
+        """
+        Analiza un documento con prebuilt-read, usando el caché si está disponible.
+
+        Args:
+            data: Contenido del PDF (bytes, memoryview o archivo abierto en modo binario)
+
+        Returns:
+            dict con:
+              - pages: Páginas, cada una como lista de líneas de texto
+              - preprocessing: Reporte de bytes ahorrados antes de subir (None si no aplica)
+              - cache_hit: Si el resultado vino del caché OCR
+              - layout: OCRLayout con la geometría de las líneas (None en entradas
+                        antiguas del caché)
+              - tables: Tablas detectadas (ver parse_tables)
+        """
+        data = read_document_bytes(data)
+        key = OCRCache.make_key(data, self.MODEL_ID) if self.cache else None
+
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                print("[DocumentIntelligence] Resultado OCR recuperado del caché")
+                layout = OCRLayout.from_base64(cached["layout"]) if cached.get("layout") else None
+                return {"pages": cached["pages"], "preprocessing": None, "cache_hit": True, "layout": layout,
+                        "tables": cached.get("tables", [])}
+
+        report = None
+        upload = data
+        if self.preprocessor:
+            upload, report = self.preprocessor.preprocess(data)
+            print(f"[DocumentIntelligence] Preprocesamiento: {report['bytes_saved']} bytes ahorrados ({report['reason']})")
+
+        pages, layout, tables = self._analyze_document(upload)
+
+        # La clave usa los bytes originales: un re-upload no repite el preprocesamiento
+        if self.cache:
+            self.cache.set(key, {"model_id": self.MODEL_ID, "pages": pages, "layout": layout.to_base64(),
+                                 "tables": tables})
+
+        return {"pages": pages, "preprocessing": report, "cache_hit": False, "layout": layout, "tables": tables}
+
+    def analyze_read(self, data: bytes):
+        """
+        Igual que analyze, pero devuelve solo las páginas.
+
+        Returns:
+            list: Páginas, cada una como lista de líneas de texto
+        """
+        return self.analyze(data)["pages"]
+
+    def _analyze_uncached(self, data: bytes, page_offset: int = 0):
+        """
+        Una llamada a prebuilt-read (con reintentos).
+
+        Returns:
+            (páginas como listas de líneas, OCRLayout, tablas)
+        """
+        result = self.resilience.call(self._begin_and_wait, data)
+        pages, layout = parse_read_result(result)
+        return pages, layout, parse_tables(result, page_offset)
+
+    def _begin_and_wait(self, data: bytes):
+        # Envío y espera del poller se reintentan juntos: un 429 puede llegar en cualquiera de los dos
+        poller = self.client.begin_analyze_document(
+            model_id=self.MODEL_ID,  # ✔ Modelo correcto
+            document=data
         )
+        return poller.result()
+
+    def _analyze_document(self, data: bytes):
+        """Analiza el documento completo o, si es largo, por bloques de páginas en paralelo"""
+        if not self.chunk_pages:
+            return self._analyze_uncached(data)
+
+        try:
+            total_pages = count_pdf_pages(data)
+        except Exception:
+            # No es un PDF legible localmente (p.ej. imagen): se envía tal cual
+            return self._analyze_uncached(data)
+
+        if total_pages <= self.chunk_pages:
+            return self._analyze_uncached(data)
+
+        return self._analyze_chunked(data, self.chunk_pages, self.chunk_workers)
+
+    def analyze_read_chunked(self, data: bytes, chunk_pages: int = None, max_workers: int = None):
+        """
+        Divide el PDF en rangos de páginas, los analiza en paralelo y une el
+        resultado en el orden original de páginas.
+
+        Args:
+            data: Contenido del PDF
+            chunk_pages: Páginas por bloque
+            max_workers: Bloques analizados simultáneamente
+
+        Returns:
+            list: Páginas (listas de líneas) de todo el documento
+        """
+        return self._analyze_chunked(read_document_bytes(data), chunk_pages, max_workers)[0]
+
+    def _analyze_chunked(self, data: bytes, chunk_pages: int = None, max_workers: int = None):
+        chunks = split_pdf(data, chunk_pages or self.chunk_pages or 8)
+
+        print(f"[DocumentIntelligence] Analizando {len(chunks)} bloques de páginas en paralelo")
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.chunk_workers) as pool:
+            # map conserva el orden de los bloques
+            chunk_results = list(pool.map(lambda c: self._analyze_uncached(c[1], c[0]), chunks))
+
+        pages = []
+        layout = OCRLayout()
+        tables = []
+        for chunk_pages_list, chunk_layout, chunk_tables in chunk_results:
+            pages.extend(chunk_pages_list)
+            layout.extend(chunk_layout)
+            tables.extend(chunk_tables)
+        return pages, layout, tables
+
+    @staticmethod
+    def _page_records(pages):
+        # Cada página se arma una sola vez con join (tiempo lineal)
+        return iter_page_records("".join(line + "\n" for line in lines) for lines in pages)
+
+    def iter_pages(self, data):
+        """
+        Genera un registro por página del documento.
+
+        Azure devuelve el resultado del OCR completo, así que el análisis termina
+        antes de la primera página; lo incremental es el armado de los registros.
+
+        Yields:
+            dict con page_number, text, line_count y offset (posición en el texto completo)
+        """
+        yield from self._page_records(self.analyze_read(data))
+
+    def extract_text_from_bytes(self, data: bytes):
+        """Extrae texto y tablas de un PDF en memoria (bytes) usando el modelo prebuilt-read"""
+
+        analysis = self.analyze(data)
+        pages = list(self._page_records(analysis["pages"]))
+
+        return {
+            "text": "".join(page["text"] for page in pages),
+            "pages": len(pages),
+            "tables": analysis["tables"]
+        }
 
     def extract_text_from_pdf(self, pdf_path: str):
         """Extrae texto de un PDF usando el modelo prebuilt-read"""
@@ -30,21 +289,6 @@ class DocumentIntelligenceService:
         print(f"[DocumentIntelligence] Analizando PDF: {pdf_path}")
 
         with open(pdf_path, "rb") as f:
-            poller = self.client.begin_analyze_document(
-                model_id="prebuilt-read",  # ✔ Modelo correcto
-                document=f
-            )
-
-        result = poller.result()
+            data = f.read()
 
-        # Extraer texto
-        text = ""
-        for page in result.pages:
-            for line in page.lines:
-                text += line.content + "\n"
-
-        return {
-            "text": text,
-            "pages": len(result.pages),
-            "tables": getattr(result, "tables", [])
-        }
+        return self.extract_text_from_bytes(data)
@@ -0,0 +1,54 @@
+"""
+Lectura local de documentos Word (.docx) sin pasar por OCR
+"""
+import io
+import zipfile
+from typing import List
+
+from docx import Document
+from docx.table import Table
+
+
+def is_docx(data: bytes) -> bool:
+    """Detecta un .docx por su contenido (ZIP con word/document.xml)"""
+    if not data.startswith(b"PK\x03\x04"):
+        return False
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            return "word/document.xml" in zf.namelist()
+    except zipfile.BadZipFile:
+        return False
+
+
+class DocxTextService:
+    """Extrae párrafos y tablas de un .docx en el orden en que aparecen"""
+
+    @staticmethod
+    def _table_lines(table: Table) -> List[str]:
+        lines = []
+        for row in table.rows:
+            cells = []
+            for cell in row.cells:
+                text = " ".join(p.text.strip() for p in cell.paragraphs if p.text.strip())
+                # Las celdas combinadas se repiten en python-docx
+                if text and (not cells or cells[-1] != text):
+                    cells.append(text)
+            if cells:
+                lines.append(" | ".join(cells))
+        return lines
+
+    def extract_lines(self, data: bytes) -> List[str]:
+        """Devuelve las líneas de texto del documento (párrafos y filas de tablas)"""
+        document = Document(io.BytesIO(data))
+        lines = []
+
+        for block in document.iter_inner_content():
+            if isinstance(block, Table):
+                lines.extend(self._table_lines(block))
+            elif block.text.strip():
+                lines.append(block.text.strip())
+
+        return lines
+
+    def extract_text(self, data: bytes) -> str:
+        return "".join(line + "\n" for line in self.extract_lines(data))
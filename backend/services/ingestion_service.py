@@ -0,0 +1,428 @@
+"""
+Capa de ingesta de documentos: decide cómo obtener el texto de cada archivo
+(capa de texto local con PyPDF2, lectura directa de .docx u OCR con Azure
+Document Intelligence)
+"""
+import os
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional
+
+from backend.models.ocr_layout import OCRLayout
+from backend.services.pdf_text_service import PdfTextService, extract_pdf_pages
+from backend.services.docx_service import DocxTextService, is_docx
+from backend.services.document_intelligence_service import (
+    DocumentIntelligenceService,
+    iter_page_records,
+    read_document_bytes,
+)
+from backend.services.async_document_intelligence_service import AsyncDocumentIntelligenceService
+
+logger = logging.getLogger(__name__)
+
+
+def _local_pass_worker(args):
+    """Punto de entrada en los procesos del pool de parsing (debe ser serializable)"""
+    data, mode, min_chars_per_page, min_text_quality = args
+    service = IngestionService(mode=mode, min_chars_per_page=min_chars_per_page,
+                               min_text_quality=min_text_quality, parse_workers=1)
+    return service._local_pass(data)
+
+
+class IngestionService:
+    """
+    Punto de entrada único para extraer texto de documentos.
+
+    Modos:
+      - "auto":  usa la capa de texto local y envía a OCR solo las páginas
+                 escaneadas (con imagen y sin texto suficiente); si no hay
+                 páginas escaneadas pero el documento completo no alcanza
+                 los umbrales, se hace OCR de todo el documento
+      - "local": solo capa de texto local (nunca llama a Azure)
+      - "ocr":   siempre prebuilt-read en Azure
+
+    Los archivos .docx se leen siempre localmente (párrafos y tablas), sin OCR.
+
+    En extract_many el parsing local (PyPDF2, CPU) puede repartirse en un pool de
+    procesos con parse_workers > 1 (PDF_PARSE_WORKERS); el OCR sigue siendo asíncrono.
+    """
+
+    MODES = ("auto", "local", "ocr")
+
+    def __init__(self,
+                 mode: Optional[str] = None,
+                 min_chars_per_page: Optional[float] = None,
+                 min_text_quality: Optional[float] = None,
+                 doc_service=None,
+                 async_doc_service=None,
+                 doc_endpoint=None,
+                 doc_key=None,
+                 parse_workers: Optional[int] = None,
+                 parse_chunksize: Optional[int] = None):
+        self.mode = (mode or os.getenv("PDF_TEXT_MODE", "auto")).lower()
+        if self.mode not in self.MODES:
+            raise ValueError(f"❌ Modo de extracción no válido: {self.mode} (usa {self.MODES})")
+
+        self.min_chars_per_page = (
+            min_chars_per_page if min_chars_per_page is not None
+            else float(os.getenv("PDF_MIN_CHARS_PER_PAGE", "200"))
+        )
+        self.min_text_quality = (
+            min_text_quality if min_text_quality is not None
+            else float(os.getenv("PDF_MIN_TEXT_QUALITY", "0.8"))
+        )
+
+        # Parsing local en varios núcleos (1 = en el proceso actual)
+        self.parse_workers = parse_workers or int(os.getenv("PDF_PARSE_WORKERS", "1"))
+        self.parse_chunksize = parse_chunksize or int(os.getenv("PDF_PARSE_CHUNKSIZE", "4"))
+
+        self.pdf_text = PdfTextService()
+        self.docx_text = DocxTextService()
+
+        # El servicio OCR se crea solo cuando hace falta (el modo local no necesita credenciales)
+        self._doc_service = doc_service
+        self._async_doc_service = async_doc_service
+        self._doc_endpoint = doc_endpoint
+        self._doc_key = doc_key
+
+    @property
+    def doc_service(self):
+        if self._doc_service is None:
+            self._doc_service = DocumentIntelligenceService(endpoint=self._doc_endpoint, key=self._doc_key)
+        return self._doc_service
+
+    @property
+    def async_doc_service(self):
+        if self._async_doc_service is None:
+            self._async_doc_service = AsyncDocumentIntelligenceService(endpoint=self._doc_endpoint, key=self._doc_key)
+        return self._async_doc_service
+
+    def is_text_usable(self, quality: Dict[str, Any]) -> bool:
+        """Indica si la capa de texto local es suficiente para evitar el OCR"""
+        return (
+            quality["chars_per_page"] >= self.min_chars_per_page
+            and quality["quality"] >= self.min_text_quality
+        )
+
+    @staticmethod
+    def _build_result(page_texts, source: str) -> Dict[str, Any]:
+        records = list(iter_page_records(page_texts))
+        return {
+            "text": "".join(r["text"] for r in records),
+            "pages": len(records),
+            "page_texts": [r["text"] for r in records],
+            "tables": [],
+            "source": source,
+        }
+
+    def _extract_local(self, data: bytes) -> Dict[str, Any]:
+        try:
+            pages = self.pdf_text.extract_pages(data)
+        except Exception as e:
+            logger.warning(f" No se pudo leer la capa de texto local: {e}")
+            pages = []
+
+        result = self._build_result(pages, "local")
+        result["quality"] = self.pdf_text.assess_quality(pages)
+        result["ocr_pages"] = 0
+        return result
+
+    def _extract_docx(self, data: bytes) -> Dict[str, Any]:
+        logger.info(" Documento Word: lectura local de párrafos y tablas")
+        result = self._build_result([self.docx_text.extract_text(data)], "docx")
+        result["ocr_pages"] = 0
+        return result
+
+    def _plan_ocr(self, data: bytes, local: Dict[str, Any]) -> Optional[List[int]]:
+        """
+        Decide qué páginas necesitan OCR en modo "auto".
+
+        Returns:
+            None si basta la capa local; si no, los índices (desde 0) de las
+            páginas a enviar a Azure (todas si el documento completo va a OCR;
+            lista vacía si PyPDF2 no pudo leer las páginas)
+        """
+        all_pages = list(range(local["pages"]))
+        if not all_pages:
+            return all_pages
+
+        weak = [
+            i for i, text in enumerate(local["page_texts"])
+            if not self.is_text_usable(self.pdf_text.assess_quality([text]))
+        ]
+        if not weak:
+            return None
+
+        try:
+            images = set(self.pdf_text.image_pages(data))
+        except Exception as e:
+            logger.warning(f" No se pudieron inspeccionar las imágenes del PDF: {e}")
+            images = set()
+
+        scanned = [i for i in weak if i in images]
+        if scanned:
+            return scanned
+
+        # Sin páginas escaneadas: se mantiene la decisión por documento completo
+        if self.is_text_usable(local["quality"]):
+            return None
+        return all_pages
+
+    def _ocr_payload(self, data: bytes, local: Dict[str, Any], ocr_pages: List[int]) -> bytes:
+        """Bytes a enviar a Azure: el documento completo o un sub-PDF con las páginas escaneadas"""
+        if len(ocr_pages) == local["pages"]:
+            return data
+        return extract_pdf_pages(data, ocr_pages)
+
+    @staticmethod
+    def _merge_layout(page_texts: List[str], sub_layout, ocr_pages: List[int]):
+        """Layout del documento completo: líneas OCR en sus páginas, páginas locales vacías"""
+        if sub_layout is None:
+            return None
+
+        position = {page: k for k, page in enumerate(ocr_pages)}
+        layout = OCRLayout()
+        for index, text in enumerate(page_texts):
+            k = position.get(index)
+            if k is not None and k < sub_layout.page_count:
+                layout.copy_page(sub_layout, k)
+            else:
+                layout.add_text_page(len(text))
+        return layout
+
+    def _build_routed_result(self, local: Dict[str, Any], analysis: Dict[str, Any],
+                             ocr_pages: List[int]) -> Dict[str, Any]:
+        """Combina la capa local con el OCR de las páginas escaneadas"""
+        if len(ocr_pages) == local["pages"]:
+            result = self._build_ocr_result(analysis)
+            result["quality"] = local["quality"]
+            return result
+
+        page_texts = list(local["page_texts"])
+        for index, lines in zip(ocr_pages, analysis["pages"]):
+            page_texts[index] = "".join(line + "\n" for line in lines)
+
+        result = self._build_result(page_texts, "mixed")
+        result["quality"] = local["quality"]
+        result["preprocessing"] = analysis.get("preprocessing")
+        result["cache_hit"] = analysis.get("cache_hit", False)
+        result["layout"] = self._merge_layout(result["page_texts"], analysis.get("layout"), ocr_pages)
+        result["ocr_pages"] = len(ocr_pages)
+        result["ocr_page_numbers"] = [i + 1 for i in ocr_pages]
+        # Las páginas de las tablas se refieren al sub-PDF enviado a Azure
+        result["tables"] = [
+            dict(table, page_number=ocr_pages[table["page_number"] - 1] + 1 if table.get("page_number") else None)
+            for table in analysis.get("tables", [])
+        ]
+
+        logger.info(f" OCR de {len(ocr_pages)} de {local['pages']} páginas (el resto con capa de texto local)")
+        return result
+
+    def _extract_ocr(self, data: bytes) -> Dict[str, Any]:
+        return self._build_ocr_result(self.doc_service.analyze(data))
+
+    def _build_ocr_result(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        page_texts = ("".join(line + "\n" for line in lines) for lines in analysis["pages"])
+        result = self._build_result(page_texts, "ocr")
+        result["preprocessing"] = analysis.get("preprocessing")
+        result["cache_hit"] = analysis.get("cache_hit", False)
+        result["layout"] = analysis.get("layout")
+        result["tables"] = analysis.get("tables", [])
+        result["ocr_pages"] = result["pages"]
+        return result
+
+    def extract_text(self, source) -> Dict[str, Any]:
+        """
+        Extrae texto de un PDF o .docx en memoria según el modo configurado.
+
+        Args:
+            source: bytes, memoryview u objeto tipo archivo con el documento
+
+        Returns:
+            dict con text, pages, page_texts, tables, source ("local", "ocr", "mixed"
+            o "docx"), ocr_pages (páginas enviadas a Azure), quality (si se evaluó
+            la capa de texto) y preprocessing/cache_hit/layout (si hubo OCR; layout
+            es un OCRLayout alineado con text). En "mixed" también ocr_page_numbers.
+        """
+        data = read_document_bytes(source)
+
+        if is_docx(data):
+            return self._extract_docx(data)
+
+        if self.mode == "ocr":
+            return self._extract_ocr(data)
+
+        local = self._extract_local(data)
+        ocr_pages = None if self.mode == "local" else self._plan_ocr(data, local)
+
+        if ocr_pages is None:
+            logger.info(f" Capa de texto local utilizada ({local['quality']['chars_per_page']} caracteres/página)")
+            return local
+
+        logger.info(f" Capa de texto insuficiente {local['quality']} → OCR con Azure")
+        analysis = self.doc_service.analyze(self._ocr_payload(data, local, ocr_pages))
+        return self._build_routed_result(local, analysis, ocr_pages)
+
+    def _local_pass(self, data: bytes):
+        """
+        Parte local (CPU) de extract_many para un documento .docx o PDF.
+
+        Returns:
+            (resultado o excepción, páginas a OCR, bytes a enviar a Azure o None si no hace falta OCR)
+        """
+        try:
+            if is_docx(data):
+                return self._extract_docx(data), None, None
+
+            local = self._extract_local(data)
+            if self.mode != "auto":
+                return local, None, None
+
+            ocr_pages = self._plan_ocr(data, local)
+            if ocr_pages is None:
+                return local, None, None
+            return local, ocr_pages, self._ocr_payload(data, local, ocr_pages)
+        except Exception as e:
+            return e, None, None
+
+    def _map_local(self, payloads: List[bytes]) -> List:
+        """Ejecuta _local_pass sobre todos los documentos (en un pool de procesos si está configurado)"""
+        workers = min(self.parse_workers, len(payloads))
+        if workers <= 1:
+            return [self._local_pass(data) for data in payloads]
+
+        logger.info(f" Parsing local de {len(payloads)} documento(s) con {workers} procesos")
+        tasks = [(data, self.mode, self.min_chars_per_page, self.min_text_quality) for data in payloads]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(_local_pass_worker, tasks, chunksize=self.parse_chunksize))
+        except BrokenProcessPool as e:
+            logger.warning(f" El pool de parsing falló ({e}); se continúa en el proceso actual")
+            return [self._local_pass(data) for data in payloads]
+
+    def _plan_many(self, payloads: List[bytes]):
+        """
+        Parte local de extract_many/aextract_many.
+
+        Returns:
+            (resultados parciales, pendientes de OCR como (índice, páginas a OCR
+            o None para el documento completo, bytes a enviar))
+        """
+        results: List = [None] * len(payloads)
+        pending = []
+
+        if self.mode == "ocr":
+            for i, data in enumerate(payloads):
+                if is_docx(data):
+                    results[i] = self._extract_docx(data)
+                else:
+                    pending.append((i, None, data))
+        else:
+            for i, (result, ocr_pages, payload) in enumerate(self._map_local(payloads)):
+                results[i] = result
+                if payload is not None:
+                    pending.append((i, ocr_pages, payload))
+        return results, pending
+
+    def _apply_ocr(self, results: List, pending, analyses: List) -> List:
+        for (i, ocr_pages, _), analysis in zip(pending, analyses):
+            if isinstance(analysis, Exception):
+                results[i] = analysis
+            elif ocr_pages is None:
+                results[i] = self._build_ocr_result(analysis)
+            else:
+                results[i] = self._build_routed_result(results[i], analysis, ocr_pages)
+        return results
+
+    def extract_many(self, sources, max_concurrency: Optional[int] = None) -> List:
+        """
+        Extrae texto de varios PDFs. Las páginas con capa de texto se leen localmente;
+        las escaneadas (o los documentos completos, según el modo) se envían a Azure
+        de forma concurrente (cliente asíncrono).
+
+        El parsing local se reparte en parse_workers procesos, enviando las
+        tareas en bloques de parse_chunksize documentos.
+
+        Args:
+            sources: Lista de PDFs (bytes, memoryview u objetos tipo archivo)
+            max_concurrency: Máximo de análisis OCR en vuelo
+
+        Returns:
+            list: Un resultado por documento en el orden de entrada
+                  (dict como extract_text, o la excepción de ese documento)
+        """
+        payloads = [read_document_bytes(s) for s in sources]
+        results, pending = self._plan_many(payloads)
+
+        if pending:
+            logger.info(f" Enviando {len(pending)} documento(s) a OCR en paralelo")
+            analyses = self.async_doc_service.analyze_many_sync(
+                [payload for _, _, payload in pending], max_concurrency
+            )
+            self._apply_ocr(results, pending, analyses)
+
+        return results
+
+    async def aextract_many(self, sources, max_concurrency: Optional[int] = None) -> List:
+        """
+        Versión asíncrona de extract_many para usar dentro de un event loop.
+
+        El parsing local (CPU) se ejecuta en un hilo aparte y el OCR usa el
+        cliente aio de Document Intelligence directamente.
+        """
+        payloads = [read_document_bytes(s) for s in sources]
+        results, pending = await asyncio.to_thread(self._plan_many, payloads)
+
+        if pending:
+            logger.info(f" Enviando {len(pending)} documento(s) a OCR en paralelo")
+            analyses = await self.async_doc_service.analyze_many(
+                [payload for _, _, payload in pending], max_concurrency
+            )
+            self._apply_ocr(results, pending, analyses)
+
+        return results
+
+    async def aextract_text(self, source) -> Dict[str, Any]:
+        """Versión asíncrona de extract_text (mismo resultado; las excepciones se propagan)"""
+        result = (await self.aextract_many([source]))[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def iter_pages(self, source):
+        """
+        Genera las páginas del documento con su posición en el texto completo.
+
+        En modo "local" las páginas se emiten a medida que PyPDF2 las parsea, y en
+        modo "ocr" en cuanto Azure devuelve el resultado; en "auto" primero se
+        decide el origen del documento completo.
+
+        Yields:
+            dict con page_number, text, line_count y offset
+        """
+        data = read_document_bytes(source)
+
+        if is_docx(data):
+            yield from iter_page_records(self._extract_docx(data)["page_texts"])
+        elif self.mode == "local":
+            yield from iter_page_records(self.pdf_text.iter_pages(data))
+        elif self.mode == "ocr":
+            yield from self.doc_service.iter_pages(data)
+        else:
+            yield from iter_page_records(self.extract_text(data)["page_texts"])
+
+    def extract_text_from_file(self, file_path: str) -> Dict[str, Any]:
+        """Extrae texto de un PDF o .docx en disco (ver extract_text)"""
+        if not os.path.exists(file_path):
+            raise Exception(f"❌ Archivo no encontrado: {file_path}")
+
+        with open(file_path, "rb") as f:
+            data = f.read()
+
+        return self.extract_text(data)
+
+    def extract_text_from_pdf(self, pdf_path: str) -> Dict[str, Any]:
+        """Alias histórico de extract_text_from_file"""
+        return self.extract_text_from_file(pdf_path)
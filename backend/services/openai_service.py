@@ -2,14 +2,16 @@
 Servicio centralizado para interactuar con OpenAI API o Azure OpenAI.
 """
 import json
-import sys
 import os
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)
-sys.path.insert(0, parent_dir)
-from config import settings
+from backend.config import settings
+from backend.services.cache_service import LLMCache
+from backend.services.resilience_service import get_resilience
+from backend.services.token_service import TokenCounter
+from backend.services.batch_api_service import BatchJobService
+from backend.utils.prompts import PROMPT_TEMPLATE_VERSION
 from openai import OpenAI, AzureOpenAI
-from typing import Optional, Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Callable
 
 
 
@@ -19,7 +21,7 @@ class OpenAIService:
     Detecta automáticamente cuál usar según la configuración.
     """
     
-    def __init__(self):
+    def __init__(self, cache=None, use_cache=None, prompt_version=None, resilience=None):
         """Inicializa el cliente según la configuración disponible"""
         self.client_type = settings.get_openai_client_type()
         
@@ -27,13 +29,14 @@ class OpenAIService:
             self.client = AzureOpenAI(
                 azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
                 api_key=settings.AZURE_OPENAI_KEY,
-                api_version=settings.AZURE_OPENAI_API_VERSION
+                api_version=settings.AZURE_OPENAI_API_VERSION,
+                max_retries=0
             )
             self.model = settings.AZURE_OPENAI_DEPLOYMENT
             print(f"Usando Azure OpenAI: {self.model}")
             
         elif self.client_type == "openai":
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            self.client = OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
             self.model = settings.OPENAI_MODEL
             print(f"Usando OpenAI API: {self.model}")
             
@@ -42,6 +45,78 @@ class OpenAIService:
                 "No se encontró configuración válida de OpenAI. "
                 "Por favor configura OPENAI_API_KEY o Azure OpenAI en .env"
             )
+
+        # Caché de respuestas (memoria + disco); LLM_CACHE_ENABLED=0 lo desactiva
+        if use_cache is None:
+            use_cache = os.getenv("LLM_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+        self.cache = cache if cache is not None else (LLMCache() if use_cache else None)
+        self.prompt_version = prompt_version or PROMPT_TEMPLATE_VERSION
+
+        # Reintentos con backoff / Retry-After y circuit breaker (el SDK no reintenta)
+        self.resilience = resilience or get_resilience("openai")
+        self.token_counter = TokenCounter()
+
+    def _create_completion(self, messages, temperature, max_tokens, response_format=None, parse=None):
+        """
+        Llamada al modelo con caché: las llamadas idénticas (modelo, mensajes,
+        temperature, formato, max_tokens y versión de prompts) no se repiten.
+
+        Si se pasa parse, se aplica a la respuesta y solo se guarda en caché
+        cuando el parseo funciona (una respuesta inválida no queda fija).
+        """
+        parse = parse or (lambda content: content)
+        key = self._cache_key(messages, temperature, max_tokens, response_format)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return parse(cached)
+
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if response_format:
+            params["response_format"] = response_format
+
+        response = self.resilience.call(self.client.chat.completions.create, **params)
+        content = response.choices[0].message.content.strip()
+        result = parse(content)
+
+        if key:
+            self.cache.set(key, content)
+        return result
+
+    def _cache_key(self, messages, temperature, max_tokens, response_format):
+        if not self.cache:
+            return None
+        return LLMCache.make_key(self.model, messages, temperature, response_format,
+                                 self.prompt_version, max_tokens=max_tokens)
+
+    @staticmethod
+    def _json_prompt(prompt: str) -> str:
+        # Asegurarse de que el prompt pida JSON
+        if "JSON" not in prompt and "json" not in prompt:
+            prompt += "\n\nResponde ÚNICAMENTE en formato JSON válido, sin texto adicional."
+        return prompt
+
+    @staticmethod
+    def _parse_json(content: str) -> Dict[str, Any]:
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            # Si falla, intentar limpiar y parsear de nuevo
+            content = content.replace("```json", "").replace("```", "").strip()
+            return json.loads(content)
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Estadísticas del caché de respuestas (None si está desactivado)"""
+        return self.cache.stats() if self.cache else None
+
+    def resilience_stats(self) -> Dict[str, Any]:
+        """Reintentos, throttling (429) y estado del circuit breaker"""
+        return self.resilience.stats()
     
     def get_completion(
         self,
@@ -63,8 +138,7 @@ class OpenAIService:
             Respuesta en texto plano
         """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            return self._create_completion(
                 messages=[
                     {"role": "system", "content": system_message},
                     {"role": "user", "content": prompt}
@@ -72,8 +146,6 @@ class OpenAIService:
                 temperature=temperature,
                 max_tokens=max_tokens
             )
-            
-            return response.choices[0].message.content.strip()
         
         except Exception as e:
             raise Exception(f"Error al llamar a OpenAI: {str(e)}")
@@ -98,41 +170,56 @@ class OpenAIService:
             Diccionario con la respuesta parseada
         """
         try:
-            # Asegurarse de que el prompt pida JSON
-            if "JSON" not in prompt and "json" not in prompt:
-                prompt += "\n\nResponde ÚNICAMENTE en formato JSON válido, sin texto adicional."
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
+            return self._create_completion(
                 messages=[
                     {"role": "system", "content": system_message},
-                    {"role": "user", "content": prompt}
+                    {"role": "user", "content": self._json_prompt(prompt)}
                 ],
                 temperature=temperature,
                 max_tokens=max_tokens,
-                response_format={"type": "json_object"}  # Fuerza respuesta JSON
+                response_format={"type": "json_object"},  # Fuerza respuesta JSON
+                parse=self._parse_json
             )
-            
-            content = response.choices[0].message.content.strip()
-            
-            # Intentar parsear JSON
-            try:
-                return json.loads(content)
-            except json.JSONDecodeError:
-                # Si falla, intentar limpiar y parsear de nuevo
-                content = content.replace("```json", "").replace("```", "").strip()
-                return json.loads(content)
         
         except Exception as e:
             raise Exception(f"Error al obtener respuesta estructurada: {str(e)}")
     
+    def _run_batch(
+        self,
+        call: Callable[[str], Any],
+        prompts: List[str],
+        max_workers: Optional[int],
+        return_exceptions: bool
+    ) -> List[Any]:
+        """
+        Ejecuta call(prompt) para cada prompt con como máximo max_workers
+        llamadas simultáneas. Los resultados conservan el orden de entrada y
+        un error solo afecta a su prompt.
+        """
+        if not prompts:
+            return []
+        max_workers = max_workers or int(os.getenv("LLM_MAX_WORKERS", "4"))
+
+        def run(prompt):
+            try:
+                return call(prompt)
+            except Exception as e:
+                print(f"Error procesando prompt: {str(e)}")
+                return e if return_exceptions else None
+
+        # Las llamadas son I/O: los hilos se solapan esperando a la API
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(prompts)))) as pool:
+            return list(pool.map(run, prompts))
+
     def get_batch_completions(
         self,
         prompts: List[str],
         system_message: str = "Eres un asistente experto en análisis de recursos humanos.",
         temperature: float = 0.7,
-        max_tokens: int = 2000
-    ) -> List[str]:
+        max_tokens: int = 2000,
+        max_workers: Optional[int] = None,
+        return_exceptions: bool = False
+    ) -> List[Optional[str]]:
         """
         Procesa múltiples prompts en paralelo (útil para procesar varios CVs).
         
@@ -141,40 +228,134 @@ class OpenAIService:
             system_message: Instrucciones del sistema
             temperature: Creatividad
             max_tokens: Máximo de tokens por respuesta
+            max_workers: Llamadas simultáneas (por defecto LLM_MAX_WORKERS o 4)
+            return_exceptions: Si es True, un prompt fallido devuelve su excepción en vez de None
             
         Returns:
             Lista de respuestas en el mismo orden
         """
-        results = []
+        return self._run_batch(
+            lambda prompt: self.get_completion(
+                prompt=prompt,
+                system_message=system_message,
+                temperature=temperature,
+                max_tokens=max_tokens
+            ),
+            prompts, max_workers, return_exceptions
+        )
+
+    def get_batch_structured_outputs(
+        self,
+        prompts: List[str],
+        system_message: str = "Eres un asistente que responde en formato JSON.",
+        temperature: float = 0.3,
+        max_tokens: int = 2000,
+        max_workers: Optional[int] = None,
+        return_exceptions: bool = False
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Versión en lote de get_structured_output, con el mismo paralelismo
+        acotado y orden de resultados que get_batch_completions.
         
-        for prompt in prompts:
+        Returns:
+            Lista de diccionarios en el mismo orden (None o la excepción si falló)
+        """
+        return self._run_batch(
+            lambda prompt: self.get_structured_output(
+                prompt=prompt,
+                system_message=system_message,
+                temperature=temperature,
+                max_tokens=max_tokens
+            ),
+            prompts, max_workers, return_exceptions
+        )
+    
+    def batch_jobs(self, **kwargs) -> BatchJobService:
+        """Servicio de la Batch API con el cliente y modelo configurados (ver batch_api_service)"""
+        return BatchJobService(self.client, self.model, resilience=self.resilience, **kwargs)
+
+    def run_offline_batch(
+        self,
+        prompts: List[str],
+        system_message: str = "Eres un asistente experto en análisis de recursos humanos.",
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        structured: bool = False,
+        name: Optional[str] = None,
+        timeout: Optional[float] = None,
+        batch_jobs: Optional[BatchJobService] = None
+    ) -> List[Any]:
+        """
+        Procesa muchos prompts con la Batch API (sin latencia interactiva, menor costo).
+
+        Los prompts ya presentes en el caché LLM no se envían y las respuestas
+        nuevas se guardan en él, así que re-ejecutar un lote solo paga lo nuevo.
+
+        Args:
+            prompts: Lista de prompts
+            structured: Si es True, cada respuesta se pide y se parsea como JSON
+            name: Prefijo de los archivos JSONL en BATCH_WORK_DIR
+            timeout: Segundos máximos esperando el batch (None = sin límite)
+
+        Returns:
+            Lista en el mismo orden que prompts: texto (o dict si structured) o
+            None si esa petición falló
+        """
+        response_format = {"type": "json_object"} if structured else None
+        parse = self._parse_json if structured else (lambda content: content.strip())
+
+        results: List[Any] = [None] * len(prompts)
+        requests, keys = [], {}
+        batch_jobs = batch_jobs or self.batch_jobs()
+
+        for i, prompt in enumerate(prompts):
+            messages = [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": self._json_prompt(prompt) if structured else prompt}
+            ]
+            key = self._cache_key(messages, temperature, max_tokens, response_format)
+            cached = self.cache.get(key) if key else None
+            if cached is not None:
+                results[i] = parse(cached)
+                continue
+
+            custom_id = f"prompt-{i}"
+            keys[custom_id] = (i, key)
+            requests.append(batch_jobs.build_request(
+                custom_id, messages, temperature=temperature, max_tokens=max_tokens,
+                response_format=response_format
+            ))
+
+        print(f"[Batch] {len(requests)} petición(es) nuevas, {len(prompts) - len(requests)} desde el caché")
+        for custom_id, content in batch_jobs.run(requests, name=name, timeout=timeout).items():
+            if custom_id not in keys:
+                continue
+            i, key = keys[custom_id]
+            if isinstance(content, Exception):
+                print(f"Error procesando prompt: {content}")
+                continue
             try:
-                result = self.get_completion(
-                    prompt=prompt,
-                    system_message=system_message,
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-                results.append(result)
+                results[i] = parse(content)
             except Exception as e:
-                print(f"Error procesando prompt: {str(e)}")
-                results.append(None)
-        
+                print(f"Error procesando prompt {custom_id}: {e}")
+                continue
+            if key:
+                self.cache.set(key, content.strip())
+
         return results
     
     def count_tokens(self, text: str) -> int:
         """
-        Estima el número de tokens en un texto.
-        Regla aproximada: 1 token ≈ 4 caracteres en inglés
+        Cuenta los tokens de un texto.
+        Usa tiktoken si está instalado; si no, un estimador local (ver token_service).
         
         Args:
             text: Texto a analizar
             
         Returns:
-            Número aproximado de tokens
+            Número de tokens
         """
-        # Aproximación simple (para uso más preciso, instalar tiktoken)
-        return len(text) // 4
+        return self.token_counter.count(text)
 
 
 # Instancia global del servicio
@@ -0,0 +1,116 @@
+"""
+Preprocesamiento de PDFs escaneados antes del OCR: reduce la resolución y
+recomprime las imágenes de página a un DPI suficiente para prebuilt-read
+"""
+import io
+import os
+import re
+from typing import Dict, Any, Tuple, Optional
+
+from PIL import Image
+from PyPDF2 import PdfReader
+
+
+class PdfImagePreprocessor:
+    """
+    Reescribe PDFs compuestos solo por imágenes (una por página) con imágenes
+    reducidas al DPI objetivo y recomprimidas en JPEG.
+
+    Los PDFs con capa de texto o con varias imágenes por página se envían sin
+    cambios: no se puede rehacer su contenido vectorial sin perder información.
+    """
+
+    def __init__(self, target_dpi: Optional[int] = None, jpeg_quality: Optional[int] = None,
+                 grayscale: bool = True, min_savings_ratio: float = 0.1):
+        self.target_dpi = target_dpi or int(os.getenv("OCR_TARGET_DPI", "200"))
+        self.jpeg_quality = jpeg_quality or int(os.getenv("OCR_JPEG_QUALITY", "75"))
+        self.grayscale = grayscale
+        self.min_savings_ratio = min_savings_ratio
+
+    def _report(self, data: bytes, processed: bytes, applied: bool, reason: str, pages: int = 0) -> Dict[str, Any]:
+        return {
+            "applied": applied,
+            "reason": reason,
+            "pages": pages,
+            "original_bytes": len(data),
+            "processed_bytes": len(processed),
+            "bytes_saved": len(data) - len(processed),
+        }
+
+    def _page_image(self, page) -> Optional[Image.Image]:
+        """Devuelve la imagen de una página escaneada, o None si la página no lo es"""
+        if re.sub(r"\s", "", page.extract_text() or ""):
+            return None
+
+        images = page.images
+        if len(images) != 1:
+            return None
+
+        return Image.open(io.BytesIO(images[0].data))
+
+    def _resize(self, image: Image.Image, page) -> Image.Image:
+        """
+        Reduce la imagen al DPI objetivo con un único factor de escala (conserva
+        la proporción aunque la imagen no llene exactamente la página).
+
+        Las páginas con /Rotate 90 o 270 se muestran giradas: la imagen se gira
+        igual y el objetivo usa ancho y alto intercambiados, porque el PDF
+        reescrito no conserva /Rotate.
+        """
+        width_in = float(page.mediabox.width) / 72
+        height_in = float(page.mediabox.height) / 72
+
+        rotation = int(page.get("/Rotate", 0) or 0) % 360
+        if rotation:
+            # /Rotate gira en sentido horario; Image.rotate, en sentido antihorario
+            image = image.rotate(-rotation, expand=True)
+        if rotation in (90, 270):
+            width_in, height_in = height_in, width_in
+
+        if self.grayscale:
+            image = image.convert("L")
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        scale = min(width_in * self.target_dpi / image.width, height_in * self.target_dpi / image.height)
+        # Solo se reduce: nunca se aumenta la resolución original
+        if scale < 1:
+            target = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(target, Image.LANCZOS)
+        return image
+
+    def preprocess(self, data: bytes) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        Returns:
+            (bytes a enviar a Azure, reporte con original_bytes, processed_bytes y bytes_saved)
+        """
+        try:
+            reader = PdfReader(io.BytesIO(data))
+            pages = list(reader.pages)
+        except Exception:
+            return data, self._report(data, data, False, "no es un PDF legible")
+
+        images = []
+        for page in pages:
+            try:
+                image = self._page_image(page)
+            except Exception:
+                image = None
+            if image is None:
+                return data, self._report(data, data, False, "el PDF no es solo imágenes", len(pages))
+            images.append(self._resize(image, page))
+
+        if not images:
+            return data, self._report(data, data, False, "PDF sin páginas")
+
+        out = io.BytesIO()
+        images[0].save(
+            out, "PDF", save_all=True, append_images=images[1:],
+            resolution=self.target_dpi, quality=self.jpeg_quality
+        )
+        processed = out.getvalue()
+
+        if len(processed) > len(data) * (1 - self.min_savings_ratio):
+            return data, self._report(data, data, False, "ahorro insuficiente", len(pages))
+
+        return processed, self._report(data, processed, True, "imágenes reducidas", len(pages))
@@ -0,0 +1,132 @@
+"""
+Extracción local de la capa de texto de PDFs digitales (sin OCR)
+"""
+import io
+import re
+from typing import List, Dict, Any, Tuple
+
+from PyPDF2 import PdfReader, PdfWriter
+
+
+# Caracteres "sanos" en un CV: letras (incluye tildes), dígitos, espacios y puntuación común
+_VALID_CHARS = re.compile(r"[\w\s.,;:()\-+/@&%#'\"!?¿¡*•·|–—]", re.UNICODE)
+_WORD = re.compile(r"[^\W\d_]{2,25}", re.UNICODE)
+
+
+def count_pdf_pages(data: bytes) -> int:
+    """Número de páginas de un PDF (solo lee la estructura, no el contenido)"""
+    return len(PdfReader(io.BytesIO(data)).pages)
+
+
+def split_pdf(data: bytes, chunk_pages: int) -> List[Tuple[int, bytes]]:
+    """
+    Divide un PDF en sub-PDFs de hasta chunk_pages páginas.
+
+    Returns:
+        list: (índice de la primera página, bytes del sub-PDF) en orden
+    """
+    reader = PdfReader(io.BytesIO(data))
+    chunks = []
+    for start in range(0, len(reader.pages), chunk_pages):
+        writer = PdfWriter()
+        for page in reader.pages[start:start + chunk_pages]:
+            writer.add_page(page)
+        out = io.BytesIO()
+        writer.write(out)
+        chunks.append((start, out.getvalue()))
+    return chunks
+
+
+def extract_pdf_pages(data: bytes, page_indices: List[int]) -> bytes:
+    """Crea un sub-PDF solo con las páginas indicadas (índices desde 0, en ese orden)"""
+    reader = PdfReader(io.BytesIO(data))
+    writer = PdfWriter()
+    for index in page_indices:
+        writer.add_page(reader.pages[index])
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def _resources_have_images(resources, depth: int = 0) -> bool:
+    """Busca XObjects de tipo imagen (también dentro de formularios anidados)"""
+    if resources is None or depth > 3:
+        return False
+    xobjects = resources.get_object().get("/XObject")
+    if not xobjects:
+        return False
+
+    for xobject in xobjects.get_object().values():
+        xobject = xobject.get_object()
+        subtype = xobject.get("/Subtype")
+        if subtype == "/Image":
+            return True
+        if subtype == "/Form" and _resources_have_images(xobject.get("/Resources"), depth + 1):
+            return True
+    return False
+
+
+class PdfTextService:
+    """Lee el texto embebido de un PDF con PyPDF2 y evalúa si es utilizable"""
+
+    def iter_pages(self, data: bytes):
+        """Genera el texto de cada página a medida que se parsea (cadena vacía si no tiene texto)"""
+        reader = PdfReader(io.BytesIO(data))
+        for page in reader.pages:
+            try:
+                yield page.extract_text() or ""
+            except Exception:
+                # Páginas con fuentes o streams corruptos: se tratan como sin texto
+                yield ""
+
+    def image_pages(self, data: bytes) -> List[int]:
+        """
+        Índices (desde 0) de las páginas que dibujan alguna imagen.
+
+        Solo inspecciona los recursos de cada página, sin decodificar las imágenes.
+        """
+        reader = PdfReader(io.BytesIO(data))
+        pages = []
+        for index, page in enumerate(reader.pages):
+            try:
+                if _resources_have_images(page.get("/Resources")):
+                    pages.append(index)
+            except Exception:
+                continue
+        return pages
+
+    def extract_pages(self, data: bytes) -> List[str]:
+        """Devuelve el texto de cada página (cadena vacía si la página no tiene texto)"""
+        return list(self.iter_pages(data))
+
+    @staticmethod
+    def assess_quality(pages: List[str]) -> Dict[str, Any]:
+        """
+        Métricas simples de densidad y calidad del texto extraído.
+
+        Returns:
+            dict con:
+              - chars_per_page: caracteres no blancos promedio por página
+              - valid_char_ratio: proporción de caracteres reconocibles
+              - word_ratio: proporción de tokens que parecen palabras
+              - quality: mínimo entre ambas proporciones (0-1)
+        """
+        text = "".join(pages)
+        non_blank = re.sub(r"\s", "", text)
+        n_pages = max(1, len(pages))
+
+        if not non_blank:
+            return {"chars_per_page": 0.0, "valid_char_ratio": 0.0, "word_ratio": 0.0, "quality": 0.0}
+
+        valid_ratio = len(_VALID_CHARS.findall(text)) / len(text)
+
+        tokens = text.split()
+        words = [t for t in tokens if _WORD.search(t)]
+        word_ratio = len(words) / len(tokens) if tokens else 0.0
+
+        return {
+            "chars_per_page": round(len(non_blank) / n_pages, 1),
+            "valid_char_ratio": round(valid_ratio, 3),
+            "word_ratio": round(word_ratio, 3),
+            "quality": round(min(valid_ratio, word_ratio), 3),
+        }
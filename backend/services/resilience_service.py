@@ -0,0 +1,299 @@
+"""
+Capa de resiliencia compartida para las llamadas a Azure OpenAI y Azure
+Document Intelligence: reintentos con backoff exponencial con jitter que
+respetan Retry-After, y un circuit breaker por servicio.
+
+Los clientes de los SDK se crean sin reintentos propios (max_retries=0 /
+retry_total=0) para que todos los reintentos pasen por aquí y queden en las
+estadísticas.
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Callable
+
+import openai
+from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+
+# Códigos HTTP transitorios: throttling, timeout y errores del servidor
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Errores de red sin código HTTP
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,  # incluye APITimeoutError
+    ServiceRequestError,
+    ServiceResponseError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class CircuitOpenError(Exception):
+    """El circuit breaker está abierto: la llamada se rechaza sin contactar al servicio"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuito '{name}' abierto: reintenta en {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def status_code_of(exc: BaseException) -> Optional[int]:
+    """Código HTTP de una excepción de openai o azure-core (None si no tiene)"""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after_of(exc: BaseException) -> Optional[float]:
+    """
+    Segundos indicados por el servicio en retry-after-ms, x-ms-retry-after-ms
+    o Retry-After (segundos o fecha HTTP). None si no hay cabecera válida.
+    """
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    for name in ("retry-after-ms", "x-ms-retry-after-ms"):
+        value = headers.get(name)
+        if value:
+            try:
+                return max(0.0, float(value) / 1000)
+            except ValueError:
+                pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, RETRYABLE_ERRORS):
+        return True
+    return status_code_of(exc) in RETRYABLE_STATUS
+
+
+class ResilienceService:
+    """
+    Ejecuta llamadas a un servicio externo con reintentos y circuit breaker.
+
+    - Reintentos: hasta max_retries; espera Retry-After si el servicio lo
+      envía y, si no, backoff exponencial con jitter completo:
+      uniform(0, min(max_delay, base_delay * 2**intento)).
+    - Circuit breaker: tras failure_threshold fallos transitorios seguidos se
+      abre durante reset_seconds (las llamadas fallan al instante con
+      CircuitOpenError); después deja pasar una llamada de prueba (half_open)
+      que lo cierra si funciona o lo vuelve a abrir si falla.
+    - Los errores no transitorios (400, 401, JSON inválido...) no se
+      reintentan ni cuentan para el breaker.
+    """
+
+    def __init__(self,
+                 name: str,
+                 max_retries: Optional[int] = None,
+                 base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None,
+                 failure_threshold: Optional[int] = None,
+                 reset_seconds: Optional[float] = None,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic,
+                 rng: Optional[random.Random] = None):
+        self.name = name
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("RETRY_MAX_RETRIES", "5"))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv("RETRY_BASE_SECONDS", "1"))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("RETRY_MAX_SECONDS", "30"))
+        self.failure_threshold = (
+            failure_threshold if failure_threshold is not None else int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+        )
+        self.reset_seconds = (
+            reset_seconds if reset_seconds is not None else float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+        )
+
+        self._sleep = sleep
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+
+        self.state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.throttled = 0
+        self.retry_after_honored = 0
+        self.backoff_seconds = 0.0
+        self.breaker_trips = 0
+        self.short_circuited = 0
+
+    # -------------------------------------------------------------------------
+    #     Circuit breaker
+    # -------------------------------------------------------------------------
+    def _before_attempt(self):
+        with self._lock:
+            if self.state == "open":
+                elapsed = self._clock() - self._opened_at
+                if elapsed < self.reset_seconds:
+                    self.short_circuited += 1
+                    raise CircuitOpenError(self.name, self.reset_seconds - elapsed)
+                self.state = "half_open"
+                self._probe_in_flight = False
+
+            if self.state == "half_open":
+                if self._probe_in_flight:
+                    self.short_circuited += 1
+                    raise CircuitOpenError(self.name, 0.0)
+                self._probe_in_flight = True
+
+    def _on_success(self):
+        with self._lock:
+            self.successes += 1
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            if self.state != "closed":
+                print(f"[Resilience:{self.name}] Circuito cerrado")
+            self.state = "closed"
+
+    def _on_failure(self, exc: BaseException) -> bool:
+        """Registra un fallo; devuelve True si es transitorio"""
+        retryable = is_retryable(exc)
+        with self._lock:
+            self._probe_in_flight = False
+            if not retryable:
+                if self.state == "half_open":
+                    self.state = "closed"  # el servicio respondió: no es un problema de disponibilidad
+                return False
+
+            if status_code_of(exc) == 429:
+                self.throttled += 1
+            self._consecutive_failures += 1
+            if self.state == "half_open" or (
+                self.state == "closed" and self._consecutive_failures >= self.failure_threshold
+            ):
+                self.state = "open"
+                self._opened_at = self._clock()
+                self.breaker_trips += 1
+                print(f"[Resilience:{self.name}] Circuito abierto tras "
+                      f"{self._consecutive_failures} fallos seguidos ({exc})")
+        return True
+
+    # -------------------------------------------------------------------------
+    #     Reintentos
+    # -------------------------------------------------------------------------
+    def _delay(self, exc: BaseException, attempt: int) -> float:
+        retry_after = retry_after_of(exc)
+        with self._lock:
+            if retry_after is not None:
+                # Un poco de jitter para que los hilos no vuelvan todos a la vez
+                self.retry_after_honored += 1
+                delay = retry_after + self._rng.uniform(0, min(1.0, self.base_delay))
+            else:
+                delay = self._rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+            self.retries += 1
+            self.backoff_seconds += delay
+        return delay
+
+    def _should_retry(self, exc: BaseException, attempt: int) -> bool:
+        transient = self._on_failure(exc)
+        if not transient or attempt >= self.max_retries or self.state == "open":
+            with self._lock:
+                self.failures += 1
+            return False
+        return True
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """Ejecuta fn(*args, **kwargs) con reintentos; propaga la última excepción"""
+        with self._lock:
+            self.calls += 1
+        attempt = 0
+        while True:
+            self._before_attempt()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                delay = self._delay(e, attempt)
+                print(f"[Resilience:{self.name}] Reintento {attempt + 1}/{self.max_retries} "
+                      f"en {delay:.1f}s ({status_code_of(e) or type(e).__name__})")
+                self._sleep(delay)
+                attempt += 1
+                continue
+            self._on_success()
+            return result
+
+    async def acall(self, fn: Callable, *args, **kwargs):
+        """Versión asíncrona de call: fn devuelve un awaitable y la espera no bloquea el event loop"""
+        with self._lock:
+            self.calls += 1
+        attempt = 0
+        while True:
+            self._before_attempt()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                delay = self._delay(e, attempt)
+                print(f"[Resilience:{self.name}] Reintento {attempt + 1}/{self.max_retries} "
+                      f"en {delay:.1f}s ({status_code_of(e) or type(e).__name__})")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._on_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de reintentos y estado del breaker (para ajustar límites de concurrencia)"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "retry_after_honored": self.retry_after_honored,
+                "backoff_seconds": round(self.backoff_seconds, 2),
+                "breaker_trips": self.breaker_trips,
+                "short_circuited": self.short_circuited,
+                "consecutive_failures": self._consecutive_failures,
+            }
+
+
+# Una instancia por servicio externo: todos los agentes del proceso comparten
+# el estado del breaker y las estadísticas del mismo endpoint
+_registry: Dict[str, ResilienceService] = {}
+_registry_lock = threading.Lock()
+
+
+def get_resilience(name: str) -> ResilienceService:
+    """Instancia compartida de la capa de resiliencia para un servicio ("openai", "document_intelligence")"""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = ResilienceService(name)
+        return _registry[name]
+
+
+def resilience_stats() -> Dict[str, Dict[str, Any]]:
+    """Estadísticas de todas las instancias compartidas"""
+    with _registry_lock:
+        services = list(_registry.values())
+    return {service.name: service.stats() for service in services}
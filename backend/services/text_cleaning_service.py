@@ -0,0 +1,162 @@
+"""
+Limpieza determinista del texto de un CV entre el OCR y la llamada a GPT:
+quita cabeceras/pies repetidos en cada página, números de página, líneas
+decorativas y frases de plantilla, y normaliza los espacios.
+"""
+import os
+import re
+import math
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from backend.services.token_service import TokenCounter
+
+
+# "3", "- 3 -", "3 de 5", "Página 3", "Pág. 3 de 5", "Page 3/5", "- 3/5 -".
+# "N/M" sin prefijo ni adornos no cuenta: suele ser una fecha ("12/19")
+PAGE_NUMBER_RE = re.compile(
+    r"^(?:"
+    r"[\s\-–—|]*(?:p[aá]g(?:ina)?\.?|page)\s*\d{1,3}(?:\s*(?:de|of|/)\s*\d{1,3})?[\s\-–—|]*"
+    r"|[\s\-–—|]*\d{1,3}(?:\s+(?:de|of)\s+\d{1,3})?[\s\-–—|]*"
+    r"|\s*[\-–—|]+\s*\d{1,3}\s*/\s*\d{1,3}\s*[\-–—|]+\s*"
+    r")$",
+    re.IGNORECASE,
+)
+
+# Líneas sin letras ni dígitos (separadores "-----", "• • •", "____")
+DECORATIVE_RE = re.compile(r"^[\W_]+$", re.UNICODE)
+
+# Herramientas que firman el pie de página de los CVs generados
+GENERATOR_NAMES = r"(?:canva|europass|linkedin|indeed|computrabajo|microsoft\s+word|word|google\s+docs|novoresume|zety|resume\.io|cvmaker|visualcv|flowcv|kickresume)(?:\.com)?"
+
+# Frases de plantilla que no aportan campos al perfil (línea completa)
+BOILERPLATE_PATTERNS = (
+    r"curr[ií]cul(?:um|o)\s+vitae",
+    r"hoja\s+de\s+vida",
+    r"resum[ée]",
+    r"cv",
+    r"documento\s+confidencial",
+    r"confidential",
+    r"(?:generado|creado)\s+(?:con|por|en)\s+" + GENERATOR_NAMES,
+    r"(?:generated|created)\s+(?:with|by|on)\s+" + GENERATOR_NAMES,
+    r"referencias\s+(?:disponibles\s+)?a\s+solicitud",
+    r"references\s+(?:available\s+)?(?:up)?on\s+request",
+)
+BOILERPLATE_RE = re.compile(r"^\s*(?:" + "|".join(BOILERPLATE_PATTERNS) + r")\s*[.:]?\s*$", re.IGNORECASE)
+
+_SPACES_RE = re.compile(r"[ \t\u00a0\u200b]+")
+
+
+class CVTextCleaner:
+    """
+    Limpia el texto por páginas de un CV.
+
+    Una línea se considera cabecera/pie repetido si su forma normalizada
+    (minúsculas, espacios colapsados) aparece en al menos
+    repeat_ratio de las páginas (mínimo 2) y está entre las edge_lines
+    primeras o últimas líneas de la página. Se conserva su primera aparición,
+    que suele llevar nombre y contacto, y se quitan las demás apariciones en
+    bordes de página (en el cuerpo se conservan). Los números
+    de página también se buscan solo en esas líneas de borde, para no borrar
+    cifras sueltas del cuerpo ("12/19", "3").
+    """
+
+    def __init__(self, counter: Optional[TokenCounter] = None,
+                 repeat_ratio: Optional[float] = None, edge_lines: Optional[int] = None):
+        self.counter = counter or TokenCounter()
+        self.repeat_ratio = repeat_ratio if repeat_ratio is not None else float(os.getenv("CV_CLEAN_REPEAT_RATIO", "0.5"))
+        self.edge_lines = edge_lines if edge_lines is not None else int(os.getenv("CV_CLEAN_EDGE_LINES", "3"))
+
+        self.documents = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(line: str) -> str:
+        # Los dígitos se conservan: fechas distintas en el borde ("2019 - 2021",
+        # "2020 - 2023") no son la misma cabecera
+        return " ".join(line.split()).lower()
+
+    def _repeated_keys(self, pages: List[List[str]]) -> set:
+        if len(pages) < 2:
+            return set()
+
+        counts: Dict[str, int] = {}
+        for lines in pages:
+            content = [line for line in lines if line.strip()]
+            edges = content[:self.edge_lines] + content[-self.edge_lines:]
+            for key in {self._normalize(line) for line in edges}:
+                counts[key] = counts.get(key, 0) + 1
+
+        threshold = max(2, math.ceil(self.repeat_ratio * len(pages)))
+        return {key for key, n in counts.items() if n >= threshold and key}
+
+    def clean_pages(self, page_texts: Sequence[str]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Limpia un documento dado como lista de textos por página.
+
+        Returns:
+            (texto limpio, reporte con original_tokens, cleaned_tokens,
+             tokens_saved y líneas quitadas por motivo)
+        """
+        pages = [text.splitlines() for text in page_texts]
+        repeated = self._repeated_keys(pages)
+        removed = {"repeated": 0, "page_numbers": 0, "decorative": 0, "boilerplate": 0}
+
+        seen_repeated = set()
+        out: List[str] = []
+        for lines in pages:
+            content = [i for i, raw in enumerate(lines) if raw.strip()]
+            edges = set(content[:self.edge_lines] + content[-self.edge_lines:])
+            for i, raw in enumerate(lines):
+                line = _SPACES_RE.sub(" ", raw).strip()
+                if not line:
+                    if out and out[-1] != "":
+                        out.append("")  # como mucho una línea en blanco seguida
+                    continue
+
+                key = self._normalize(line)
+                if i in edges and PAGE_NUMBER_RE.match(line):
+                    removed["page_numbers"] += 1
+                elif DECORATIVE_RE.match(line):
+                    removed["decorative"] += 1
+                elif BOILERPLATE_RE.match(line):
+                    removed["boilerplate"] += 1
+                elif i in edges and key in repeated and key in seen_repeated:
+                    removed["repeated"] += 1
+                else:
+                    seen_repeated.add(key)
+                    out.append(line)
+
+        cleaned = "\n".join(out).strip() + "\n" if out else ""
+        original_tokens = self.counter.count("".join(page_texts))
+        cleaned_tokens = self.counter.count(cleaned)
+
+        with self._lock:
+            self.documents += 1
+            self.tokens_before += original_tokens
+            self.tokens_after += cleaned_tokens
+
+        return cleaned, {
+            "original_tokens": original_tokens,
+            "cleaned_tokens": cleaned_tokens,
+            "tokens_saved": original_tokens - cleaned_tokens,
+            "removed_lines": removed,
+        }
+
+    def clean_result(self, result: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Limpia un resultado de IngestionService (usa page_texts si está, si no text)"""
+        return self.clean_pages(result.get("page_texts") or [result.get("text") or ""])
+
+    def stats(self) -> Dict[str, Any]:
+        """Tokens antes/después acumulados en todos los documentos limpiados"""
+        with self._lock:
+            saved = self.tokens_before - self.tokens_after
+            return {
+                "documents": self.documents,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "tokens_saved": saved,
+                "saved_ratio": round(saved / self.tokens_before, 3) if self.tokens_before else 0.0,
+            }
@@ -0,0 +1,193 @@
+"""
+Conteo de tokens y presupuesto de prompts: recorta el texto de CVs y ofertas
+a un máximo de tokens antes de enviarlo al modelo.
+
+Usa tiktoken si está instalado (pip install tiktoken) y puede cargar la
+codificación; si no, un estimador local que imita el pre-tokenizado de los
+BPE de OpenAI (palabras, números en grupos de 3 dígitos, puntuación), sin red.
+"""
+import os
+import re
+import math
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # dependencia opcional
+    tiktoken = None
+
+
+# Pre-tokenizado aproximado de cl100k/o200k: palabra con su espacio previo,
+# números de hasta 3 dígitos, puntuación y espacios
+_PIECE_RE = re.compile(r" ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+", re.UNICODE)
+
+# Tokens extra por mensaje en el formato chat (rol y separadores) y por la respuesta
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+def _estimate_piece(piece: str) -> int:
+    word = piece.strip()
+    if not word:
+        # Secuencias de espacios/saltos: ~1 token cada 4 caracteres
+        return max(1, math.ceil(len(piece) / 4))
+    if word.isdigit():
+        return 1
+    if word.isalpha():
+        # Palabras ASCII cortas suelen ser un token y las largas ~6 caracteres por
+        # token; con tildes/ñ el BPE las parte más
+        if word.isascii():
+            return 1 if len(word) <= 7 else math.ceil(len(word) / 6)
+        return max(1, math.ceil(len(word) / 4))
+    return max(1, math.ceil(len(word) / 2))
+
+
+class TokenCounter:
+    """
+    Cuenta tokens con la codificación del modelo.
+
+    encoding: nombre de la codificación de tiktoken (TOKENIZER_ENCODING, por
+    defecto o200k_base, la de gpt-4o / gpt-5). Si tiktoken no está o no puede
+    cargarla (sin red y sin caché local), se usa el estimador local.
+    """
+
+    def __init__(self, encoding: Optional[str] = None, use_tiktoken: bool = True):
+        self.encoding_name = encoding or os.getenv("TOKENIZER_ENCODING", "o200k_base")
+        self._encoding = None
+
+        if use_tiktoken and tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                print(f"[TokenCounter] No se pudo cargar {self.encoding_name} ({e}); se usa el estimador local")
+
+    @property
+    def exact(self) -> bool:
+        """True si los conteos vienen del tokenizador real"""
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return sum(_estimate_piece(piece) for piece in _PIECE_RE.findall(text))
+
+    def count_messages(self, messages: Sequence[Dict[str, str]]) -> int:
+        """Tokens de entrada de una llamada de chat (contenido + estructura de los mensajes)"""
+        return sum(TOKENS_PER_MESSAGE + self.count(m.get("content") or "") for m in messages) + TOKENS_PER_REPLY
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Prefijo de text con como máximo max_tokens tokens"""
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else self._encoding.decode(tokens[:max_tokens])
+
+        used = 0
+        end = 0
+        for match in _PIECE_RE.finditer(text):
+            used += _estimate_piece(match.group())
+            if used > max_tokens:
+                break
+            end = match.end()
+        return text[:end]
+
+
+class PromptBudgeter:
+    """
+    Ajusta el texto variable de un prompt (CV u oferta) a un máximo de tokens
+    de entrada (LLM_MAX_INPUT_TOKENS), descontando el system prompt y la
+    plantilla.
+
+    Si el texto no cabe:
+      1. se quitan líneas repetidas (cabeceras/pies que el OCR repite por página)
+      2. se conservan primero las líneas que coinciden con priority_patterns
+         (secciones clave) y luego el resto en orden del documento
+      3. las líneas elegidas se devuelven en su orden original
+    """
+
+    def __init__(self, counter: Optional[TokenCounter] = None, max_input_tokens: Optional[int] = None):
+        self.counter = counter or TokenCounter()
+        self.max_input_tokens = max_input_tokens or int(os.getenv("LLM_MAX_INPUT_TOKENS", "8000"))
+
+    def available(self, messages: Sequence[Dict[str, str]], max_input_tokens: Optional[int] = None) -> int:
+        """Tokens libres para el texto variable dados los mensajes sin él"""
+        return max(0, (max_input_tokens or self.max_input_tokens) - self.counter.count_messages(messages))
+
+    def fit(self, text: str, max_tokens: int,
+            priority_patterns: Sequence[str] = ()) -> Tuple[str, Dict[str, Any]]:
+        """
+        Recorta text a max_tokens tokens.
+
+        Returns:
+            (texto ajustado, reporte con original_tokens, final_tokens,
+             trimmed, dropped_lines y exact)
+        """
+        original = self.counter.count(text or "")
+        report = {"original_tokens": original, "final_tokens": original, "trimmed": False,
+                  "dropped_lines": 0, "exact": self.counter.exact}
+        if not text or original <= max_tokens:
+            return text, report
+
+        lines = text.splitlines()
+        seen = set()
+        candidates: List[Tuple[int, str]] = []
+        for i, line in enumerate(lines):
+            key = " ".join(line.split()).lower()
+            if key and key in seen:
+                continue
+            seen.add(key)
+            candidates.append((i, line))
+
+        priority = re.compile("|".join(priority_patterns), re.IGNORECASE) if priority_patterns else None
+        ranked = sorted(candidates, key=lambda c: 0 if priority and priority.search(c[1]) else 1)
+
+        kept = {}
+        used = 0
+        for i, line in ranked:
+            cost = self.counter.count(line) + 1  # salto de línea
+            if used + cost <= max_tokens:
+                kept[i] = line
+                used += cost
+            elif not kept and max_tokens - used > 0:
+                # Ni la primera línea cabe completa: se corta
+                kept[i] = self.counter.truncate(line, max_tokens - used - 1)
+                used = max_tokens
+                break
+
+        fitted = "\n".join(kept[i] for i in sorted(kept))
+        report.update({
+            "final_tokens": self.counter.count(fitted),
+            "trimmed": True,
+            "dropped_lines": len(lines) - len(kept),
+        })
+        return fitted, report
+
+    def fit_prompt(self, base_messages: Sequence[Dict[str, str]], text: str,
+                   priority_patterns: Sequence[str] = (),
+                   max_input_tokens: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Ajusta text para que base_messages + text no superen el máximo de entrada.
+
+        Args:
+            base_messages: Mensajes de la llamada con el texto variable vacío
+            text: Texto del CV u oferta
+        """
+        return self.fit(text, self.available(base_messages, max_input_tokens), priority_patterns)
+
+
+# Secciones que se conservan primero al recortar
+CV_PRIORITY_PATTERNS = (
+    r"@", r"\+?\d[\d\s().-]{7,}", r"linkedin",
+    r"experiencia", r"experience", r"educaci[oó]n", r"education", r"formaci[oó]n",
+    r"skills", r"habilidades", r"competencias", r"conocimientos", r"idiomas", r"languages",
+)
+
+JOB_PRIORITY_PATTERNS = (
+    r"requisit", r"requirement", r"responsabilidad", r"responsibilit", r"funciones",
+    r"experiencia", r"experience", r"conocimientos", r"skills", r"habilidades",
+    r"educaci[oó]n", r"formaci[oó]n", r"idiomas", r"ubicaci[oó]n", r"modalidad",
+    r"salario", r"beneficios", r"deseable", r"nice to have",
+)
@@ -0,0 +1,181 @@
+"""
+Recepción de archivos subidos con memoria acotada:
+  - copia por bloques a buffers "spooled" (en RAM hasta un umbral, luego a disco)
+  - rechazo temprano de archivos que superan MAX_FILE_SIZE_MB
+  - límite de archivos por lote (MAX_CVS_PER_ANALYSIS)
+  - medición de memoria por lote: RSS inicial y su variación (tracemalloc
+    solo con UPLOAD_TRACE_MEMORY)
+"""
+import os
+import time
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from typing import Optional, Dict, Any
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from backend.config import settings
+
+
+class UploadRejectedError(ValueError):
+    """El archivo o el lote no cumple los límites configurados"""
+
+
+class UploadService:
+    """Convierte uploads (UploadedFile de Streamlit, archivos abiertos, streams) en buffers acotados"""
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, max_file_size_mb: Optional[float] = None, max_files: Optional[int] = None,
+                 spool_max_mb: float = 2):
+        self.max_file_size_mb = max_file_size_mb if max_file_size_mb is not None else settings.MAX_FILE_SIZE_MB
+        self.max_files = max_files if max_files is not None else settings.MAX_CVS_PER_ANALYSIS
+        self.max_bytes = int(self.max_file_size_mb * 1024 * 1024)
+        self.spool_max_bytes = int(spool_max_mb * 1024 * 1024)
+
+    # -------------------------------------------------------------------------
+    #     Validaciones
+    # -------------------------------------------------------------------------
+    def check_batch(self, uploads):
+        """Rechaza el lote completo si supera MAX_CVS_PER_ANALYSIS"""
+        if len(uploads) > self.max_files:
+            raise UploadRejectedError(
+                f"❌ El lote tiene {len(uploads)} archivos; el máximo permitido es {self.max_files}"
+            )
+
+    @staticmethod
+    def _seekable(upload) -> bool:
+        if hasattr(upload, "seekable"):
+            return upload.seekable()
+        return hasattr(upload, "seek")
+
+    @staticmethod
+    def declared_size(upload) -> Optional[int]:
+        """Tamaño conocido sin leer el contenido (atributo size o posición final del stream)"""
+        size = getattr(upload, "size", None)
+        if isinstance(size, int):
+            return size
+
+        if hasattr(upload, "seek") and hasattr(upload, "tell"):
+            try:
+                pos = upload.tell()
+                upload.seek(0, os.SEEK_END)
+                size = upload.tell()
+                upload.seek(pos)
+                return size
+            except (OSError, ValueError):
+                return None
+        return None
+
+    def _reject_size(self, name: str, size: int):
+        raise UploadRejectedError(
+            f"❌ {name} pesa {size / (1024 * 1024):.1f} MB; el máximo es {self.max_file_size_mb} MB"
+        )
+
+    # -------------------------------------------------------------------------
+    #     Spooling
+    # -------------------------------------------------------------------------
+    def spool(self, upload, name: Optional[str] = None, size: Optional[int] = None):
+        """
+        Copia el upload por bloques a un SpooledTemporaryFile.
+
+        El tamaño se valida antes de leer (si se conoce) y durante la copia,
+        de modo que nunca se carga completo un archivo demasiado grande.
+
+        Nota: un UploadedFile de Streamlit ya está completo en memoria; copiarlo
+        aquí agrega una segunda copia (en RAM hasta spool_max_mb, luego en disco)
+        en vez de acotar la memoria. Lo que sí se evita es rechazar tarde los
+        archivos grandes y acumular bytes crudos de todo el lote. Para streams
+        (miembros ZIP, archivos abiertos) la copia por bloques sí acota la memoria.
+
+        Args:
+            size: Tamaño ya conocido (p.ej. de un miembro ZIP); evita buscar el final del stream
+
+        Returns:
+            SpooledTemporaryFile posicionado al inicio
+        """
+        name = name or getattr(upload, "name", "archivo")
+
+        if size is None:
+            size = self.declared_size(upload)
+        if size is not None and size > self.max_bytes:
+            self._reject_size(name, size)
+
+        if self._seekable(upload):
+            upload.seek(0)
+
+        buffer = tempfile.SpooledTemporaryFile(max_size=self.spool_max_bytes, mode="w+b")
+        copied = 0
+        while True:
+            chunk = upload.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            copied += len(chunk)
+            if copied > self.max_bytes:
+                buffer.close()
+                self._reject_size(name, copied)
+            buffer.write(chunk)
+
+        buffer.seek(0)
+        return buffer
+
+    # -------------------------------------------------------------------------
+    #     Memoria por lote
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def current_rss() -> Optional[int]:
+        """RSS actual del proceso en bytes, o None si /proc no está disponible"""
+        try:
+            with open("/proc/self/statm", "r") as f:
+                resident_pages = int(f.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            return None
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+    @contextmanager
+    def track_batch(self, trace_python: Optional[bool] = None):
+        """
+        Mide la duración y la memoria de un lote. El dict devuelto se completa
+        al salir del bloque:
+          - rss_start_mb / rss_delta_mb: RSS al empezar y su variación durante
+            el lote (leído de /proc/self/statm; solo en Linux)
+          - process_max_rss_mb: pico histórico de todo el proceso (ru_maxrss);
+            no se reinicia entre lotes, así que no es el pico de este lote
+
+        trace_python (por defecto UPLOAD_TRACE_MEMORY=0) agrega el pico de
+        memoria de Python con tracemalloc; queda apagado en producción porque
+        encarece cada asignación durante todo el análisis.
+        """
+        if trace_python is None:
+            trace_python = os.getenv("UPLOAD_TRACE_MEMORY", "0").lower() in ("1", "true", "yes")
+
+        report: Dict[str, Any] = {}
+        started_here = trace_python and not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start()
+        if trace_python:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        rss_start = self.current_rss()
+
+        try:
+            yield report
+        finally:
+            if trace_python:
+                _, peak = tracemalloc.get_traced_memory()
+                if started_here:
+                    tracemalloc.stop()
+                report["python_peak_mb"] = round(peak / (1024 * 1024), 2)
+
+            report["duration_s"] = round(time.perf_counter() - start, 2)
+            rss_end = self.current_rss()
+            if rss_start is not None and rss_end is not None:
+                report["rss_start_mb"] = round(rss_start / (1024 * 1024), 1)
+                report["rss_delta_mb"] = round((rss_end - rss_start) / (1024 * 1024), 1)
+            if resource is not None:
+                # ru_maxrss está en KB en Linux
+                report["process_max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
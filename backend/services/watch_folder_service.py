@@ -0,0 +1,308 @@
+"""
+Ingesta continua desde una carpeta vigilada (inbox): detecta CVs nuevos o
+modificados de forma incremental, los procesa con ExtractorAgent y escribe
+los perfiles en disco.
+
+Uso:
+    python -m backend.services.watch_folder_service --inbox data/inbox --once
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+from backend.config import settings
+
+
+class IngestionJournal:
+    """
+    Registro en disco de los archivos ya vistos (ruta relativa → estado).
+
+    Cada entrada guarda mtime_ns, size, sha256, status ("done", "duplicate",
+    "error", "rejected"), attempts, output y processed_at. El archivo es JSONL
+    de solo-anexar (una línea por registro, la última gana): escribir un
+    registro cuesta lo mismo con 10 o con 10.000 archivos, y una línea
+    truncada por un corte se ignora al reiniciar. Al cargar se compacta.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._by_hash: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # línea incompleta (corte durante la escritura)
+                    self.entries[record["path"]] = record["entry"]
+
+        self._by_hash = {
+            entry["sha256"]: rel for rel, entry in self.entries.items()
+            if entry.get("status") == "done"
+        }
+        self.compact()
+
+    def compact(self):
+        """Reescribe el journal con una línea por archivo (escritura atómica)"""
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    for rel, entry in self.entries.items():
+                        f.write(json.dumps({"path": rel, "entry": entry}, ensure_ascii=False) + "\n")
+                os.replace(tmp, self.path)
+            except Exception:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+
+    def get(self, rel_path: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(rel_path)
+
+    def find_by_hash(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Entrada "done" con ese contenido (None si ningún archivo lo tiene ya)"""
+        with self._lock:
+            rel = self._by_hash.get(sha256)
+            entry = self.entries.get(rel) if rel else None
+            if entry and entry.get("sha256") == sha256 and entry.get("status") == "done":
+                return entry
+
+            # El archivo indexado cambió de contenido: se busca otro con ese hash
+            self._by_hash.pop(sha256, None)
+            for rel, entry in self.entries.items():
+                if entry.get("sha256") == sha256 and entry.get("status") == "done":
+                    self._by_hash[sha256] = rel
+                    return entry
+            return None
+
+    def record(self, rel_path: str, entry: Dict[str, Any]):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"path": rel_path, "entry": entry}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries[rel_path] = entry
+            if entry.get("status") == "done":
+                self._by_hash[entry["sha256"]] = rel_path
+
+
+class WatchFolderService:
+    """
+    Daemon de ingesta incremental.
+
+    Un archivo se vuelve a procesar solo si cambian su mtime o su tamaño y,
+    además, su hash; copias con el mismo contenido reutilizan el perfil ya generado.
+    """
+
+    SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+
+    def __init__(self,
+                 inbox_dir: Optional[str] = None,
+                 output_dir: Optional[str] = None,
+                 journal_path: Optional[str] = None,
+                 agent=None,
+                 poll_interval: Optional[float] = None,
+                 settle_seconds: Optional[float] = None,
+                 max_attempts: int = 3):
+        self.inbox_dir = inbox_dir or os.getenv("WATCH_INBOX_DIR", settings.SAMPLE_CVS_DIR)
+        self.output_dir = output_dir or os.getenv("WATCH_OUTPUT_DIR", os.path.join(settings.DATA_DIR, "profiles"))
+        journal_path = journal_path or os.getenv(
+            "WATCH_JOURNAL_PATH", os.path.join(self.output_dir, ".watch_journal.jsonl")
+        )
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv("WATCH_POLL_SECONDS", "10"))
+        # Archivos modificados hace menos de settle_seconds se consideran aún en copia
+        self.settle_seconds = settle_seconds if settle_seconds is not None else float(os.getenv("WATCH_SETTLE_SECONDS", "2"))
+        self.max_attempts = max_attempts
+        self.max_bytes = int(settings.MAX_FILE_SIZE_MB * 1024 * 1024)
+
+        os.makedirs(self.inbox_dir, exist_ok=True)
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        self.journal = IngestionJournal(journal_path)
+        self._agent = agent
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            from backend.agents.extractor_agent import ExtractorAgent
+            self._agent = ExtractorAgent()
+        return self._agent
+
+    # -------------------------------------------------------------------------
+    #     Detección de cambios
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def file_hash(path: str) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _iter_files(self):
+        output = os.path.abspath(self.output_dir)
+        for root, dirs, files in os.walk(self.inbox_dir):
+            dirs[:] = sorted(
+                d for d in dirs
+                if not d.startswith(".") and os.path.abspath(os.path.join(root, d)) != output
+            )
+            for name in sorted(files):
+                if name.startswith(".") or not name.lower().endswith(self.SUPPORTED_EXTENSIONS):
+                    continue
+                yield os.path.join(root, name)
+
+    def _needs_processing(self, entry: Optional[Dict[str, Any]], stat) -> bool:
+        if entry is None:
+            return True
+        if entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            return True
+        return entry["status"] == "error" and entry.get("attempts", 0) < self.max_attempts
+
+    # -------------------------------------------------------------------------
+    #     Procesamiento
+    # -------------------------------------------------------------------------
+    def _write_profile(self, rel_path: str, sha256: str, profile: Dict[str, Any]) -> str:
+        stem = os.path.splitext(os.path.basename(rel_path))[0]
+        output = os.path.join(self.output_dir, f"{stem}-{sha256[:12]}.json")
+
+        fd, tmp = tempfile.mkstemp(dir=self.output_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"archivo": rel_path, "sha256": sha256, "perfil": profile}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, output)
+        return output
+
+    def process_file(self, path: str, stat=None) -> str:
+        """
+        Procesa un archivo del inbox y lo registra en el journal.
+
+        Returns:
+            str: Estado registrado ("done", "duplicate", "unchanged", "error" o "rejected")
+        """
+        rel_path = os.path.relpath(path, self.inbox_dir)
+        stat = stat or os.stat(path)
+        previous = self.journal.get(rel_path)
+        entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                 "processed_at": datetime.now().isoformat()}
+
+        if stat.st_size > self.max_bytes:
+            entry.update({"sha256": None, "status": "rejected", "output": None})
+            self.journal.record(rel_path, entry)
+            return "rejected"
+
+        sha256 = self.file_hash(path)
+        entry["sha256"] = sha256
+
+        # Solo cambió el mtime (p.ej. touch o copia con el mismo contenido)
+        if previous and previous.get("sha256") == sha256 and previous["status"] in ("done", "duplicate"):
+            entry.update({"status": previous["status"], "output": previous["output"]})
+            self.journal.record(rel_path, entry)
+            return "unchanged"
+
+        same_content = self.journal.find_by_hash(sha256)
+        if same_content is not None:
+            entry.update({"status": "duplicate", "output": same_content["output"]})
+            self.journal.record(rel_path, entry)
+            return "duplicate"
+
+        try:
+            with open(path, "rb") as f:
+                profile = self.agent.process_cv_bytes(f)
+        except Exception as e:
+            # Se registra para que cuente en max_attempts y no se reintente en cada recorrido
+            profile = {"error": f"{type(e).__name__}: {e}"}
+
+        if "error" in profile:
+            retry = previous and previous.get("sha256") == sha256 and previous["status"] == "error"
+            attempts = previous.get("attempts", 0) + 1 if retry else 1
+            entry.update({"status": "error", "output": None, "error": profile["error"], "attempts": attempts})
+            self.journal.record(rel_path, entry)
+            return "error"
+
+        entry.update({"status": "done", "output": self._write_profile(rel_path, sha256, profile)})
+        self.journal.record(rel_path, entry)
+        return "done"
+
+    def run_once(self) -> Dict[str, int]:
+        """
+        Recorre el inbox una vez y procesa solo lo nuevo o modificado.
+
+        Returns:
+            dict con scanned, skipped (sin cambios), pending (aún en copia) y
+            un contador por estado devuelto por process_file
+        """
+        report = {"scanned": 0, "skipped": 0, "pending": 0, "done": 0, "duplicate": 0,
+                  "unchanged": 0, "error": 0, "rejected": 0}
+        now = time.time()
+
+        for path in self._iter_files():
+            report["scanned"] += 1
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # borrado durante el recorrido
+
+            if not self._needs_processing(self.journal.get(os.path.relpath(path, self.inbox_dir)), stat):
+                report["skipped"] += 1
+                continue
+            if now - stat.st_mtime < self.settle_seconds:
+                report["pending"] += 1
+                continue
+
+            try:
+                status = self.process_file(path, stat)
+            except Exception as e:
+                print(f"[WatchFolder] Error procesando {path}: {e}")
+                status = "error"
+            report[status] += 1
+            if status in ("done", "error"):
+                print(f"[WatchFolder] {status}: {path}")
+
+        return report
+
+    def run_forever(self, stop_event: Optional[threading.Event] = None):
+        """Repite run_once cada poll_interval segundos hasta que se active stop_event (o Ctrl+C)"""
+        stop_event = stop_event or threading.Event()
+        print(f"[WatchFolder] Vigilando {self.inbox_dir} → {self.output_dir}")
+
+        try:
+            while not stop_event.is_set():
+                report = self.run_once()
+                if report["done"] or report["error"]:
+                    print(f"[WatchFolder] {report}")
+                stop_event.wait(self.poll_interval)
+        except KeyboardInterrupt:
+            print("[WatchFolder] Detenido")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Ingesta continua de CVs desde una carpeta")
+    parser.add_argument("--inbox", help="Carpeta a vigilar (WATCH_INBOX_DIR)")
+    parser.add_argument("--output", help="Carpeta de perfiles JSON (WATCH_OUTPUT_DIR)")
+    parser.add_argument("--journal", help="Ruta del journal (WATCH_JOURNAL_PATH)")
+    parser.add_argument("--interval", type=float, help="Segundos entre recorridos (WATCH_POLL_SECONDS)")
+    parser.add_argument("--once", action="store_true", help="Procesa lo pendiente y termina")
+    args = parser.parse_args(argv)
+
+    service = WatchFolderService(inbox_dir=args.inbox, output_dir=args.output,
+                                 journal_path=args.journal, poll_interval=args.interval)
+    if args.once:
+        print(service.run_once())
+    else:
+        service.run_forever()
+
+
+if __name__ == "__main__":
+    main()
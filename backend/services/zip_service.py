@@ -0,0 +1,81 @@
+"""
+Ingesta de paquetes ZIP de CVs: recorre los miembros del archivo uno a uno,
+sin descomprimirlo completo a disco ni a memoria
+"""
+import os
+import zipfile
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+from backend.services.upload_service import UploadService, UploadRejectedError
+
+
+class ZipIngestionService:
+    """
+    Extrae de un ZIP los CVs soportados (.pdf, .docx) como buffers acotados.
+
+    Las entradas de directorio, los formatos no soportados (incluidos ZIPs anidados
+    y metadatos de macOS) y los miembros demasiado grandes se omiten y se cuentan.
+    Los CVs dentro de carpetas sí se procesan y se nombran con su ruta completa
+    en el ZIP, para que "equipo_a/cv.pdf" y "equipo_b/cv.pdf" no se confundan.
+    """
+
+    SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+
+    def __init__(self, upload_service: Optional[UploadService] = None, max_members: Optional[int] = None):
+        self.uploads = upload_service or UploadService()
+        # max_members=0 es válido: el cupo del lote ya se agotó
+        self.max_members = max_members if max_members is not None else int(os.getenv("ZIP_MAX_MEMBERS", "1000"))
+
+    def _is_supported(self, info: zipfile.ZipInfo) -> bool:
+        name = info.filename
+        base = os.path.basename(name)
+        if name.startswith("__MACOSX/") or base.startswith("._"):
+            return False
+        return base.lower().endswith(self.SUPPORTED_EXTENSIONS)
+
+    def iter_members(self, source, report: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Genera (nombre, buffer) por cada CV del ZIP, de a uno. El nombre es la
+        ruta completa del miembro (incluye sus carpetas).
+
+        Cada buffer es un SpooledTemporaryFile que se cierra al pedir el siguiente
+        miembro, así que debe procesarse dentro de la iteración.
+
+        Args:
+            source: Ruta al ZIP u objeto tipo archivo con posibilidad de seek (UploadedFile)
+            report: dict opcional que se completa con members, processed,
+                    skipped_directories, skipped_unsupported y rejected
+        """
+        report = report if report is not None else {}
+        report.update({"members": 0, "processed": 0, "skipped_directories": 0,
+                       "skipped_unsupported": 0, "rejected": 0})
+
+        with zipfile.ZipFile(source) as archive:
+            infos = archive.infolist()
+            report["members"] = len(infos)
+
+            for info in infos:
+                if info.is_dir():
+                    report["skipped_directories"] += 1
+                    continue
+                if not self._is_supported(info):
+                    report["skipped_unsupported"] += 1
+                    continue
+                if report["processed"] >= self.max_members:
+                    report["rejected"] += 1
+                    continue
+
+                name = info.filename
+                try:
+                    # file_size viene del directorio central: los miembros enormes se descartan sin descomprimir
+                    with archive.open(info) as member:
+                        buffer = self.uploads.spool(member, name, size=info.file_size)
+                except (UploadRejectedError, zipfile.BadZipFile, NotImplementedError, RuntimeError) as e:
+                    # RuntimeError: miembros cifrados
+                    print(f"[ZIP] Miembro omitido {info.filename}: {e}")
+                    report["rejected"] += 1
+                    continue
+
+                report["processed"] += 1
+                with buffer:
+                    yield name, buffer
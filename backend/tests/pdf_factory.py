@@ -0,0 +1,35 @@
+"""
+Generador mínimo de PDFs para pruebas (sin dependencias externas)
+"""
+import io
+from typing import List
+
+from PIL import Image
+
+from backend.utils.corpus_generator import build_pdf
+
+
+def make_text_pdf(pages: List[str]) -> bytes:
+    """Crea un PDF con capa de texto (una página por elemento, Helvetica)"""
+    return build_pdf(pages)
+
+
+def make_image_pdf(n_pages: int = 1, size=(1700, 2200), dpi: int = 200) -> bytes:
+    """Crea un PDF escaneado (solo imágenes, sin capa de texto)"""
+    images = [Image.new("RGB", size, (255, 255, 255 - i)) for i in range(n_pages)]
+    out = io.BytesIO()
+    images[0].save(out, "PDF", save_all=True, append_images=images[1:], resolution=dpi)
+    return out.getvalue()
+
+
+def merge_pdfs(*documents: bytes) -> bytes:
+    """Concatena las páginas de varios PDFs en uno"""
+    from PyPDF2 import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for data in documents:
+        for page in PdfReader(io.BytesIO(data)).pages:
+            writer.add_page(page)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
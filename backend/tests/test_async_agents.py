@@ -0,0 +1,124 @@
+"""
+Pruebas de las variantes asíncronas de los agentes (clientes simulados, sin red)
+"""
+import json
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.agents.extractor_agent import ExtractorAgent
+from backend.agents.job_analyzer import JobAnalyzerAgent
+from backend.agents.cv_matcher import CVMatcherAgent
+from backend.tests.pdf_factory import make_text_pdf
+
+CV_TEXT = "Ana Torres - Data Engineer. Python, SQL y Spark. " * 10
+JOB_TEXT = "Buscamos Data Engineer con Python y SQL. " * 10
+
+
+class FakeAsyncCompletions:
+    """Responde según el system prompt y registra el pico de llamadas en vuelo"""
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def create(self, model, messages, **params):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+
+        system, user = messages[0]["content"], messages[-1]["content"]
+        if "extractor" in system:
+            content = "```json\n" + json.dumps({"nombre": user.split("\n")[1].split(" -")[0]}) + "\n```"
+        elif "reclutamiento" in system:
+            skills = json.loads(user)["candidate_profile"]["skills_tecnicas"]
+            content = json.dumps({"match_score": 40 + 20 * len(skills), "justification": "ok"})
+        elif params.get("response_format"):
+            content = json.dumps({"title": "Data Engineer", "technical_requirements": ["Python", "SQL"]})
+        else:
+            content = "  Resumen del puesto  "
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _fake(completions):
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+@pytest.fixture
+def azure_env(monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_KEY", "fake-key")
+    monkeypatch.setenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com/")
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT", "gpt-test")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    monkeypatch.setenv("PDF_TEXT_MODE", "local")
+
+
+def test_extractor_async_matches_sync_parsing(azure_env, tmp_path):
+    agent = ExtractorAgent(openai_endpoint="https://example.openai.azure.com/", openai_key="k", text_mode="local")
+    completions = FakeAsyncCompletions()
+    agent._async_ai_client = _fake(completions)
+
+    path = tmp_path / "cv.pdf"
+    path.write_bytes(make_text_pdf([CV_TEXT]))
+
+    assert asyncio.run(agent.aprocess_cv(str(path))) == {"nombre": "Ana Torres"}
+    assert asyncio.run(agent.aprocess_cv(str(tmp_path / "no.pdf"))) == {"error": "OCR falló"}
+
+    profiles = asyncio.run(agent.aprocess_cv_batch([make_text_pdf([CV_TEXT])] * 4 + [b"roto"], llm_workers=2))
+    assert profiles[:4] == [{"nombre": "Ana Torres"}] * 4
+    assert "error" in profiles[4]
+    assert completions.peak == 2
+
+
+def test_job_analyzer_async_variants(azure_env, tmp_path):
+    agent = JobAnalyzerAgent()
+    agent.openai_service._async_client = _fake(FakeAsyncCompletions())
+
+    job = asyncio.run(agent.aprocess_job_from_text(JOB_TEXT))
+    assert job.analysis.title == "Data Engineer"
+    assert job.document_metadata == {"source": "text_input", "executive_summary": "Resumen del puesto"}
+
+    path = tmp_path / "job.pdf"
+    path.write_bytes(make_text_pdf([JOB_TEXT]))
+    job = asyncio.run(agent.aprocess_job_from_pdf(str(path), generate_summary=False))
+    assert job.document_metadata["text_source"] == "local"
+    assert job.document_metadata["tables_count"] == 0
+    assert job.original_text.startswith("Buscamos Data Engineer")
+
+    # Las tablas del OCR se cuentan en los metadatos
+    extraction = agent._build_extraction({"text": JOB_TEXT, "pages": 1, "source": "ocr", "tables": [{}, {}]})
+    assert extraction["metadata"]["tables_count"] == 2
+
+    job = asyncio.run(agent.aprocess_job_from_bytes(path.read_bytes(), generate_summary=False))
+    assert job.analysis.technical_requirements == ["Python", "SQL"]
+
+
+def test_matcher_amatch_batch_runs_concurrently_and_ranks(azure_env):
+    agent = CVMatcherAgent()
+    completions = FakeAsyncCompletions(delay=0.2)
+    agent.openai._async_client = _fake(completions)
+    job = SimpleNamespace(
+        technical_requirements=["Python", "SQL"], ats_keywords=[], soft_skills=[],
+        experience_required=None, education=None,
+        model_dump=lambda: {"title": "Data Engineer"},
+    )
+    candidates = [{"skills_tecnicas": ["Python"] * n} for n in (1, 3, 2, 0)]
+
+    start = time.perf_counter()
+    ranked = asyncio.run(agent.amatch_batch(job, candidates, top_k=3, max_concurrency=4, batch_size=1))
+    elapsed = time.perf_counter() - start
+
+    assert [r["match_score"] for r in ranked] == [100, 80, 60]
+    assert [r["rank"] for r in ranked] == [1, 2, 3]
+    assert ranked[0]["candidate"] is candidates[1]
+    assert completions.peak == 4
+    assert elapsed < 0.2 * 3
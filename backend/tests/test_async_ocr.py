@@ -0,0 +1,83 @@
+"""
+Pruebas del OCR asíncrono concurrente (cliente aio simulado)
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from backend.services.async_document_intelligence_service import AsyncDocumentIntelligenceService
+
+
+class FakeAsyncPoller:
+    def __init__(self, text, delay):
+        self.text = text
+        self.delay = delay
+
+    async def result(self):
+        await asyncio.sleep(self.delay)
+        lines = [SimpleNamespace(content=self.text)]
+        return SimpleNamespace(pages=[SimpleNamespace(lines=lines)])
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def begin_analyze_document(self, model_id, document):
+        if document == b"roto":
+            raise RuntimeError("documento inválido")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        poller = FakeAsyncPoller(document.decode(), delay=0.2)
+        original = poller.result
+
+        async def result():
+            try:
+                return await original()
+            finally:
+                self.in_flight -= 1
+
+        poller.result = result
+        return poller
+
+
+def _service(client, max_concurrency):
+    service = AsyncDocumentIntelligenceService(
+        endpoint="https://example.cognitiveservices.azure.com/",
+        key="fake-key",
+        use_cache=False,
+        max_concurrency=max_concurrency,
+    )
+    service._create_client = lambda: client
+    return service
+
+
+def test_results_keep_input_order_and_run_concurrently():
+    client = FakeAsyncClient()
+    service = _service(client, max_concurrency=10)
+    docs = [f"cv {i}".encode() for i in range(10)]
+
+    start = time.perf_counter()
+    results = service.analyze_many_sync(docs)
+    elapsed = time.perf_counter() - start
+
+    assert [r["pages"][0][0] for r in results] == [f"cv {i}" for i in range(10)]
+    assert elapsed < 1.0  # secuencial serían ~2 s
+
+
+def test_in_flight_limit_and_per_document_errors():
+    client = FakeAsyncClient()
+    service = _service(client, max_concurrency=3)
+
+    results = service.analyze_many_sync([b"a", b"roto", b"b", b"c", b"d", b"e"])
+
+    assert client.max_in_flight <= 3
+    assert isinstance(results[1], RuntimeError)
+    assert results[5]["pages"] == [["e"]]
@@ -0,0 +1,319 @@
+"""
+Pruebas del modo offline con la Batch API contra un endpoint local que imita
+/v1/files y /v1/batches (cliente openai real, sin salir de 127.0.0.1)
+"""
+import os
+import re
+import json
+import time
+import email
+import threading
+import importlib
+from email import policy
+from types import SimpleNamespace
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+from openai import OpenAI
+
+from backend.services.azure_openai_service import AzureOpenAIService
+from backend.services.batch_api_service import BatchJobService, BatchRequestError
+from backend.agents.cv_matcher import CVMatcherAgent
+from backend.agents.extractor_agent import ExtractorAgent
+from backend.tests.pdf_factory import make_text_pdf
+from backend.config import settings
+
+
+class StandInBatchAPI:
+    """
+    Servidor HTTP mínimo con el contrato de la Batch API. Cada batch pasa por
+    validating → in_progress → completed en consultas sucesivas; answer(body)
+    devuelve el contenido de la respuesta o lanza excepción para esa línea.
+    """
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.files = {}
+        self.batches = {}
+        self.uploads = []
+        self.lock = threading.Lock()
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload, raw=False):
+                data = payload.encode() if raw else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/octet-stream" if raw else "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                if self.path == "/v1/files":
+                    self._send(200, api.upload(self.headers["Content-Type"], body))
+                elif self.path == "/v1/batches":
+                    self._send(200, api.create_batch(json.loads(body)))
+                else:
+                    self._send(404, {"error": {"message": "not found"}})
+
+            def do_GET(self):
+                match = re.fullmatch(r"/v1/files/([\w-]+)/content", self.path)
+                if match:
+                    self._send(200, api.files[match.group(1)], raw=True)
+                    return
+                match = re.fullmatch(r"/v1/batches/([\w-]+)", self.path)
+                if match:
+                    self._send(200, api.poll(match.group(1)))
+                    return
+                self._send(404, {"error": {"message": "not found"}})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def _new_file(self, content):
+        with self.lock:
+            file_id = f"file-{len(self.files)}"
+            self.files[file_id] = content
+        return file_id
+
+    def upload(self, content_type, body):
+        message = email.message_from_bytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body, policy=policy.default
+        )
+        fields = {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+                  for part in message.iter_parts()}
+        assert fields["purpose"] == b"batch"
+        content = fields["file"].decode()
+        self.uploads.append(content)
+        file_id = self._new_file(content)
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": "input.jsonl", "purpose": "batch", "status": "processed"}
+
+    def create_batch(self, params):
+        with self.lock:
+            batch_id = f"batch-{len(self.batches)}"
+            self.batches[batch_id] = {
+                "id": batch_id, "object": "batch", "endpoint": params["endpoint"],
+                "input_file_id": params["input_file_id"], "completion_window": params["completion_window"],
+                "created_at": int(time.time()), "status": "validating", "metadata": params.get("metadata"),
+            }
+        return self.batches[batch_id]
+
+    def poll(self, batch_id):
+        batch = self.batches[batch_id]
+        if batch["status"] == "validating":
+            batch["status"] = "in_progress"
+        elif batch["status"] == "in_progress":
+            self._complete(batch)
+        return batch
+
+    def _complete(self, batch):
+        output, errors = [], []
+        for line in self.files[batch["input_file_id"]].splitlines():
+            request = json.loads(line)
+            assert request["url"] == batch["endpoint"]
+            try:
+                content = self.answer(request["body"])
+            except Exception as e:
+                errors.append({"custom_id": request["custom_id"], "response": None,
+                               "error": {"code": "model_error", "message": str(e)}})
+                continue
+            output.append({"custom_id": request["custom_id"], "response": {
+                "status_code": 200,
+                "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]},
+            }, "error": None})
+
+        batch["status"] = "completed"
+        batch["request_counts"] = {"total": len(output) + len(errors), "completed": len(output), "failed": len(errors)}
+        batch["output_file_id"] = self._new_file("\n".join(json.dumps(o) for o in output))
+        batch["error_file_id"] = self._new_file("\n".join(json.dumps(e) for e in errors)) if errors else None
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _jobs(api, tmp_path, **kwargs):
+    client = OpenAI(base_url=api.base_url, api_key="x", max_retries=0)
+    return BatchJobService(client, "gpt-test", work_dir=str(tmp_path), poll_interval=0.01, **kwargs)
+
+
+def _echo(body):
+    text = body["messages"][-1]["content"]
+    if "falla" in text:
+        raise ValueError("contenido rechazado")
+    return text.upper()
+
+
+def test_run_splits_files_and_maps_results_and_errors(tmp_path):
+    with StandInBatchAPI(_echo) as api:
+        jobs = _jobs(api, tmp_path, max_requests_per_file=2)
+        requests = [
+            jobs.build_request(f"r-{i}", [{"role": "user", "content": text}], temperature=0, max_tokens=None)
+            for i, text in enumerate(["hola", "mundo", "falla", "fin", "batch"])
+        ]
+        results = jobs.run(requests, name="demo", metadata={"origen": "test"}, timeout=10)
+
+    assert len(api.uploads) == 3
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert len(names) == 3 and all(n.startswith("demo-") for n in names)
+    assert [n[-9:] for n in names] == ["000.jsonl", "001.jsonl", "002.jsonl"]
+    first = json.loads(api.uploads[0].splitlines()[0])
+    assert first["url"] == "/v1/chat/completions"
+    assert first["body"] == {"model": "gpt-test", "messages": [{"role": "user", "content": "hola"}], "temperature": 0}
+
+    assert results["r-0"] == "HOLA" and results["r-4"] == "BATCH"
+    assert isinstance(results["r-2"], BatchRequestError)
+    assert "contenido rechazado" in str(results["r-2"])
+    assert jobs.run([], name="vacio") == {}
+
+
+def test_write_jsonl_splits_by_size_and_runs_do_not_overwrite(tmp_path):
+    with StandInBatchAPI(_echo) as api:
+        jobs = _jobs(api, tmp_path, max_file_mb=0.001)  # ~1 KB por archivo
+        requests = [jobs.build_request(f"r-{i}", [{"role": "user", "content": "x" * 300}]) for i in range(6)]
+
+        paths = jobs.write_jsonl(requests, "grande")
+        assert len(paths) > 1
+        assert all(os.path.getsize(p) <= jobs.max_file_bytes for p in paths)
+        assert sum(len(open(p).readlines()) for p in paths) == 6
+
+        with pytest.raises(ValueError):
+            jobs.write_jsonl([jobs.build_request("enorme", [{"role": "user", "content": "x" * 5000}])], "enorme")
+
+        jobs.run(requests[:1], name="nocturno")
+        jobs.run(requests[:1], name="nocturno")
+    assert len([p for p in os.listdir(tmp_path) if p.startswith("nocturno-")]) == 2
+
+
+def test_duplicate_ids_and_timeout(tmp_path):
+    with StandInBatchAPI(_echo) as api:
+        jobs = _jobs(api, tmp_path)
+        request = jobs.build_request("a", [{"role": "user", "content": "x"}])
+        with pytest.raises(ValueError):
+            jobs.write_jsonl([request, request], "dup")
+
+        batch_id = jobs.submit(jobs.write_jsonl([request], "lento")[0])
+        jobs.poll_interval = 0.2
+        with pytest.raises(TimeoutError):
+            jobs.wait([batch_id], timeout=0.05)
+
+
+def test_openai_service_offline_batch_reuses_cache(monkeypatch, tmp_path):
+    # settings se lee al importar backend.config: se ajusta la instancia ya creada
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-fake")
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path / "cache"))
+    module = importlib.import_module("backend.services.openai_service")
+
+    def answer(body):
+        assert body["response_format"] == {"type": "json_object"}
+        if "roto" in body["messages"][-1]["content"]:
+            return "no es json"
+        return json.dumps({"prompt": body["messages"][-1]["content"].split("\n")[0]})
+
+    with StandInBatchAPI(answer) as api:
+        svc = module.OpenAIService()
+        svc.client = OpenAI(base_url=api.base_url, api_key="x", max_retries=0)
+        jobs = svc.batch_jobs(work_dir=str(tmp_path / "batches"), poll_interval=0.01)
+
+        first = svc.run_offline_batch(["uno", "dos", "roto"], structured=True, name="a", batch_jobs=jobs)
+        assert first[0] == {"prompt": "uno"} and first[1] == {"prompt": "dos"}
+        assert first[2] is None
+
+        second = svc.run_offline_batch(["dos", "tres", "uno"], structured=True, name="b", batch_jobs=jobs)
+
+    assert second == [{"prompt": "dos"}, {"prompt": "tres"}, {"prompt": "uno"}]
+    # Solo "tres" viajó en el segundo batch
+    assert len(api.uploads[1].splitlines()) == 1
+
+
+def test_extractor_offline_batch(monkeypatch, tmp_path):
+    monkeypatch.setenv("PDF_TEXT_MODE", "local")
+    cv_text = "Ana Torres - Data Engineer. Python, SQL y Spark. " * 10
+
+    def answer(body):
+        assert "extractor" in body["messages"][0]["content"]
+        return "```json\n" + json.dumps({"nombre": "Ana Torres"}) + "\n```"
+
+    with StandInBatchAPI(answer) as api:
+        agent = ExtractorAgent(openai_endpoint="https://example.openai.azure.com/", openai_key="k", text_mode="local")
+        jobs = _jobs(api, tmp_path)
+        profiles = agent.process_cv_batch_offline([make_text_pdf([cv_text])] * 2 + [b"roto"], batch_jobs=jobs)
+
+    assert profiles[:2] == [{"nombre": "Ana Torres"}] * 2
+    assert "error" in profiles[2]
+    assert len(api.uploads[0].splitlines()) == 2
+
+
+def test_matcher_offline_batch_maps_results_back(tmp_path):
+    job = SimpleNamespace(
+        technical_requirements=["Python", "SQL"], ats_keywords=[], soft_skills=[],
+        experience_required=None, education=None,
+        model_dump=lambda: {"title": "Data Engineer"},
+    )
+    candidates = [{"nombre": f"cand {n}", "skills_tecnicas": ["Python"] * n} for n in (1, 3, 2, 0, 4)]
+
+    def answer(body):
+        items = json.loads(body["messages"][-1]["content"])["candidates"]
+        # El candidato c3 no vuelve en la respuesta: se queda con el score heurístico
+        return json.dumps({"results": [
+            {"id": item["id"], "match_score": 20 * len(item["candidate_profile"]["skills_tecnicas"]),
+             "strengths": [], "gaps": [], "justification": "batch"}
+            for item in items if item["id"] != "c3"
+        ]})
+
+    with StandInBatchAPI(answer) as api:
+        agent = CVMatcherAgent(use_openai=False, refine_batch_size=2)
+        agent.openai = SimpleNamespace(build_system_request=AzureOpenAIService.build_system_request)
+        agent.use_openai = True
+        ranked = agent.match_batch_offline(job, candidates, top_k=4, batch_jobs=_jobs(api, tmp_path))
+
+    assert len(api.uploads[0].splitlines()) == 3
+    assert [r["candidate"]["nombre"] for r in ranked][:3] == ["cand 4", "cand 3", "cand 2"]
+    assert len(ranked) == 4
+    missing = [r for r in ranked if r["candidate"]["nombre"] == "cand 0"]
+    assert not missing or "refine_error" in missing[0]
+    assert agent.refine_stats["requests"] == 3
+    assert agent.refine_stats["fallbacks"] == 1
+
+
+def test_job_analyzer_offline_batch_with_summaries(monkeypatch, tmp_path):
+    from backend.agents.job_analyzer import JobAnalyzerAgent
+
+    monkeypatch.setenv("AZURE_OPENAI_KEY", "fake-key")
+    monkeypatch.setenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com/")
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT", "gpt-test")
+
+    def answer(body):
+        if body.get("response_format"):
+            if "Scrum" in body["messages"][-1]["content"]:
+                return "sin json"
+            return json.dumps({"title": "Data Engineer", "technical_requirements": ["Python", "SQL"]})
+        return "  Resumen del puesto  "
+
+    with StandInBatchAPI(answer) as api:
+        agent = JobAnalyzerAgent()
+        jobs = agent.process_job_texts_offline(
+            ["Buscamos Data Engineer con Python y SQL.", "Buscamos Scrum Master."],
+            generate_summary=True, batch_jobs=_jobs(api, tmp_path),
+        )
+
+    assert jobs[0].analysis.technical_requirements == ["Python", "SQL"]
+    assert jobs[0].document_metadata == {"source": "text_input", "executive_summary": "Resumen del puesto"}
+    assert isinstance(jobs[1], Exception)
+    # Un batch de análisis y otro solo con el resumen de la oferta válida
+    assert [len(u.splitlines()) for u in api.uploads] == [2, 1]
@@ -0,0 +1,79 @@
+"""
+Pruebas de get_batch_completions / get_batch_structured_outputs concurrentes
+"""
+import time
+import json
+import importlib
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from backend.config import settings
+
+
+class SlowCompletions:
+    """Cliente falso: cada llamada tarda `latency` y registra el pico de concurrencia"""
+
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def create(self, **params):
+        prompt = params["messages"][-1]["content"]
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.latency)
+            if "falla" in prompt:
+                raise RuntimeError("fallo simulado")
+            content = json.dumps({"eco": prompt.split()[0]}) if params.get("response_format") else prompt.upper()
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # settings se lee al importar backend.config: se ajusta la instancia ya creada
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-fake")
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+    module = importlib.import_module("backend.services.openai_service")
+    svc = module.OpenAIService(use_cache=False)
+    svc.completions = SlowCompletions()
+    svc.client = SimpleNamespace(chat=SimpleNamespace(completions=svc.completions))
+    return svc
+
+
+def test_batch_runs_concurrently_in_input_order(service):
+    prompts = [f"cv {i}" for i in range(6)]
+
+    start = time.perf_counter()
+    results = service.get_batch_completions(prompts, max_workers=6)
+    elapsed = time.perf_counter() - start
+
+    assert results == [p.upper() for p in prompts]
+    assert service.completions.peak == 6
+    assert elapsed < 0.2 * 3  # secuencial serían ~1.2 s
+
+
+def test_concurrency_limit_and_per_item_errors(service):
+    prompts = ["cv 0", "falla 1", "cv 2", "cv 3", "falla 4"]
+
+    results = service.get_batch_completions(prompts, max_workers=2)
+    assert service.completions.peak == 2
+    assert results == ["CV 0", None, "CV 2", "CV 3", None]
+
+    detailed = service.get_batch_completions(prompts, max_workers=2, return_exceptions=True)
+    assert isinstance(detailed[1], Exception) and "fallo simulado" in str(detailed[1])
+    assert detailed[2] == "CV 2"
+
+
+def test_batch_structured_outputs(service):
+    results = service.get_batch_structured_outputs(["uno JSON", "falla JSON", "tres JSON"], max_workers=3)
+    assert results == [{"eco": "uno"}, None, {"eco": "tres"}]
+    assert service.get_batch_structured_outputs([]) == []
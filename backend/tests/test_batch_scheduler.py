@@ -0,0 +1,52 @@
+"""
+Pruebas del preflight y la planificación LPT de lotes
+"""
+import io
+import time
+
+from backend.services.batch_scheduler import BatchScheduler, preflight_document
+from backend.tests.pdf_factory import make_text_pdf
+
+
+def test_preflight_reads_pages_and_size_without_moving_the_stream():
+    data = make_text_pdf(["uno", "dos", "tres"])
+    stream = io.BytesIO(data)
+
+    info = preflight_document(stream)
+
+    assert info == {"bytes": len(data), "pages": 3, "kind": "pdf"}
+    assert stream.tell() == 0
+    assert preflight_document(b"PK\x03\x04...")["kind"] == "docx"
+    assert preflight_document(b"%PDF-1.4 roto")["pages"] == 1
+
+
+def test_lpt_beats_upload_order_when_the_long_job_comes_last():
+    scheduler = BatchScheduler(workers=2, base_seconds=0, seconds_per_page=1, seconds_per_mb=0)
+    costs = [scheduler.estimate({"pages": p, "bytes": 0}) for p in (2, 2, 2, 2, 8)]
+
+    assert scheduler.lpt_order(costs)[0] == 4
+    assert scheduler.predict_makespan(costs) == 12   # el de 8 páginas empieza al final
+    assert scheduler.predict_makespan(costs, scheduler.lpt_order(costs)) == 8
+
+
+def test_run_dispatches_largest_first_and_keeps_input_order():
+    scheduler = BatchScheduler(workers=1, base_seconds=0, seconds_per_page=0.01, seconds_per_mb=0)
+    infos = [{"pages": p, "bytes": 0} for p in (1, 5, 3)]
+    started = []
+    completed = []
+
+    def work(item):
+        started.append(item)
+        if item == "roto":
+            raise ValueError("PDF inválido")
+        time.sleep(0.01)
+        return item.upper()
+
+    results, report = scheduler.run(["a", "b", "roto"], infos, work, lambda i, r: completed.append(i))
+
+    assert started == ["b", "roto", "a"]
+    assert results[:2] == ["A", "B"] and isinstance(results[2], ValueError)
+    assert sorted(completed) == [0, 1, 2]
+    assert report["order"] == [1, 2, 0]
+    assert report["predicted_s"] <= report["fifo_predicted_s"]
+    assert report["actual_s"] >= 0
@@ -0,0 +1,165 @@
+"""
+Pruebas del refinamiento en lote de CVMatcherAgent (varios candidatos por llamada)
+"""
+import json
+import asyncio
+from types import SimpleNamespace
+
+from backend.agents.cv_matcher import CVMatcherAgent
+from backend.services.resilience_service import CircuitOpenError
+
+JOB = SimpleNamespace(
+    technical_requirements=["Python", "SQL"], ats_keywords=["Spark"], soft_skills=[],
+    experience_required="3 años", education=None,
+    model_dump=lambda: {"title": "Data Engineer", "technical_requirements": ["Python", "SQL"]},
+)
+
+
+class ContextLengthError(Exception):
+    """Como openai.BadRequestError con code=context_length_exceeded"""
+    status_code = 400
+    code = "context_length_exceeded"
+
+
+class FakeOpenAI:
+    """
+    Responde lotes con un score por candidato (10 * número de skills).
+    max_batch: lotes más grandes exceden el contexto; drop/bad_score: ids a omitir o
+    invalidar una vez; error: excepción que lanza cualquier lote.
+    """
+
+    def __init__(self, max_batch=100, drop=(), bad_score=(), error=None):
+        self.max_batch = max_batch
+        self.error = error
+        self.drop = set(drop)
+        self.bad_score = set(bad_score)
+        self.batch_sizes = []
+        self.job_copies = 0
+
+    def _answer(self, system_prompt, user_content):
+        payload = json.loads(user_content)
+        self.job_copies += user_content.count('"job_profile"')
+        if "candidates" not in payload:
+            self.batch_sizes.append(1)
+            skills = payload["candidate_profile"]["skills_tecnicas"]
+            return json.dumps({"match_score": 10 * len(skills), "justification": "individual"})
+
+        items = payload["candidates"]
+        self.batch_sizes.append(len(items))
+        if self.error is not None:
+            raise self.error
+        if len(items) > self.max_batch:
+            raise ContextLengthError("This model's maximum context length is 8192 tokens")
+
+        results = []
+        for item in items:
+            cid = item["id"]
+            if cid in self.drop:
+                self.drop.discard(cid)
+                continue
+            score = 10 * len(item["candidate_profile"]["skills_tecnicas"])
+            if cid in self.bad_score:
+                self.bad_score.discard(cid)
+                score = "alto"
+            results.append({"id": cid, "match_score": score, "strengths": [], "gaps": [], "justification": "lote"})
+        return "```json\n" + json.dumps({"results": results}) + "\n```"
+
+    def analyze_with_system_prompt(self, system_prompt, user_content, temperature=None, json_mode=False):
+        return self._answer(system_prompt, user_content)
+
+    async def aanalyze_with_system_prompt(self, system_prompt, user_content, temperature=None, json_mode=False):
+        return self._answer(system_prompt, user_content)
+
+
+def _agent(fake, batch_size=8):
+    agent = CVMatcherAgent(use_openai=False, refine_batch_size=batch_size)
+    agent.openai = fake
+    agent.use_openai = True
+    return agent
+
+
+def _candidates(n):
+    return [{"nombre": f"cand {i}", "skills_tecnicas": ["Python"] * (i % 10)} for i in range(n)]
+
+
+def test_one_job_copy_per_request_and_ranked_results():
+    fake = FakeOpenAI()
+    agent = _agent(fake, batch_size=8)
+    candidates = _candidates(20)
+
+    ranked = agent.match_batch(JOB, candidates)
+
+    assert fake.batch_sizes == [8, 8, 4]
+    assert fake.job_copies == 3
+    assert [r["match_score"] for r in ranked] == sorted((10 * (i % 10) for i in range(20)), reverse=True)
+    assert all(r["justification"] == "lote" for r in ranked)
+    assert ranked[0]["candidate"]["nombre"] in ("cand 9", "cand 19")
+    assert agent.refine_stats["requests"] == 3
+
+
+def test_missing_or_invalid_results_are_requested_again():
+    fake = FakeOpenAI(drop={"c2"}, bad_score={"c5", "c6"})
+    agent = _agent(fake, batch_size=8)
+
+    ranked = agent.match_batch(JOB, _candidates(8))
+
+    assert fake.batch_sizes == [8, 3]
+    by_name = {r["candidate"]["nombre"]: r for r in ranked}
+    assert by_name["cand 5"]["match_score"] == 50 and by_name["cand 2"]["match_score"] == 20
+    assert agent.refine_stats["retried"] == 3
+
+
+def test_failed_batch_is_split_until_it_fits():
+    fake = FakeOpenAI(max_batch=2)
+    agent = _agent(fake, batch_size=8)
+
+    ranked = agent.match_batch(JOB, _candidates(8))
+
+    assert fake.batch_sizes == [8, 4, 2, 2, 4, 2, 2]
+    assert len(ranked) == 8 and all("refine_error" not in r["raw_refined"] for r in ranked)
+    assert agent.refine_stats["splits"] == 3
+
+
+def test_async_batched_and_single_fallback():
+    fake = FakeOpenAI(max_batch=0)  # todos los lotes fallan: se llega a llamadas individuales
+    agent = _agent(fake, batch_size=4)
+
+    ranked = asyncio.run(agent.amatch_batch(JOB, _candidates(4), max_concurrency=2))
+
+    assert sorted(fake.batch_sizes) == [1, 1, 1, 1, 2, 2, 4]
+    assert all(r["justification"] == "individual" for r in ranked)
+
+    # batch_size=1 conserva una llamada por candidato
+    fake = FakeOpenAI()
+    _agent(fake, batch_size=1).match_batch(JOB, _candidates(3))
+    assert fake.batch_sizes == [1, 1, 1]
+
+
+def test_transient_errors_fall_back_without_splitting():
+    for error in (CircuitOpenError("openai", 5), TimeoutError("timeout")):
+        fake = FakeOpenAI(error=error)
+        agent = _agent(fake, batch_size=8)
+
+        ranked = agent.match_batch(JOB, _candidates(8))
+
+        assert fake.batch_sizes == [8]
+        assert all("refine_error" in r["raw_refined"] for r in ranked)
+        assert agent.refine_stats["splits"] == 0 and agent.refine_stats["fallbacks"] == 8
+
+
+def test_unreadable_batch_response_is_split():
+    fake = FakeOpenAI()
+    answers = iter(["no es json"])
+    answer = fake._answer
+    fake._answer = lambda system_prompt, user_content: next(answers, None) or answer(system_prompt, user_content)
+    agent = _agent(fake, batch_size=4)
+
+    ranked = agent.match_batch(JOB, _candidates(4))
+
+    assert fake.batch_sizes == [2, 2]
+    assert agent.refine_stats["splits"] == 1 and all(r["justification"] == "lote" for r in ranked)
+
+
+def test_batching_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("MATCH_REFINE_BATCH_SIZE", raising=False)
+    assert CVMatcherAgent(use_openai=False).refine_batch_size == 1
@@ -0,0 +1,83 @@
+"""
+Pruebas del OCR por bloques de páginas en paralelo (cliente simulado)
+"""
+import io
+import time
+import threading
+from types import SimpleNamespace
+
+from PyPDF2 import PdfReader
+
+from backend.services.document_intelligence_service import DocumentIntelligenceService
+from backend.tests.pdf_factory import make_text_pdf
+
+
+class FakeChunkClient:
+    """Devuelve una línea "pagina N" por página, usando el texto del sub-PDF recibido"""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def begin_analyze_document(self, model_id, document):
+        with self.lock:
+            self.calls += 1
+        reader = PdfReader(io.BytesIO(document))
+        pages = [
+            SimpleNamespace(lines=[SimpleNamespace(content=p.extract_text().strip())])
+            for p in reader.pages
+        ]
+
+        def result():
+            time.sleep(self.delay)
+            # Una tabla en la primera página de cada bloque (número de página relativo al bloque)
+            table = SimpleNamespace(
+                row_count=1, column_count=1,
+                bounding_regions=[SimpleNamespace(page_number=1)],
+                cells=[SimpleNamespace(row_index=0, column_index=0, content=pages[0].lines[0].content)],
+            )
+            return SimpleNamespace(pages=pages, tables=[table])
+
+        return SimpleNamespace(result=result)
+
+
+def _service(chunk_pages):
+    service = DocumentIntelligenceService(
+        endpoint="https://example.cognitiveservices.azure.com/",
+        key="fake-key",
+        use_cache=False,
+        chunk_pages=chunk_pages,
+        chunk_workers=4,
+    )
+    service.client = FakeChunkClient()
+    return service
+
+
+def test_long_pdf_is_split_and_stitched_in_order():
+    data = make_text_pdf([f"pagina {i}" for i in range(1, 21)])
+    service = _service(chunk_pages=5)
+
+    start = time.perf_counter()
+    result = service.extract_text_from_bytes(data)
+    elapsed = time.perf_counter() - start
+
+    assert service.client.calls == 4
+    assert result["pages"] == 20
+    assert result["text"].split("\n")[:-1] == [f"pagina {i}" for i in range(1, 21)]
+    assert elapsed < 0.6  # 4 bloques en paralelo ≈ latencia de un bloque
+
+
+def test_short_pdf_uses_single_request():
+    service = _service(chunk_pages=5)
+    service.extract_text_from_bytes(make_text_pdf(["pagina 1", "pagina 2"]))
+    assert service.client.calls == 1
+
+
+def test_tables_are_kept_with_document_page_numbers():
+    data = make_text_pdf([f"pagina {i}" for i in range(1, 11)])
+    result = _service(chunk_pages=5).extract_text_from_bytes(data)
+
+    assert [(t["page_number"], t["cells"][0]["content"]) for t in result["tables"]] == [
+        (1, "pagina 1"), (6, "pagina 6"),
+    ]
@@ -0,0 +1,50 @@
+"""
+Pruebas del generador de corpus sintéticos
+"""
+import io
+import json
+import hashlib
+
+from PyPDF2 import PdfReader
+
+from backend.services.ingestion_service import IngestionService
+from backend.utils.corpus_generator import CorpusGenerator, benchmark_ingestion
+
+
+def _digest(generator, n, kind="cv"):
+    return [hashlib.sha256(data).hexdigest() for _, data, _ in generator.iter_documents(n, kind)]
+
+
+def test_same_seed_same_bytes():
+    assert _digest(CorpusGenerator(seed=7), 12) == _digest(CorpusGenerator(seed=7), 12)
+    assert _digest(CorpusGenerator(seed=7), 12) != _digest(CorpusGenerator(seed=8), 12)
+
+
+def test_page_counts_and_image_pages_follow_the_spec():
+    generator = CorpusGenerator(seed=1, pages=(3, 3), docx_ratio=0, scanned_ratio=0, image_page_ratio=0.5,
+                                duplicate_ratio=0, near_duplicate_ratio=0)
+    service = IngestionService(mode="local")
+
+    for _, data, meta in generator.iter_documents(6):
+        assert len(PdfReader(io.BytesIO(data)).pages) == 3
+        assert sorted(service.pdf_text.image_pages(data)) == meta["image_pages"]
+        texts = service.extract_text(data)["page_texts"]
+        assert [i for i, t in enumerate(texts) if not t.strip()] == meta["image_pages"]
+
+
+def test_docx_and_duplicates(tmp_path):
+    generator = CorpusGenerator(seed=3, docx_ratio=0.5, duplicate_ratio=0.2, near_duplicate_ratio=0.2)
+    summary = generator.generate(str(tmp_path), 40)
+
+    with open(tmp_path / "manifest.jsonl", encoding="utf-8") as f:
+        manifest = [json.loads(line) for line in f]
+
+    assert summary["documents"] == len(manifest) == 40
+    assert {m["format"] for m in manifest} == {"pdf", "docx"}
+    copy = next(m for m in manifest if "duplicate_of" in m)
+    assert (tmp_path / copy["file"]).read_bytes() == (tmp_path / copy["duplicate_of"]).read_bytes()
+    assert summary["near_duplicates"] > 0
+
+    report = benchmark_ingestion(str(tmp_path), batch_size=16)
+    assert report["documents"] == 40 and report["errors"] == 0
+    assert "Correo" in IngestionService(mode="local").extract_text_from_file(str(tmp_path / manifest[0]["file"]))["text"]
@@ -0,0 +1,105 @@
+"""
+Pruebas de la limpieza determinista del texto de CVs antes de GPT
+"""
+from backend.services.text_cleaning_service import CVTextCleaner
+from backend.services.token_service import TokenCounter
+
+
+def _page(n, total, body):
+    return (
+        "Ana   Torres  |  ana.torres@example.com\n"
+        "CURRICULUM VITAE\n"
+        + "\n".join(body) + "\n"
+        "__________________________\n"
+        f"Página {n} de {total}\n"
+    )
+
+
+PAGES = [
+    _page(1, 3, ["Perfil: Data Engineer con 6 años de experiencia", "Teléfono: +57 300 123 4567"]),
+    _page(2, 3, ["EXPERIENCIA", "Data Engineer - Acme (2019-2024)", "", "", "Pipelines con Spark\t y Airflow"]),
+    _page(3, 3, ["EDUCACIÓN", "Ingeniería de Sistemas - Universidad Nacional (2016)", "• • •", "Idiomas: inglés C1"]),
+]
+
+
+def _cleaner():
+    return CVTextCleaner(counter=TokenCounter(use_tiktoken=False))
+
+
+def test_removes_repeated_headers_page_numbers_and_boilerplate():
+    cleaned, report = _cleaner().clean_pages(PAGES)
+    lines = cleaned.splitlines()
+
+    # La cabecera se conserva una vez (lleva nombre y correo)
+    assert lines[0] == "Ana Torres | ana.torres@example.com"
+    assert cleaned.count("ana.torres@example.com") == 1
+    assert "Página" not in cleaned and "CURRICULUM" not in cleaned and "___" not in cleaned
+    assert "• • •" not in cleaned
+    assert report["removed_lines"] == {"repeated": 2, "page_numbers": 3, "decorative": 4, "boilerplate": 3}
+
+
+def test_keeps_every_field_and_collapses_whitespace():
+    cleaned, report = _cleaner().clean_pages(PAGES)
+
+    for field in ("Teléfono: +57 300 123 4567", "Data Engineer - Acme (2019-2024)",
+                  "Pipelines con Spark y Airflow", "Ingeniería de Sistemas - Universidad Nacional (2016)",
+                  "Idiomas: inglés C1", "Perfil: Data Engineer con 6 años de experiencia"):
+        assert field in cleaned
+    assert "\n\n\n" not in cleaned
+    assert report["tokens_saved"] == report["original_tokens"] - report["cleaned_tokens"] > 0
+
+
+def test_single_page_keeps_lines_and_stats_accumulate():
+    cleaner = _cleaner()
+    text = "Luis Pérez\nluis@example.com\n1\nPython, SQL\n"
+    cleaned, _ = cleaner.clean_result({"text": text, "page_texts": [text]})
+    assert cleaned == "Luis Pérez\nluis@example.com\nPython, SQL\n"
+
+    cleaner.clean_pages(PAGES)
+    stats = cleaner.stats()
+    assert stats["documents"] == 2
+    assert stats["tokens_saved"] == stats["tokens_before"] - stats["tokens_after"]
+    assert 0 < stats["saved_ratio"] < 1
+
+
+def test_extractor_sends_cleaned_text(monkeypatch):
+    from backend.agents.extractor_agent import ExtractorAgent
+
+    agent = ExtractorAgent(openai_endpoint="https://example.openai.azure.com/", openai_key="k", text_mode="local")
+    text = agent._cv_text({"text": "".join(PAGES), "page_texts": PAGES})
+    assert "Página 2 de 3" not in text and "Idiomas: inglés C1" in text
+
+    monkeypatch.setenv("CV_CLEANING_ENABLED", "0")
+    raw = ExtractorAgent(openai_endpoint="https://example.openai.azure.com/", openai_key="k", text_mode="local")
+    assert raw._cv_text({"text": "".join(PAGES), "page_texts": PAGES}) == "".join(PAGES)
+
+
+def test_dates_numbers_and_experience_lines_survive():
+    pages = [
+        "Ana Torres\nData Engineer - Acme\n2019 - 2021\n",
+        "Backend Developer - Globex\nCreado por mí: sistema de pagos usado por 1M usuarios\n"
+        "Entregas a tiempo\n12/19\n3\nsprints completados\nPython, Go\nKafka\n2020 - 2023\n",
+        "Generado con Canva\nEducación\n2014 - 2018\n",
+    ]
+    cleaned, report = _cleaner().clean_pages(pages)
+
+    for line in ("2019 - 2021", "2020 - 2023", "2014 - 2018", "12/19",
+                 "Creado por mí: sistema de pagos usado por 1M usuarios"):
+        assert line in cleaned
+    assert "3\n" in cleaned.splitlines(keepends=True)
+    assert "Canva" not in cleaned
+    assert report["removed_lines"]["repeated"] == 0
+
+
+def test_edge_dates_and_repeated_words_in_body_are_kept():
+    cleaned, report = _cleaner().clean_pages(["Nombre\nEstudios\n12/19\n", "Trabajo\nDesde\n03/2021\n"])
+    assert "12/19" in cleaned and "03/2021" in cleaned
+    assert report["removed_lines"]["page_numbers"] == 0
+
+    pages = [
+        f"Python\nEmpresa {n}\nCargo {n}\nPython\nLogro {n}\nEquipo {n}\nFin {n}\n" for n in range(3)
+    ]
+    cleaned, report = _cleaner().clean_pages(pages)
+    # La cabecera "Python" se quita en las páginas 2 y 3, pero no en su cuerpo
+    assert cleaned.splitlines().count("Python") == 4
+    assert report["removed_lines"]["repeated"] == 2
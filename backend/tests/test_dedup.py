@@ -0,0 +1,73 @@
+"""
+Pruebas de la detección de CVs duplicados
+"""
+from backend.services.dedup_service import DuplicateDetector
+
+CV = (
+    "Laura Martinez Ingeniera de Software con 7 anos de experiencia en Python, Django, "
+    "FastAPI y Azure. Lidero equipos de 5 personas en Bancolombia y Rappi. "
+    "Educacion: Ingenieria de Sistemas en la Universidad de los Andes. "
+    "Idiomas: espanol nativo, ingles C1. Skills: Docker, Kubernetes, PostgreSQL, Redis."
+)
+OTHER = (
+    "Andres Lopez Disenador grafico especializado en branding e identidad visual. "
+    "Manejo de Illustrator, Photoshop y Figma. Trabajo en agencias de publicidad en Medellin "
+    "durante 4 anos. Educacion: Diseno Grafico, Universidad Pontificia Bolivariana."
+)
+
+
+def test_exact_duplicate_by_bytes():
+    index = DuplicateDetector()
+    h = index.content_hash(b"%PDF cv laura")
+    entry = index.add("laura.pdf", h, index.fingerprint(CV), {"nombre": "Laura"})
+
+    assert index.find_exact(index.content_hash(b"%PDF cv laura")) is entry
+    assert index.find_exact(index.content_hash(b"%PDF otro")) is None
+
+
+def test_near_duplicate_by_text_fingerprint():
+    index = DuplicateDetector(similarity_threshold=0.8)
+    index.add("laura.pdf", "h1", index.fingerprint(CV), {"nombre": "Laura"})
+
+    reexport = CV.replace("  ", " ") + " Pagina 1 de 1"
+    match = index.find_near(index.fingerprint(reexport))
+
+    assert match is not None
+    assert match[0]["name"] == "laura.pdf"
+    assert index.find_near(index.fingerprint(OTHER)) is None
+
+
+def test_reserve_lets_only_one_near_copy_through_concurrently():
+    import threading
+
+    index = DuplicateDetector(similarity_threshold=0.8)
+    fingerprint = index.fingerprint(CV)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker(n):
+        barrier.wait()
+        results.append(index.reserve(f"cv{n}.pdf", f"h{n}", fingerprint))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    new = [entry for entry, similarity in results if similarity is None]
+    assert len(new) == 1 and len(index.entries) == 1
+    assert all(entry is new[0] for entry, _ in results)
+
+    index.complete(new[0], {"nombre": "Laura"})
+    assert index.find_near(fingerprint)[0]["profile"] == {"nombre": "Laura"}
+
+
+def test_discard_removes_failed_reservation_and_aliases():
+    index = DuplicateDetector()
+    entry, similarity = index.reserve("laura.pdf", "h1", index.fingerprint(CV))
+    index.alias("h2", entry)
+
+    index.discard(entry)
+    assert index.entries == []
+    assert index.find_exact("h1") is None and index.find_exact("h2") is None
@@ -0,0 +1,46 @@
+"""
+Pruebas de la lectura local de .docx (sin OCR)
+"""
+import io
+
+from docx import Document
+
+from backend.services.docx_service import is_docx
+from backend.services.ingestion_service import IngestionService
+from backend.tests.pdf_factory import make_text_pdf
+
+
+def _make_docx() -> bytes:
+    doc = Document()
+    doc.add_paragraph("Carlos Ruiz - Desarrollador Backend")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Empresa"
+    table.cell(0, 1).text = "Periodo"
+    table.cell(1, 0).text = "Globant"
+    table.cell(1, 1).text = "2019-2023"
+    doc.add_paragraph("Skills: Python, Django, PostgreSQL")
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+def test_docx_detection():
+    assert is_docx(_make_docx())
+    assert not is_docx(make_text_pdf(["hola"]))
+
+
+def test_docx_paragraphs_and_tables_in_order_without_ocr():
+    class NoOCR:
+        def analyze(self, data):
+            raise AssertionError("un .docx no debe ir a OCR")
+
+    service = IngestionService(mode="ocr", doc_service=NoOCR())
+    result = service.extract_text(_make_docx())
+
+    assert result["source"] == "docx"
+    assert result["text"].splitlines() == [
+        "Carlos Ruiz - Desarrollador Backend",
+        "Empresa | Periodo",
+        "Globant | 2019-2023",
+        "Skills: Python, Django, PostgreSQL",
+    ]
@@ -0,0 +1,105 @@
+"""
+Pruebas de la capa de ingesta (capa de texto local vs OCR)
+"""
+from backend.services.ingestion_service import IngestionService
+from backend.tests.pdf_factory import make_text_pdf, make_image_pdf
+
+
+CV_PAGE = "\n".join([
+    "Maria Gomez - Ingeniera de Datos",
+    "Correo: maria.gomez@example.com",
+    "Experiencia: 6 anos en Python, Spark, Azure Data Factory y SQL Server",
+    "Educacion: Ingenieria de Sistemas, Universidad Nacional",
+    "Idiomas: Espanol nativo, Ingles avanzado",
+])
+
+
+class FakeDocService:
+    def __init__(self):
+        self.calls = 0
+
+    def analyze(self, data):
+        self.calls += 1
+        return {"pages": [["texto OCR"]], "preprocessing": None, "cache_hit": False}
+
+
+def test_digital_pdf_skips_ocr(tmp_path):
+    path = tmp_path / "cv.pdf"
+    path.write_bytes(make_text_pdf([CV_PAGE]))
+
+    doc = FakeDocService()
+    service = IngestionService(mode="auto", min_chars_per_page=50, min_text_quality=0.8, doc_service=doc)
+    result = service.extract_text_from_pdf(str(path))
+
+    assert result["source"] == "local"
+    assert "Spark" in result["text"]
+    assert doc.calls == 0
+
+
+def test_scanned_pdf_falls_back_to_ocr(tmp_path):
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(make_image_pdf(2))
+
+    doc = FakeDocService()
+    service = IngestionService(mode="auto", min_chars_per_page=50, doc_service=doc)
+    result = service.extract_text_from_pdf(str(path))
+
+    assert result["source"] == "ocr"
+    assert result["quality"]["chars_per_page"] == 0
+    assert doc.calls == 1
+
+
+def test_threshold_is_configurable(tmp_path):
+    path = tmp_path / "cv.pdf"
+    path.write_bytes(make_text_pdf([CV_PAGE]))
+
+    doc = FakeDocService()
+    service = IngestionService(mode="auto", min_chars_per_page=10_000, doc_service=doc)
+
+    assert service.extract_text_from_pdf(str(path))["source"] == "ocr"
+
+
+def test_accepts_bytes_memoryview_and_file_objects():
+    import io
+
+    data = make_text_pdf([CV_PAGE])
+    service = IngestionService(mode="local")
+
+    texts = {
+        service.extract_text(data)["text"],
+        service.extract_text(memoryview(data))["text"],
+        service.extract_text(io.BytesIO(data))["text"],
+    }
+    assert len(texts) == 1
+    assert "Spark" in texts.pop()
+
+
+def test_extract_many_only_sends_scanned_documents_to_ocr():
+    class FakeAsyncDocService:
+        def __init__(self):
+            self.batches = []
+
+        def analyze_many_sync(self, documents, max_concurrency=None):
+            self.batches.append(len(documents))
+            return [{"pages": [["texto OCR"]]} for _ in documents]
+
+    async_doc = FakeAsyncDocService()
+    service = IngestionService(mode="auto", min_chars_per_page=50, async_doc_service=async_doc)
+
+    results = service.extract_many([make_image_pdf(), make_text_pdf([CV_PAGE]), make_image_pdf()])
+
+    assert [r["source"] for r in results] == ["ocr", "local", "ocr"]
+    assert async_doc.batches == [2]
+
+
+def test_iter_pages_offsets_match_full_text():
+    data = make_text_pdf([CV_PAGE, "Pagina dos\nProyectos", "Pagina tres"])
+    service = IngestionService(mode="local")
+
+    pages = list(service.iter_pages(data))
+    full = service.extract_text(data)["text"]
+
+    assert [p["page_number"] for p in pages] == [1, 2, 3]
+    for page in pages:
+        assert full[page["offset"]:page["offset"] + len(page["text"])] == page["text"]
+    assert pages[1]["line_count"] == 2
@@ -0,0 +1,141 @@
+"""
+Pruebas del caché de respuestas LLM (memoria + disco)
+"""
+import time
+import importlib
+from types import SimpleNamespace
+
+from backend.services.cache_service import LLMCache
+from backend.services.azure_openai_service import AzureOpenAIService
+from backend.config import settings
+
+MESSAGES = [{"role": "system", "content": "Eres un analista"}, {"role": "user", "content": "Oferta X"}]
+
+
+class FakeCompletions:
+    def __init__(self, content='{"title": "Data Engineer"}'):
+        self.calls = 0
+        self.content = content
+
+    def create(self, **params):
+        self.calls += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))])
+
+
+def _fake_client(completions):
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+def test_key_covers_every_call_parameter():
+    base = LLMCache.make_key("gpt-4", MESSAGES, 0.2, {"type": "json_object"}, "1")
+
+    assert base == LLMCache.make_key("gpt-4", [dict(m) for m in MESSAGES], 0.2, {"type": "json_object"}, "1")
+    assert base != LLMCache.make_key("gpt-4o", MESSAGES, 0.2, {"type": "json_object"}, "1")
+    assert base != LLMCache.make_key("gpt-4", MESSAGES, 0.3, {"type": "json_object"}, "1")
+    assert base != LLMCache.make_key("gpt-4", MESSAGES, 0.2, None, "1")
+    assert base != LLMCache.make_key("gpt-4", MESSAGES, 0.2, {"type": "json_object"}, "2")
+
+
+def test_memory_tier_then_disk_tier_after_restart(tmp_path):
+    cache = LLMCache(cache_dir=str(tmp_path), max_memory_entries=2)
+    cache.set("a", "respuesta A")
+    assert cache.get("a") == "respuesta A"
+    assert cache.stats()["memory_hits"] == 1
+
+    # Un proceso nuevo no tiene la memoria, pero sí el disco
+    restarted = LLMCache(cache_dir=str(tmp_path))
+    assert restarted.get("a") == "respuesta A"
+    assert restarted.get("a") == "respuesta A"
+    assert restarted.get("b") is None
+    stats = restarted.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["hit_rate"] == round(2 / 3, 3)
+
+
+def test_memory_lru_bound_and_ttl(tmp_path):
+    cache = LLMCache(cache_dir=str(tmp_path), max_memory_entries=2, ttl_hours=0.5 / 3600)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+    assert cache.stats()["memory_entries"] == 2
+
+    time.sleep(0.6)
+    assert cache.get("c") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_disk_tier_is_size_bounded(tmp_path):
+    cache = LLMCache(cache_dir=str(tmp_path), max_size_mb=0.002)
+    for i in range(10):
+        cache.set(f"k{i}", "x" * 500)
+
+    stats = cache.stats()
+    assert stats["size_bytes"] <= 0.002 * 1024 * 1024
+    assert stats["evictions"] > 0
+
+
+def test_disk_hit_keeps_original_created_at_in_memory(tmp_path):
+    LLMCache(cache_dir=str(tmp_path)).set("a", "A")
+    time.sleep(0.3)
+
+    restarted = LLMCache(cache_dir=str(tmp_path), ttl_hours=0.5 / 3600)
+    assert restarted.get("a") == "A"  # hit de disco justo antes de expirar
+    time.sleep(0.3)
+    assert restarted.get("a") is None  # la copia en memoria expira con el original
+
+
+def test_set_scans_directory_only_over_the_limit(tmp_path, monkeypatch):
+    cache = LLMCache(cache_dir=str(tmp_path), max_size_mb=0.002)
+    scans = []
+    original = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or original())
+
+    cache.set("a", "x" * 100)
+    cache.set("a", "y" * 100)  # reescribir no suma dos veces
+    assert scans == []
+    for i in range(10):
+        cache.set(f"k{i}", "x" * 500)
+    assert scans and cache.evictions > 0
+
+
+def test_azure_service_reuses_identical_calls(tmp_path, monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_KEY", "fake-key")
+    monkeypatch.setenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com/")
+
+    service = AzureOpenAIService(cache=LLMCache(cache_dir=str(tmp_path)))
+    completions = FakeCompletions()
+    service.client = _fake_client(completions)
+
+    fmt = {"type": "json_object"}
+    first = service.chat_completion(MESSAGES, 0.2, fmt)
+    second = service.chat_completion(MESSAGES, 0.2, fmt)
+    service.chat_completion(MESSAGES, 0.5, fmt)
+
+    assert first == second
+    assert completions.calls == 2
+    assert service.cache_stats()["hits"] == 1
+
+    # Las respuestas JSON inválidas no se fijan en el caché
+    completions.content = "no es json"
+    service.chat_completion(MESSAGES, 0.9, fmt)
+    service.chat_completion(MESSAGES, 0.9, fmt)
+    assert completions.calls == 4
+
+
+def test_openai_service_caches_text_and_structured_output(tmp_path, monkeypatch):
+    # settings se lee al importar backend.config: se ajusta la instancia ya creada
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-fake")
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+    module = importlib.import_module("backend.services.openai_service")
+
+    service = module.OpenAIService(cache=LLMCache(cache_dir=str(tmp_path / "svc")))
+    completions = FakeCompletions()
+    service.client = _fake_client(completions)
+
+    assert service.get_structured_output("Analiza en JSON") == {"title": "Data Engineer"}
+    assert service.get_structured_output("Analiza en JSON") == {"title": "Data Engineer"}
+    service.get_completion("Analiza en JSON", temperature=0.3)
+    service.get_completion("Analiza en JSON", temperature=0.3, max_tokens=100)
+
+    assert completions.calls == 3
+    assert service.cache_stats()["memory_hits"] == 1
@@ -0,0 +1,78 @@
+"""
+Pruebas del caché OCR en disco (sin llamadas a Azure)
+"""
+import os
+import time
+from types import SimpleNamespace
+
+from backend.services.cache_service import OCRCache
+from backend.services.document_intelligence_service import DocumentIntelligenceService
+
+
+class FakeDocClient:
+    """Cliente falso que simula begin_analyze_document"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def begin_analyze_document(self, model_id, document):
+        self.calls += 1
+        lines = [SimpleNamespace(content="Juan Pérez"), SimpleNamespace(content="Python, Azure")]
+        result = SimpleNamespace(pages=[SimpleNamespace(lines=lines)])
+        return SimpleNamespace(result=lambda: result)
+
+
+def test_key_depends_on_bytes_and_model():
+    assert OCRCache.make_key(b"pdf", "prebuilt-read") == OCRCache.make_key(b"pdf", "prebuilt-read")
+    assert OCRCache.make_key(b"pdf", "prebuilt-read") != OCRCache.make_key(b"pdf2", "prebuilt-read")
+    assert OCRCache.make_key(b"pdf", "prebuilt-read") != OCRCache.make_key(b"pdf", "prebuilt-layout")
+
+
+def test_hit_miss_and_ttl(tmp_path):
+    cache = OCRCache(cache_dir=str(tmp_path), ttl_hours=1)
+    assert cache.get("a") is None
+    cache.set("a", {"pages": [["hola"]]})
+    assert cache.get("a") == {"pages": [["hola"]]}
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+    cache.ttl_seconds = 0.01
+    time.sleep(0.05)
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_lru_eviction(tmp_path):
+    cache = OCRCache(cache_dir=str(tmp_path), max_size_mb=0.001)  # ~1 KB
+    payload = {"pages": [["x" * 400]]}
+
+    cache.set("old", payload)
+    os.utime(cache._path("old"), (1, 1))
+    cache.set("recent", payload)
+    os.utime(cache._path("recent"), (2, 2))
+    cache.get("old")  # "old" pasa a ser la más reciente
+    cache.set("new", payload)
+
+    assert cache.get("recent") is None
+    assert cache.get("old") is not None
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_service_reuses_cached_ocr(tmp_path):
+    service = DocumentIntelligenceService(
+        endpoint="https://example.cognitiveservices.azure.com/",
+        key="fake-key",
+        cache=OCRCache(cache_dir=str(tmp_path)),
+    )
+    service.client = FakeDocClient()
+
+    pdf = tmp_path / "cv.pdf"
+    pdf.write_bytes(b"%PDF-1.4 contenido")
+
+    first = service.extract_text_from_pdf(str(pdf))
+    second = service.extract_text_from_pdf(str(pdf))
+
+    assert first == second
+    assert first["text"] == "Juan Pérez\nPython, Azure\n"
+    assert service.client.calls == 1
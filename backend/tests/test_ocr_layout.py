@@ -0,0 +1,58 @@
+"""
+Pruebas del layout OCR compacto (arrays + serialización binaria)
+"""
+from types import SimpleNamespace
+
+from backend.models.ocr_layout import OCRLayout
+from backend.services.document_intelligence_service import parse_read_result
+
+
+def _point(x, y):
+    return SimpleNamespace(x=x, y=y)
+
+
+def _result(page_lines, width=8.5, height=11.0):
+    pages = []
+    for lines in page_lines:
+        pages.append(SimpleNamespace(
+            width=width, height=height, unit="inch",
+            lines=[
+                SimpleNamespace(
+                    content=text,
+                    polygon=[_point(1, i), _point(5, i), _point(5, i + 0.5), _point(1, i + 0.5)],
+                )
+                for i, text in enumerate(lines)
+            ],
+        ))
+    return SimpleNamespace(pages=pages)
+
+
+def test_offsets_match_extracted_text_and_round_trip():
+    pages, layout = parse_read_result(_result([["Juan Pérez", "Python"], ["Experiencia"]]))
+    text = "".join(line + "\n" for page in pages for line in page)
+
+    assert layout.text_length == len(text)
+    for i in range(layout.line_count):
+        page, offset, length, polygon = layout.line(i)
+        assert text[offset:offset + length] == pages[page][layout.lines_on_page(page).index(i)]
+    assert layout.line(1)[3][2] == (5.0, 1.5)
+
+    restored = OCRLayout.from_base64(layout.to_base64())
+    assert restored.page_size(1) == (8.5, 11.0, "inch")
+    assert [restored.line(i) for i in range(restored.line_count)] == [layout.line(i) for i in range(layout.line_count)]
+
+
+def test_extend_shifts_pages_and_offsets_for_chunks():
+    _, first = parse_read_result(_result([["uno"], ["dos"]]))
+    _, second = parse_read_result(_result([["tres", "cuatro"]]))
+    first.extend(second)
+
+    assert first.page_count == 3
+    assert first.line(3)[:3] == (2, len("uno\ndos\ntres\n"), len("cuatro"))
+
+
+def test_storage_is_compact_per_line():
+    _, layout = parse_read_result(_result([[f"línea {i}" for i in range(1000)]]))
+
+    # 2 (página) + 4 (offset) + 4 (longitud) + 32 (polígono) bytes por línea
+    assert len(layout.to_bytes()) < 1000 * 43 + 64
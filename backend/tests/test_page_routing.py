@@ -0,0 +1,98 @@
+"""
+Pruebas del enrutamiento por página: capa local para páginas digitales,
+OCR solo para las escaneadas
+"""
+from PyPDF2 import PdfReader
+import io
+
+from backend.services.ingestion_service import IngestionService
+from backend.tests.pdf_factory import make_text_pdf, make_image_pdf, merge_pdfs
+from backend.tests.test_ingestion import CV_PAGE
+
+
+class RecordingDocService:
+    """Devuelve una página OCR por página del PDF recibido"""
+
+    def __init__(self):
+        self.page_counts = []
+
+    def analyze(self, data):
+        n = len(PdfReader(io.BytesIO(data)).pages)
+        self.page_counts.append(n)
+        return {"pages": [[f"certificado escaneado {i}"] for i in range(n)], "preprocessing": None, "cache_hit": False}
+
+
+def test_only_scanned_pages_are_sent_to_ocr_and_merged_in_order():
+    data = merge_pdfs(make_text_pdf([CV_PAGE]), make_image_pdf(1), make_text_pdf([CV_PAGE.replace("Maria", "Ana")]))
+
+    doc = RecordingDocService()
+    service = IngestionService(mode="auto", min_chars_per_page=50, doc_service=doc)
+    result = service.extract_text(data)
+
+    assert doc.page_counts == [1]
+    assert result["source"] == "mixed"
+    assert result["ocr_pages"] == 1
+    assert result["ocr_page_numbers"] == [2]
+    texts = result["page_texts"]
+    assert "Maria" in texts[0] and texts[1] == "certificado escaneado 0\n" and "Ana" in texts[2]
+    assert result["text"] == "".join(texts)
+
+
+def test_fully_scanned_document_is_sent_whole():
+    doc = RecordingDocService()
+    service = IngestionService(mode="auto", min_chars_per_page=50, doc_service=doc)
+    result = service.extract_text(make_image_pdf(3))
+
+    assert doc.page_counts == [3]
+    assert result["source"] == "ocr"
+    assert result["ocr_pages"] == 3
+
+
+def test_digital_pages_report_zero_ocr_pages():
+    service = IngestionService(mode="auto", min_chars_per_page=50, doc_service=RecordingDocService())
+    result = service.extract_text(make_text_pdf([CV_PAGE, "Referencias a solicitud"]))
+
+    # La página corta no tiene imágenes: no se envía a OCR
+    assert result["source"] == "local"
+    assert result["ocr_pages"] == 0
+
+
+def test_extract_many_batches_sub_pdfs():
+    class FakeAsyncDocService:
+        def __init__(self):
+            self.page_counts = []
+
+        def analyze_many_sync(self, documents, max_concurrency=None):
+            self.page_counts.extend(len(PdfReader(io.BytesIO(d)).pages) for d in documents)
+            return [{"pages": [["ocr"]] * n} for n in self.page_counts[-len(documents):]]
+
+    async_doc = FakeAsyncDocService()
+    service = IngestionService(mode="auto", min_chars_per_page=50, async_doc_service=async_doc)
+    mixed = merge_pdfs(make_text_pdf([CV_PAGE, CV_PAGE]), make_image_pdf(1))
+
+    results = service.extract_many([mixed, make_text_pdf([CV_PAGE])])
+
+    assert async_doc.page_counts == [1]
+    assert [r["ocr_pages"] for r in results] == [1, 0]
+    assert results[0]["page_texts"][2] == "ocr\n"
+
+
+def test_layout_offsets_follow_merged_text():
+    from backend.models.ocr_layout import OCRLayout
+
+    class LayoutDocService:
+        def analyze(self, data):
+            layout = OCRLayout()
+            layout.add_page(8.5, 11.0)
+            layout.add_line("firma escaneada", [(1, 1), (4, 1), (4, 2), (1, 2)])
+            return {"pages": [["firma escaneada"]], "layout": layout}
+
+    data = merge_pdfs(make_text_pdf([CV_PAGE]), make_image_pdf(1))
+    service = IngestionService(mode="auto", min_chars_per_page=50, doc_service=LayoutDocService())
+    result = service.extract_text(data)
+
+    layout = result["layout"]
+    page, offset, length, _ = layout.line(0)
+    assert page == 1
+    assert result["text"][offset:offset + length] == "firma escaneada"
+    assert layout.text_length == len(result["text"])
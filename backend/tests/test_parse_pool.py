@@ -0,0 +1,29 @@
+"""
+Pruebas del parsing local en un pool de procesos
+"""
+from backend.services.ingestion_service import IngestionService
+from backend.tests.pdf_factory import make_text_pdf, make_image_pdf
+from backend.tests.test_ingestion import CV_PAGE
+
+
+def test_process_pool_matches_in_process_results():
+    docs = [make_text_pdf([CV_PAGE.replace("Maria", f"Persona {i}")] * (1 + i % 3)) for i in range(9)]
+
+    serial = IngestionService(mode="local", parse_workers=1).extract_many(docs)
+    pooled = IngestionService(mode="local", parse_workers=3, parse_chunksize=2).extract_many(docs)
+
+    assert [r["text"] for r in pooled] == [r["text"] for r in serial]
+    assert [r["pages"] for r in pooled] == [1, 2, 3] * 3
+
+
+def test_pool_plans_ocr_pages_in_workers():
+    class FakeAsyncDocService:
+        def analyze_many_sync(self, documents, max_concurrency=None):
+            return [{"pages": [["texto OCR"]]} for _ in documents]
+
+    service = IngestionService(mode="auto", min_chars_per_page=50, parse_workers=2,
+                               async_doc_service=FakeAsyncDocService())
+    results = service.extract_many([make_text_pdf([CV_PAGE]), make_image_pdf(1), make_text_pdf([CV_PAGE])])
+
+    assert [r["source"] for r in results] == ["local", "ocr", "local"]
+    assert [r["ocr_pages"] for r in results] == [0, 1, 0]
@@ -0,0 +1,78 @@
+"""
+Pruebas del preprocesamiento de escaneos antes del OCR
+"""
+import io
+from types import SimpleNamespace
+
+from PIL import Image, ImageDraw
+
+from backend.services.document_intelligence_service import DocumentIntelligenceService
+from backend.services.pdf_preprocessing_service import PdfImagePreprocessor
+from backend.tests.pdf_factory import make_text_pdf
+
+
+def _scan_pdf(dpi=300) -> bytes:
+    """Página carta escaneada a alta resolución con texto dibujado"""
+    image = Image.new("RGB", (int(8.5 * dpi), 11 * dpi), "white")
+    draw = ImageDraw.Draw(image)
+    for y in range(100, 11 * dpi - 100, 40):
+        draw.text((100, y), "Experiencia laboral: Python, Azure, SQL " * 4, fill=(0, 0, 0))
+    out = io.BytesIO()
+    image.save(out, "PDF", resolution=dpi, quality=95)
+    return out.getvalue()
+
+
+def test_scan_is_downsampled_and_report_counts_bytes():
+    data = _scan_pdf()
+    processed, report = PdfImagePreprocessor(target_dpi=150).preprocess(data)
+
+    assert report["applied"]
+    assert report["original_bytes"] == len(data)
+    assert report["processed_bytes"] == len(processed)
+    assert report["bytes_saved"] > len(data) // 2
+
+
+def test_resize_keeps_aspect_ratio_and_applies_rotate():
+    preprocessor = PdfImagePreprocessor(target_dpi=100, grayscale=False)
+    letter = SimpleNamespace(mediabox=SimpleNamespace(width=612, height=792), get=lambda key, default=None: default)
+
+    # Imagen más angosta que la página: un solo factor, sin estirarla
+    resized = preprocessor._resize(Image.new("RGB", (2000, 3300)), letter)
+    assert resized.size == (667, 1100)
+
+    rotated_page = SimpleNamespace(mediabox=letter.mediabox, get=lambda key, default=None: 90)
+    resized = preprocessor._resize(Image.new("RGB", (2550, 3300)), rotated_page)
+    assert resized.size == (1100, 850)
+
+
+def test_text_pdf_is_left_untouched():
+    data = make_text_pdf(["Maria Gomez\nPython"])
+    processed, report = PdfImagePreprocessor().preprocess(data)
+
+    assert processed is data
+    assert not report["applied"]
+    assert report["bytes_saved"] == 0
+
+
+def test_service_uploads_preprocessed_bytes():
+    uploads = []
+
+    def begin_analyze_document(model_id, document):
+        uploads.append(len(document))
+        result = SimpleNamespace(pages=[SimpleNamespace(lines=[SimpleNamespace(content="ok")])])
+        return SimpleNamespace(result=lambda: result)
+
+    service = DocumentIntelligenceService(
+        endpoint="https://example.cognitiveservices.azure.com/",
+        key="fake-key",
+        use_cache=False,
+        preprocess=True,
+    )
+    service.client = SimpleNamespace(begin_analyze_document=begin_analyze_document)
+
+    data = _scan_pdf()
+    analysis = service.analyze(data)
+
+    assert analysis["preprocessing"]["applied"]
+    assert uploads == [analysis["preprocessing"]["processed_bytes"]]
+    assert uploads[0] < len(data)
@@ -0,0 +1,191 @@
+"""
+Pruebas de la capa de resiliencia (reintentos, Retry-After y circuit breaker)
+"""
+import sys
+import asyncio
+import random
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from backend.services.resilience_service import (
+    CircuitOpenError,
+    ResilienceService,
+    retry_after_of,
+)
+from backend.services.azure_openai_service import AzureOpenAIService
+from backend.config import settings
+
+
+def _status_error(status, headers=None):
+    request = httpx.Request("POST", "https://example.openai.azure.com/chat")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    cls = openai.RateLimitError if status == 429 else openai.InternalServerError
+    if status == 400:
+        cls = openai.BadRequestError
+    return cls("error simulado", response=response, body=None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def __call__(self):
+        return self.now
+
+
+def _service(clock, **kwargs):
+    params = dict(max_retries=3, base_delay=1, max_delay=8, failure_threshold=3, reset_seconds=30)
+    params.update(kwargs)
+    return ResilienceService("test", sleep=clock.sleep, clock=clock, rng=random.Random(0), **params)
+
+
+def _flaky(errors, result="ok"):
+    errors = list(errors)
+
+    def fn():
+        if errors:
+            raise errors.pop(0)
+        return result
+    return fn
+
+
+def test_retry_after_header_formats():
+    assert retry_after_of(_status_error(429, {"retry-after": "7"})) == 7.0
+    assert retry_after_of(_status_error(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after_of(_status_error(429, {"retry-after": "Thu, 01 Jan 1970 00:00:00 GMT"})) == 0.0
+    assert retry_after_of(_status_error(500)) is None
+
+
+def test_honors_retry_after_then_uses_jittered_backoff():
+    clock = FakeClock()
+    service = _service(clock, failure_threshold=10)
+    fn = _flaky([_status_error(429, {"retry-after": "5"}), _status_error(503), _status_error(503)])
+
+    assert service.call(fn) == "ok"
+
+    assert 5 <= clock.sleeps[0] <= 6
+    assert 0 <= clock.sleeps[1] <= 2 and 0 <= clock.sleeps[2] <= 4
+    stats = service.stats()
+    assert (stats["retries"], stats["throttled"], stats["retry_after_honored"]) == (3, 1, 1)
+    assert (stats["successes"], stats["failures"], stats["state"]) == (1, 0, "closed")
+
+
+def test_non_transient_errors_are_not_retried():
+    clock = FakeClock()
+    service = _service(clock)
+
+    with pytest.raises(openai.BadRequestError):
+        service.call(_flaky([_status_error(400)]))
+    with pytest.raises(ValueError):
+        service.call(_flaky([ValueError("JSON inválido")]))
+
+    assert clock.sleeps == []
+    assert service.stats()["consecutive_failures"] == 0
+
+
+def test_breaker_opens_short_circuits_and_recovers():
+    clock = FakeClock()
+    service = _service(clock, max_retries=10)
+
+    with pytest.raises(openai.InternalServerError):
+        service.call(_flaky([_status_error(500)] * 20))
+    assert service.stats()["state"] == "open"
+    assert len(clock.sleeps) == 2  # el tercer fallo abre el circuito y corta los reintentos
+
+    with pytest.raises(CircuitOpenError):
+        service.call(lambda: "no debería llamarse")
+
+    # Pasado reset_seconds, una llamada de prueba cierra el circuito
+    clock.now += 31
+    assert service.call(lambda: "ok") == "ok"
+    stats = service.stats()
+    assert (stats["state"], stats["breaker_trips"], stats["short_circuited"]) == ("closed", 1, 1)
+
+
+def test_failed_probe_reopens_breaker():
+    clock = FakeClock()
+    service = _service(clock, max_retries=0, failure_threshold=1)
+
+    with pytest.raises(openai.InternalServerError):
+        service.call(_flaky([_status_error(500)]))
+    clock.now += 31
+    with pytest.raises(openai.InternalServerError):
+        service.call(_flaky([_status_error(502)]))
+
+    assert service.stats()["state"] == "open"
+    assert service.stats()["breaker_trips"] == 2
+
+
+def test_async_call_retries_without_blocking(monkeypatch):
+    clock = FakeClock()
+    service = _service(clock, base_delay=0.01, max_delay=0.01)
+    errors = [_status_error(429), _status_error(429)]
+
+    async def fn():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert asyncio.run(service.acall(fn)) == "ok"
+    assert clock.sleeps == []  # acall usa asyncio.sleep
+    assert service.stats()["retries"] == 2
+
+
+def test_azure_service_retries_throttled_calls(monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_KEY", "fake-key")
+    monkeypatch.setenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com/")
+
+    clock = FakeClock()
+    service = AzureOpenAIService(use_cache=False, resilience=_service(clock))
+    create = _flaky([_status_error(429, {"retry-after-ms": "100"})],
+                    SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="hola"))]))
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **p: create())))
+
+    assert service.chat_completion([{"role": "user", "content": "hola"}]) == "hola"
+    assert service.resilience_stats()["retry_after_honored"] == 1
+
+
+def test_azure_service_propagates_sdk_errors_after_retries(monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_KEY", "fake-key")
+    monkeypatch.setenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com/")
+
+    clock = FakeClock()
+    service = AzureOpenAIService(use_cache=False, resilience=_service(clock, max_retries=1, failure_threshold=1))
+    create = _flaky([_status_error(429, {"retry-after": "7"})] * 2)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **p: create())))
+
+    # El llamador recibe el error del SDK, con status_code y Retry-After intactos
+    with pytest.raises(openai.RateLimitError) as info:
+        service.analyze_with_system_prompt("system", "user")
+    assert info.value.status_code == 429 and retry_after_of(info.value) == 7
+
+    with pytest.raises(CircuitOpenError):
+        service.analyze_with_system_prompt("system", "user")
+
+
+def test_openai_service_shares_breaker_with_other_agents(monkeypatch, tmp_path):
+    import importlib
+    from backend.services.resilience_service import get_resilience
+
+    # settings se lee al importar backend.config: se ajusta la instancia ya creada
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-fake")
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+    module = importlib.import_module("backend.services.openai_service")
+
+    assert module.OpenAIService().resilience is get_resilience("openai")
+
+    # Misma versión de plantillas y configuración que el resto de agentes (sin copias vía sys.path)
+    from backend.utils import prompts
+    assert module.settings is settings
+    assert module.PROMPT_TEMPLATE_VERSION is prompts.PROMPT_TEMPLATE_VERSION
+    assert "utils.prompts" not in sys.modules
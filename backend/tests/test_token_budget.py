@@ -0,0 +1,93 @@
+"""
+Pruebas del conteo de tokens y del recorte de prompts al presupuesto
+"""
+from types import SimpleNamespace
+
+from backend.services import token_service
+from backend.services.token_service import (
+    TokenCounter,
+    PromptBudgeter,
+    CV_PRIORITY_PATTERNS,
+)
+
+CV_LINES = (
+    ["Ana Torres", "ana.torres@example.com", "+57 300 123 4567"]
+    + [f"Proyecto {i}: migración de pipelines de datos con Spark y Airflow" for i in range(80)]
+    + ["EXPERIENCIA: Data Engineer en Acme (2019-2024)", "EDUCACIÓN: Ingeniería de Sistemas", "Idiomas: inglés C1"]
+)
+
+
+def test_local_estimator_is_close_to_bpe_rates():
+    counter = TokenCounter(use_tiktoken=False)
+    assert not counter.exact
+    english = "The quick brown fox jumps over the lazy dog. " * 20
+    # cl100k/o200k dan ~10 tokens por frase
+    assert 180 <= counter.count(english) <= 260
+    assert counter.count("2024") == 2  # dígitos en grupos de 3
+    assert counter.count("") == 0
+    assert counter.count_messages([{"role": "user", "content": ""}]) == 6
+
+
+def test_truncate_respects_budget():
+    counter = TokenCounter(use_tiktoken=False)
+    text = "palabra " * 100
+    prefix = counter.truncate(text, 10)
+    assert text.startswith(prefix)
+    assert counter.count(prefix) <= 10
+    assert counter.truncate(text, 0) == ""
+
+
+def test_uses_tiktoken_encoding_when_available(monkeypatch):
+    class FakeEncoding:
+        def encode(self, text, disallowed_special=()):
+            return list(text)
+
+        def decode(self, tokens):
+            return "".join(tokens)
+
+    monkeypatch.setattr(token_service, "tiktoken", SimpleNamespace(get_encoding=lambda name: FakeEncoding()))
+    counter = TokenCounter()
+    assert counter.exact
+    assert counter.count("hola") == 4
+    assert counter.truncate("hola mundo", 4) == "hola"
+
+
+def test_fit_keeps_priority_lines_dedupes_and_preserves_order():
+    budgeter = PromptBudgeter(TokenCounter(use_tiktoken=False))
+    text = "\n".join(CV_LINES + ["ana.torres@example.com"])  # pie repetido
+
+    fitted, report = budgeter.fit(text, 120, CV_PRIORITY_PATTERNS)
+
+    lines = fitted.splitlines()
+    assert report["trimmed"] and report["final_tokens"] <= 120
+    assert report["original_tokens"] > 120
+    assert lines.count("ana.torres@example.com") == 1
+    for key in ("EXPERIENCIA: Data Engineer en Acme (2019-2024)", "EDUCACIÓN: Ingeniería de Sistemas",
+                "Idiomas: inglés C1", "+57 300 123 4567"):
+        assert key in lines
+    assert lines.index("ana.torres@example.com") < lines.index("Idiomas: inglés C1")
+    assert lines[0] == "Ana Torres"  # el resto se llena en orden del documento
+
+
+def test_fit_leaves_short_text_untouched_and_cuts_single_long_line():
+    budgeter = PromptBudgeter(TokenCounter(use_tiktoken=False), max_input_tokens=100)
+    assert budgeter.fit("CV corto", 50)[0] == "CV corto"
+
+    fitted, report = budgeter.fit("texto " * 500, 40)
+    assert report["final_tokens"] <= 40 and fitted.startswith("texto texto")
+
+    base = [{"role": "system", "content": "x " * 50}, {"role": "user", "content": ""}]
+    assert budgeter.available(base) == 100 - budgeter.counter.count_messages(base)
+
+
+def test_extractor_trims_cv_before_sending(monkeypatch):
+    from backend.agents.extractor_agent import ExtractorAgent
+
+    monkeypatch.setenv("LLM_MAX_INPUT_TOKENS", "400")
+    agent = ExtractorAgent(openai_endpoint="https://example.openai.azure.com/", openai_key="k", text_mode="local")
+    agent.budgeter.counter = TokenCounter(use_tiktoken=False)
+
+    messages = agent._cv_messages("\n".join(CV_LINES * 3))
+
+    assert agent.budgeter.counter.count_messages(messages) <= 400
+    assert "EXPERIENCIA: Data Engineer" in messages[1]["content"]
@@ -0,0 +1,82 @@
+"""
+Pruebas de la recepción de uploads con memoria acotada
+"""
+import io
+
+import pytest
+
+from backend.services.upload_service import UploadService, UploadRejectedError
+
+
+class StreamWithoutSize(io.RawIOBase):
+    """Stream que no permite conocer su tamaño sin leerlo"""
+
+    def __init__(self, total):
+        self.remaining = total
+        self.read_bytes = 0
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        n = self.remaining if n < 0 else min(n, self.remaining)
+        self.remaining -= n
+        self.read_bytes += n
+        return b"x" * n
+
+
+def test_declared_size_is_rejected_before_reading():
+    upload = io.BytesIO(b"x" * (3 * 1024 * 1024))
+    upload.name = "grande.pdf"
+
+    with pytest.raises(UploadRejectedError):
+        UploadService(max_file_size_mb=1).spool(upload)
+    assert upload.tell() == 0
+
+
+def test_unknown_size_stops_copy_at_the_limit():
+    stream = StreamWithoutSize(50 * 1024 * 1024)
+
+    with pytest.raises(UploadRejectedError):
+        UploadService(max_file_size_mb=2).spool(stream, "stream.pdf")
+    assert stream.read_bytes <= 3 * 1024 * 1024
+
+
+def test_spooled_copy_and_batch_limit():
+    service = UploadService(max_file_size_mb=5, max_files=2)
+
+    buffer = service.spool(io.BytesIO(b"%PDF contenido"), "cv.pdf")
+    assert buffer.read() == b"%PDF contenido"
+
+    with pytest.raises(UploadRejectedError):
+        service.check_batch([1, 2, 3])
+
+
+def test_track_batch_reports_peak_memory():
+    service = UploadService()
+    with service.track_batch(trace_python=True) as report:
+        blob = bytearray(5 * 1024 * 1024)
+        del blob
+    assert report["python_peak_mb"] >= 5
+
+
+def test_track_batch_skips_tracemalloc_by_default(monkeypatch):
+    import tracemalloc
+
+    monkeypatch.delenv("UPLOAD_TRACE_MEMORY", raising=False)
+    with UploadService().track_batch() as report:
+        assert not tracemalloc.is_tracing()
+    assert "python_peak_mb" not in report and "duration_s" in report
+
+
+def test_track_batch_reports_rss_change_of_the_batch():
+    service = UploadService()
+    if service.current_rss() is None:
+        pytest.skip("/proc/self/statm no disponible")
+
+    with service.track_batch() as report:
+        blob = bytearray(20 * 1024 * 1024)
+        blob[::4096] = b"x" * len(blob[::4096])  # tocar las páginas para que cuenten en el RSS
+    assert report["rss_start_mb"] > 0
+    assert report["rss_delta_mb"] >= 15
+    del blob
@@ -0,0 +1,141 @@
+"""
+Pruebas del daemon de carpeta vigilada (detección incremental y reinicio)
+"""
+import os
+import json
+
+from backend.services.watch_folder_service import WatchFolderService
+from backend.tests.pdf_factory import make_text_pdf
+
+
+class FakeAgent:
+    def __init__(self):
+        self.calls = 0
+
+    def process_cv_bytes(self, data):
+        self.calls += 1
+        content = data.read()
+        if b"roto" in content:
+            return {"error": "OCR falló"}
+        return {"nombre": f"candidato {self.calls}", "bytes": len(content)}
+
+
+def _service(tmp_path, agent):
+    return WatchFolderService(
+        inbox_dir=str(tmp_path / "inbox"),
+        output_dir=str(tmp_path / "perfiles"),
+        agent=agent,
+        settle_seconds=0,
+    )
+
+
+def test_processes_new_files_once_and_survives_restart(tmp_path):
+    agent = FakeAgent()
+    service = _service(tmp_path, agent)
+    (tmp_path / "inbox" / "equipo").mkdir(parents=True)
+    (tmp_path / "inbox" / "ana.pdf").write_bytes(make_text_pdf(["Ana"]))
+    (tmp_path / "inbox" / "equipo" / "luis.pdf").write_bytes(make_text_pdf(["Luis"]))
+    (tmp_path / "inbox" / "notas.txt").write_text("no es un CV")
+
+    report = service.run_once()
+    assert report["done"] == 2 and report["scanned"] == 2
+    outputs = sorted(os.listdir(tmp_path / "perfiles"))
+    assert len([o for o in outputs if o.endswith(".json")]) == 2
+
+    # Reinicio: un servicio nuevo lee el journal y no reprocesa nada
+    restarted = _service(tmp_path, agent)
+    assert restarted.run_once()["skipped"] == 2
+    assert agent.calls == 2
+
+
+def test_changed_touched_and_copied_files(tmp_path):
+    agent = FakeAgent()
+    service = _service(tmp_path, agent)
+    inbox = tmp_path / "inbox"
+    cv = inbox / "ana.pdf"
+    cv.write_bytes(make_text_pdf(["Ana"]))
+    service.run_once()
+
+    # touch: cambia el mtime pero no el contenido → no se llama al agente
+    os.utime(cv, (1, 1))
+    assert service.run_once()["unchanged"] == 1
+
+    # copia con otro nombre → reutiliza el perfil
+    (inbox / "ana_copia.pdf").write_bytes(cv.read_bytes())
+    assert service.run_once()["duplicate"] == 1
+
+    # contenido nuevo → se procesa otra vez
+    cv.write_bytes(make_text_pdf(["Ana, version 2"]))
+    assert service.run_once()["done"] == 1
+    assert agent.calls == 2
+
+    entry = service.journal.get("ana.pdf")
+    with open(entry["output"], encoding="utf-8") as f:
+        assert json.load(f)["perfil"]["nombre"] == "candidato 2"
+
+
+def test_errors_are_retried_up_to_max_attempts(tmp_path):
+    agent = FakeAgent()
+    service = _service(tmp_path, agent)
+    (tmp_path / "inbox").mkdir(exist_ok=True)
+    (tmp_path / "inbox" / "malo.pdf").write_bytes(b"%PDF roto")
+
+    for _ in range(5):
+        service.run_once()
+
+    assert agent.calls == 3
+    assert service.journal.get("malo.pdf")["attempts"] == 3
+
+
+def test_copy_of_old_content_is_not_matched_to_changed_file(tmp_path):
+    agent = FakeAgent()
+    service = _service(tmp_path, agent)
+    inbox = tmp_path / "inbox"
+    inbox.mkdir(exist_ok=True)
+    old = make_text_pdf(["Ana"])
+    (inbox / "a.pdf").write_bytes(old)
+    service.run_once()
+
+    (inbox / "a.pdf").write_bytes(make_text_pdf(["Luis"]))
+    service.run_once()
+
+    # b.pdf tiene el contenido viejo de a.pdf: no debe recibir el perfil nuevo
+    (inbox / "b.pdf").write_bytes(old)
+    assert service.run_once()["done"] == 1
+    assert service.journal.get("b.pdf")["output"] != service.journal.get("a.pdf")["output"]
+    assert agent.calls == 3
+
+
+def test_agent_exceptions_count_as_attempts(tmp_path):
+    class CrashingAgent:
+        calls = 0
+
+        def process_cv_bytes(self, data):
+            self.calls += 1
+            raise RuntimeError("fallo del parser")
+
+    agent = CrashingAgent()
+    service = _service(tmp_path, agent)
+    (tmp_path / "inbox").mkdir(exist_ok=True)
+    (tmp_path / "inbox" / "malo.pdf").write_bytes(make_text_pdf(["Ana"]))
+
+    for _ in range(5):
+        assert service.run_once()["error"] in (0, 1)
+
+    entry = service.journal.get("malo.pdf")
+    assert agent.calls == 3
+    assert entry["attempts"] == 3 and "fallo del parser" in entry["error"]
+
+
+def test_truncated_journal_line_is_ignored(tmp_path):
+    agent = FakeAgent()
+    service = _service(tmp_path, agent)
+    (tmp_path / "inbox" / "ana.pdf").write_bytes(make_text_pdf(["Ana"]))
+    service.run_once()
+
+    with open(service.journal.path, "a", encoding="utf-8") as f:
+        f.write('{"path": "luis.pdf", "entry": {"mti')
+
+    restarted = _service(tmp_path, agent)
+    assert restarted.journal.get("ana.pdf")["status"] == "done"
+    assert restarted.journal.get("luis.pdf") is None
@@ -0,0 +1,83 @@
+"""
+Pruebas de la ingesta de paquetes ZIP (miembro por miembro)
+"""
+import io
+import zipfile
+
+from backend.services.upload_service import UploadService
+from backend.services.zip_service import ZipIngestionService
+from backend.tests.pdf_factory import make_text_pdf
+
+
+def _zip(entries):
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            if name.endswith("/"):
+                archive.writestr(zipfile.ZipInfo(name), b"")
+            else:
+                archive.writestr(name, data)
+    out.seek(0)
+    return out
+
+
+def test_streams_supported_members_and_counts_skipped():
+    pdf = make_text_pdf(["Maria Gomez"])
+    archive = _zip([
+        ("cvs/", b""),
+        ("cvs/maria.pdf", pdf),
+        ("cvs/notas.txt", b"texto"),
+        ("__MACOSX/cvs/._maria.pdf", b"meta"),
+        ("otro.zip", b"PK"),
+        ("JUAN.PDF", pdf),
+    ])
+
+    report = {}
+    seen = []
+    buffers = []
+    for name, data in ZipIngestionService().iter_members(archive, report):
+        seen.append((name, data.read()))
+        buffers.append(data)
+
+    assert seen == [("cvs/maria.pdf", pdf), ("JUAN.PDF", pdf)]
+    assert all(b.closed for b in buffers)
+    assert report == {"members": 6, "processed": 2, "skipped_directories": 1,
+                      "skipped_unsupported": 3, "rejected": 0}
+
+
+def test_members_in_folders_keep_their_full_path():
+    archive = _zip([
+        ("equipo_a/cv.pdf", make_text_pdf(["Ana"])),
+        ("equipo_b/cv.pdf", make_text_pdf(["Luis"])),
+    ])
+
+    names = [name for name, _ in ZipIngestionService().iter_members(archive)]
+
+    assert names == ["equipo_a/cv.pdf", "equipo_b/cv.pdf"]
+
+
+def test_oversized_members_and_member_cap_are_rejected():
+    big = b"%PDF-1.4\n" + b"0" * 50_000
+    archive = _zip([("a.pdf", big), ("b.pdf", b"%PDF-1.4 chico"), ("c.pdf", b"%PDF-1.4 chico"), ("d.pdf", b"%PDF")])
+
+    service = ZipIngestionService(upload_service=UploadService(max_file_size_mb=0.01), max_members=2)
+    report = {}
+    names = [name for name, _ in service.iter_members(archive, report)]
+
+    assert names == ["b.pdf", "c.pdf"]
+    assert report["rejected"] == 2
+
+
+def test_zero_member_quota_reads_nothing():
+    archive = _zip([("a.pdf", b"%PDF-1.4 uno"), ("b.pdf", b"%PDF-1.4 dos")])
+
+    report = {}
+    assert list(ZipIngestionService(max_members=0).iter_members(archive, report)) == []
+    assert report["processed"] == 0 and report["rejected"] == 2
+
+
+def test_accepts_path_on_disk(tmp_path):
+    path = tmp_path / "cvs.zip"
+    path.write_bytes(_zip([("cv.pdf", b"%PDF-1.4")]).getvalue())
+
+    assert [name for name, _ in ZipIngestionService().iter_members(str(path))] == ["cv.pdf"]
@@ -0,0 +1,392 @@
+"""
+Generador determinista de corpus sintéticos (CVs y ofertas en PDF y DOCX)
+para medir la ingesta sin documentos reales ni conexión a Azure.
+
+Uso:
+    python -m backend.utils.corpus_generator --out data/bench/cvs_1000 --docs 1000
+    python -m backend.utils.corpus_generator --out data/bench/cvs_1000 --bench --workers 4
+"""
+import io
+import os
+import json
+import time
+import random
+import zipfile
+import argparse
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple, Union
+
+from PIL import Image, ImageDraw, ImageFont
+
+_FIRST_NAMES = ["María", "Juan", "Ana", "Luis", "Camila", "Andrés", "Valentina", "Santiago",
+                "Laura", "Carlos", "Daniela", "Felipe", "Sofía", "Mateo", "Paula", "Diego"]
+_LAST_NAMES = ["Gómez", "Rodríguez", "Pérez", "Martínez", "López", "García", "Ramírez",
+               "Torres", "Herrera", "Castro", "Vargas", "Moreno", "Rojas", "Ortiz"]
+_SKILLS = ["Python", "SQL", "Azure", "AWS", "Docker", "Kubernetes", "Spark", "Power BI",
+           "React", "Node.js", "Java", "FastAPI", "Pandas", "Terraform", "Git", "Scrum",
+           "Machine Learning", "Tableau", "Airflow", "PostgreSQL", "C#", ".NET", "Excel avanzado"]
+_SOFT_SKILLS = ["liderazgo", "comunicación", "trabajo en equipo", "pensamiento crítico",
+                "adaptabilidad", "negociación", "resolución de problemas"]
+_COMPANIES = ["Bancolombia", "Rappi", "Globant", "Avianca", "Ecopetrol", "Nequi", "EPAM",
+              "Mercado Libre", "Grupo Éxito", "Sura", "Davivienda", "Accenture"]
+_ROLES = ["Ingeniero de Datos", "Desarrollador Backend", "Analista de BI", "Científica de Datos",
+          "Arquitecto Cloud", "Desarrolladora Full Stack", "Líder Técnico", "Analista QA"]
+_UNIVERSITIES = ["Universidad Nacional", "Universidad de los Andes", "Universidad EAFIT",
+                 "Pontificia Universidad Javeriana", "Universidad del Valle"]
+_LANGUAGES = ["Español nativo", "Inglés avanzado", "Inglés intermedio", "Portugués básico", "Francés básico"]
+
+LINES_PER_PAGE = 50
+PAGE_WIDTH_PT, PAGE_HEIGHT_PT = 612, 792
+
+
+# -------------------------------------------------------------------------
+#     PDF mínimo (páginas con capa de texto o solo imagen)
+# -------------------------------------------------------------------------
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: Sequence[Union[str, Image.Image]]) -> bytes:
+    """
+    Crea un PDF sin dependencias externas: cada elemento de pages es un texto
+    (página con capa de texto, Helvetica) o una imagen PIL (página escaneada,
+    JPEG a página completa y sin texto).
+    """
+    objects = []
+
+    def add(obj: bytes) -> int:
+        objects.append(obj)
+        return len(objects)
+
+    catalog = add(b"")  # se completa al final
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    kids = []
+    for page in pages:
+        if isinstance(page, Image.Image):
+            jpeg = io.BytesIO()
+            page.convert("L").save(jpeg, "JPEG", quality=70)
+            jpeg = jpeg.getvalue()
+            image = add(
+                b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                b"/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>\nstream\n" % (page.width, page.height, len(jpeg))
+                + jpeg + b"\nendstream"
+            )
+            stream = b"q %d 0 0 %d 0 0 cm /Im1 Do Q" % (PAGE_WIDTH_PT, PAGE_HEIGHT_PT)
+            resources = b"<< /XObject << /Im1 %d 0 R >> >>" % image
+        else:
+            ops = ["BT", "/F1 11 Tf", "14 TL", "50 780 Td"]
+            for line in page.split("\n"):
+                ops.append(f"({_escape(line)}) Tj T*")
+            ops.append("ET")
+            stream = "\n".join(ops).encode("cp1252", errors="replace")
+            resources = b"<< /Font << /F1 %d 0 R >> >>" % font
+
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %s /Contents %d 0 R >>"
+            % (pages_obj, PAGE_WIDTH_PT, PAGE_HEIGHT_PT, resources, content)
+        ))
+
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids)
+    )
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % i + obj + b"\nendobj\n")
+
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for off in offsets:
+        out.write(b"%010d 00000 n \n" % off)
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref))
+    return out.getvalue()
+
+
+def _bitmap_font():
+    # La fuente bitmap se dibuja mucho más rápido que la TrueType por defecto (corpus de 10.000 documentos)
+    if hasattr(ImageFont, "load_default_imagefont"):
+        return ImageFont.load_default_imagefont()
+    return ImageFont.load_default()
+
+
+def render_page_image(text: str, size: Tuple[int, int] = (850, 1100)) -> Image.Image:
+    """Dibuja el texto de una página como imagen (simula una hoja escaneada)"""
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    font = _bitmap_font()
+    for n, line in enumerate(text.split("\n")):
+        draw.text((40, 30 + 20 * n), line, fill=0, font=font)
+    return image
+
+
+def build_docx(paragraphs: Sequence[str]) -> bytes:
+    """DOCX con un párrafo por línea; fechas internas fijas para que los bytes sean reproducibles"""
+    from docx import Document
+
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    out = io.BytesIO()
+    document.save(out)
+
+    # python-docx guarda los miembros del ZIP con la hora actual
+    normalized = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(out.getvalue())) as source, \
+            zipfile.ZipFile(normalized, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            fixed = zipfile.ZipInfo(info.filename, date_time=(2024, 1, 1, 0, 0, 0))
+            fixed.compress_type = zipfile.ZIP_DEFLATED
+            target.writestr(fixed, source.read(info.filename))
+    return normalized.getvalue()
+
+
+# -------------------------------------------------------------------------
+#     Contenido sintético
+# -------------------------------------------------------------------------
+class CorpusGenerator:
+    """
+    Genera documentos sintéticos reproducibles (misma semilla → mismos bytes).
+
+    Args:
+        seed: Semilla del corpus
+        pages: Rango (mínimo, máximo) de páginas por documento
+        docx_ratio: Proporción de documentos en .docx
+        scanned_ratio: Proporción de PDFs completamente escaneados (solo imágenes)
+        image_page_ratio: Probabilidad de que una página de un PDF digital sea escaneada
+        duplicate_ratio: Proporción de copias exactas de un documento anterior
+        near_duplicate_ratio: Proporción de re-exportaciones con un cambio mínimo
+    """
+
+    def __init__(self, seed: int = 42, pages: Tuple[int, int] = (1, 3), docx_ratio: float = 0.2,
+                 scanned_ratio: float = 0.1, image_page_ratio: float = 0.1,
+                 duplicate_ratio: float = 0.05, near_duplicate_ratio: float = 0.05):
+        self.seed = seed
+        self.pages = pages
+        self.docx_ratio = docx_ratio
+        self.scanned_ratio = scanned_ratio
+        self.image_page_ratio = image_page_ratio
+        self.duplicate_ratio = duplicate_ratio
+        self.near_duplicate_ratio = near_duplicate_ratio
+
+    def _rng(self, *parts) -> random.Random:
+        return random.Random("-".join(str(p) for p in (self.seed,) + parts))
+
+    def cv_lines(self, index: int, n_pages: int) -> List[str]:
+        rng = self._rng("cv", index)
+        name = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)} {rng.choice(_LAST_NAMES)}"
+        handle = name.lower().replace(" ", ".").encode("ascii", "ignore").decode()
+        lines = [
+            name,
+            rng.choice(_ROLES),
+            f"Correo: {handle}{index}@example.com",
+            f"Teléfono: +57 3{rng.randint(0, 99):02d} {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+            f"LinkedIn: linkedin.com/in/{handle.replace('.', '-')}-{index}",
+            "",
+            "PERFIL PROFESIONAL",
+            f"Profesional con {rng.randint(1, 15)} años de experiencia en {', '.join(rng.sample(_SKILLS, 3))}.",
+            "",
+            "HABILIDADES TÉCNICAS",
+            ", ".join(rng.sample(_SKILLS, rng.randint(5, 9))),
+            "HABILIDADES BLANDAS",
+            ", ".join(rng.sample(_SOFT_SKILLS, 3)),
+            "IDIOMAS",
+            ", ".join(rng.sample(_LANGUAGES, 2)),
+            "",
+            "EDUCACIÓN",
+            f"Ingeniería de Sistemas - {rng.choice(_UNIVERSITIES)} ({rng.randint(2005, 2020)})",
+            "",
+            "EXPERIENCIA LABORAL",
+        ]
+        while len(lines) < n_pages * LINES_PER_PAGE:
+            start = rng.randint(2010, 2022)
+            lines.extend([
+                f"{rng.choice(_ROLES)} - {rng.choice(_COMPANIES)} ({start} - {start + rng.randint(1, 4)})",
+                f"Diseñé y mantuve soluciones con {' y '.join(rng.sample(_SKILLS, 2))} para {rng.randint(2, 40)} equipos.",
+                f"Reduje costos de infraestructura en un {rng.randint(5, 60)}% y automaticé reportes.",
+                "",
+            ])
+        return lines[:n_pages * LINES_PER_PAGE]
+
+    def job_lines(self, index: int, n_pages: int) -> List[str]:
+        rng = self._rng("job", index)
+        skills = rng.sample(_SKILLS, 8)
+        lines = [
+            f"OFERTA: {rng.choice(_ROLES)}",
+            f"Empresa: {rng.choice(_COMPANIES)}",
+            f"Ubicación: {rng.choice(['Bogotá', 'Medellín', 'Cali', 'Remoto'])}",
+            f"Experiencia requerida: {rng.randint(1, 8)} años",
+            "",
+            "RESPONSABILIDADES",
+        ]
+        lines += [f"- Liderar iniciativas con {s} y documentar la solución." for s in skills[:4]]
+        lines += ["", "REQUISITOS TÉCNICOS"] + [f"- Dominio de {s}" for s in skills]
+        lines += ["", "HABILIDADES BLANDAS"] + [f"- {s.capitalize()}" for s in rng.sample(_SOFT_SKILLS, 3)]
+        lines += ["", "BENEFICIOS", "- Modalidad híbrida", f"- Salario competitivo ({rng.randint(6, 20)} M COP)"]
+        while len(lines) < n_pages * LINES_PER_PAGE:
+            lines.append(f"- Participar en proyectos de {rng.choice(skills)} con equipos de {rng.choice(_COMPANIES)}.")
+        return lines[:n_pages * LINES_PER_PAGE]
+
+    # -------------------------------------------------------------------------
+    #     Documentos
+    # -------------------------------------------------------------------------
+    def make_document(self, index: int, kind: str = "cv", variant: int = 0) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        Genera el documento index del corpus.
+
+        Args:
+            variant: > 0 produce una re-exportación con un cambio mínimo (casi-duplicado)
+
+        Returns:
+            (bytes, metadatos: kind, format, pages, image_pages)
+        """
+        rng = self._rng("layout", kind, index)
+        n_pages = rng.randint(*self.pages)
+        lines = self.cv_lines(index, n_pages) if kind == "cv" else self.job_lines(index, n_pages)
+        if variant:
+            lines[-1] = f"Actualizado (versión {variant + 1})"
+
+        meta = {"kind": kind, "pages": n_pages, "image_pages": []}
+        if rng.random() < self.docx_ratio:
+            meta["format"] = "docx"
+            return build_docx(lines), meta
+
+        page_texts = ["\n".join(lines[p * LINES_PER_PAGE:(p + 1) * LINES_PER_PAGE]) for p in range(n_pages)]
+        if rng.random() < self.scanned_ratio:
+            image_pages = list(range(n_pages))
+        else:
+            image_pages = [p for p in range(n_pages) if rng.random() < self.image_page_ratio]
+
+        meta["format"] = "pdf"
+        meta["image_pages"] = image_pages
+        pages = [render_page_image(t) if p in image_pages else t for p, t in enumerate(page_texts)]
+        return build_pdf(pages), meta
+
+    def iter_documents(self, n_docs: int, kind: str = "cv") -> Iterator[Tuple[str, bytes, Dict[str, Any]]]:
+        """
+        Genera (nombre de archivo, bytes, metadatos) de a un documento.
+
+        Las copias exactas repiten los bytes de un documento anterior con otro
+        nombre; los casi-duplicados lo regeneran con una línea cambiada.
+        """
+        originals: List[Tuple[int, str, Dict[str, Any]]] = []
+        for i in range(n_docs):
+            rng = self._rng("dup", kind, i)
+            roll = rng.random()
+
+            if originals and roll < self.duplicate_ratio + self.near_duplicate_ratio:
+                source_index, source_name, source_meta = rng.choice(originals)
+                exact = roll < self.duplicate_ratio
+                data, meta = self.make_document(source_index, kind, variant=0 if exact else i)
+                meta["duplicate_of" if exact else "near_duplicate_of"] = source_name
+                ext = meta["format"]
+            else:
+                data, meta = self.make_document(i, kind)
+                ext = meta["format"]
+                originals.append((i, f"{kind}_{i:05d}.{ext}", meta))
+
+            yield f"{kind}_{i:05d}.{ext}", data, meta
+
+    def generate(self, output_dir: str, n_docs: int, kind: str = "cv") -> Dict[str, Any]:
+        """
+        Escribe el corpus en disco (un archivo a la vez) junto a manifest.jsonl.
+
+        Returns:
+            dict con documents, pages, image_pages, bytes, duplicates y near_duplicates
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        summary = {"documents": 0, "pages": 0, "image_pages": 0, "bytes": 0,
+                   "duplicates": 0, "near_duplicates": 0}
+
+        with open(os.path.join(output_dir, "manifest.jsonl"), "w", encoding="utf-8") as manifest:
+            for name, data, meta in self.iter_documents(n_docs, kind):
+                with open(os.path.join(output_dir, name), "wb") as f:
+                    f.write(data)
+                manifest.write(json.dumps({"file": name, "bytes": len(data), **meta}, ensure_ascii=False) + "\n")
+
+                summary["documents"] += 1
+                summary["pages"] += meta["pages"]
+                summary["image_pages"] += len(meta["image_pages"])
+                summary["bytes"] += len(data)
+                summary["duplicates"] += "duplicate_of" in meta
+                summary["near_duplicates"] += "near_duplicate_of" in meta
+
+        return summary
+
+
+# -------------------------------------------------------------------------
+#     Benchmark de ingesta local
+# -------------------------------------------------------------------------
+def benchmark_ingestion(corpus_dir: str, parse_workers: int = 1, batch_size: int = 200,
+                        mode: str = "local") -> Dict[str, Any]:
+    """
+    Mide la ingesta sobre un corpus generado, por lotes de batch_size archivos.
+
+    En modo "local" no se llama a Azure: las páginas escaneadas quedan sin
+    texto y se cuentan en ocr_candidates.
+    """
+    from backend.services.ingestion_service import IngestionService
+
+    service = IngestionService(mode=mode, parse_workers=parse_workers)
+    files = sorted(f for f in os.listdir(corpus_dir) if f.endswith((".pdf", ".docx")))
+    report = {"documents": 0, "pages": 0, "errors": 0, "ocr_candidates": 0, "chars": 0}
+
+    start = time.perf_counter()
+    for offset in range(0, len(files), batch_size):
+        batch = []
+        for name in files[offset:offset + batch_size]:
+            with open(os.path.join(corpus_dir, name), "rb") as f:
+                batch.append(f.read())
+
+        for result in service.extract_many(batch):
+            report["documents"] += 1
+            if isinstance(result, Exception):
+                report["errors"] += 1
+                continue
+            report["pages"] += result["pages"]
+            report["chars"] += len(result["text"])
+            report["ocr_candidates"] += sum(1 for t in result["page_texts"] if not t.strip())
+
+    elapsed = time.perf_counter() - start
+    report["seconds"] = round(elapsed, 2)
+    report["docs_per_s"] = round(report["documents"] / elapsed, 1) if elapsed else None
+    report["pages_per_s"] = round(report["pages"] / elapsed, 1) if elapsed else None
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Corpus sintético de CVs y ofertas para benchmarks de ingesta")
+    parser.add_argument("--out", required=True, help="Carpeta del corpus")
+    parser.add_argument("--docs", type=int, default=10, help="Número de documentos (p.ej. 10, 1000, 10000)")
+    parser.add_argument("--kind", choices=["cv", "job"], default="cv")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--min-pages", type=int, default=1)
+    parser.add_argument("--max-pages", type=int, default=3)
+    parser.add_argument("--docx-ratio", type=float, default=0.2)
+    parser.add_argument("--scanned-ratio", type=float, default=0.1)
+    parser.add_argument("--image-page-ratio", type=float, default=0.1)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.05)
+    parser.add_argument("--near-duplicate-ratio", type=float, default=0.05)
+    parser.add_argument("--bench", action="store_true", help="Mide la ingesta local del corpus en lugar de generarlo")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos de parsing para --bench")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        print(json.dumps(benchmark_ingestion(args.out, parse_workers=args.workers), indent=2))
+        return
+
+    generator = CorpusGenerator(
+        seed=args.seed, pages=(args.min_pages, args.max_pages), docx_ratio=args.docx_ratio,
+        scanned_ratio=args.scanned_ratio, image_page_ratio=args.image_page_ratio,
+        duplicate_ratio=args.duplicate_ratio, near_duplicate_ratio=args.near_duplicate_ratio,
+    )
+    print(json.dumps(generator.generate(args.out, args.docs, args.kind), indent=2))
+
+
+if __name__ == "__main__":
+    main()
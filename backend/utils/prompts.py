@@ -4,6 +4,9 @@ Prompts templates para Azure OpenAI
 import json
 from datetime import datetime
 
+# Incrementar al modificar cualquier plantilla: invalida las respuestas guardadas en el caché LLM
+PROMPT_TEMPLATE_VERSION = "1"
+
 JOB_ANALYSIS_SYSTEM_PROMPT = """Eres un experto analizador de ofertas de trabajo con 15+ anos de experiencia.
 
 Analiza descripciones de trabajo y extrae informacion estructurada de manera precisa.